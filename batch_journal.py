@@ -0,0 +1,166 @@
+"""Journal append-only (JSONL) cho moi batch xu ly: app/may chet giua chung thi lan sau
+tiep tuc duoc cac job chua xong, khong tao ban _1 cho file da xong.
+
+Moi dong la 1 record:
+    {"type": "batch", "id", "created", "params": {...}, "files": [...]}   (dong dau)
+    {"type": "job", "job": i, "state": queued|running|done|failed|skipped|stopped,
+     "outputs": [...], "cmd": "<hash>", "t": ...}
+    (job queued them luc batch dang chay co them "path")
+    {"type": "end", "t": ...}                                            (batch chay het)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+JOURNAL_DIR = os.path.join("cache", "batches")
+KEEP_JOURNALS = 20
+
+QUEUED, RUNNING, DONE, FAILED, SKIPPED, STOPPED = (
+    "queued", "running", "done", "failed", "skipped", "stopped")
+# Job o cac trang thai nay chua xong => resume chay lai
+INCOMPLETE = {QUEUED, RUNNING, STOPPED}
+
+
+def command_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class BatchJournal:
+    """Ghi journal cua 1 batch. Record quan trong (running/done) duoc fsync ngay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, params: dict, files: list, folder: str = JOURNAL_DIR) -> "BatchJournal":
+        """Tao journal moi. params: tham so de dung lai ProcessWorker khi resume."""
+        os.makedirs(folder, exist_ok=True)
+        batch_id = time.strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}"
+        journal = cls(os.path.join(folder, batch_id + ".jsonl"))
+        journal._write({"type": "batch", "id": batch_id, "created": time.time(),
+                        "params": params, "files": files}, sync=True)
+        _prune(folder)
+        return journal
+
+    def _write(self, record: dict, sync: bool = False):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self._f.closed:
+                return
+            self._f.write(line + "\n")
+            self._f.flush()
+            if sync:
+                os.fsync(self._f.fileno())
+
+    def job(self, job: int, state: str, outputs=(), cmd: str = "", error: str = ""):
+        record = {"type": "job", "job": job, "state": state, "t": time.time()}
+        if outputs:
+            record["outputs"] = list(outputs)
+        if cmd:
+            record["cmd"] = cmd
+        if error:
+            record["error"] = error[-300:]
+        self._write(record, sync=state in (RUNNING, DONE))
+
+    def queued(self, jobs, paths=None):
+        """paths: duong dan cua job them vao sau khi batch da chay (hot folder)."""
+        jobs = list(jobs)
+        for i, job in enumerate(jobs):
+            record = {"type": "job", "job": job, "state": QUEUED}
+            if paths:
+                record["path"] = paths[i]
+            self._write(record, sync=i == len(jobs) - 1)
+
+    def close(self, complete: bool):
+        """complete=True: batch chay het (khong con gi de resume)."""
+        if complete:
+            self._write({"type": "end", "t": time.time()}, sync=True)
+        with self._lock:
+            self._f.close()
+
+
+class BatchState:
+    """Trang thai batch doc lai tu journal (record cuoi cung cua moi job thang)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = {}
+        self.jobs = {}          # job -> record cuoi
+        self.complete = False
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue     # dong cuoi bi cat do crash
+                kind = rec.get("type")
+                if kind == "batch":
+                    self.header = rec
+                elif kind == "job":
+                    if "path" in rec and rec["job"] == len(self.header.get("files", [])):
+                        self.header.setdefault("files", []).append(rec["path"])
+                    prev = self.jobs.get(rec["job"], {})
+                    # "queued" after the job already ran is just the initial listing
+                    if rec["state"] != QUEUED or not prev:
+                        self.jobs[rec["job"]] = {**prev, **rec}
+                elif kind == "end":
+                    self.complete = True
+
+    @property
+    def files(self) -> list:
+        return self.header.get("files", [])
+
+    @property
+    def params(self) -> dict:
+        return self.header.get("params", {})
+
+    def state(self, job: int) -> str:
+        return self.jobs.get(job, {}).get("state", QUEUED)
+
+    def incomplete(self) -> list:
+        """Chi so cac job can chay lai (chua chay / dang chay khi crash / bi dung)."""
+        return [i for i in range(len(self.files)) if self.state(i) in INCOMPLETE]
+
+    def partial_outputs(self) -> list:
+        """Output do dang cua cac job bi ngat giua chung (can xoa truoc khi chay lai)."""
+        return [p for rec in self.jobs.values() if rec.get("state") == RUNNING
+                for p in rec.get("outputs", [])]
+
+    def counts(self) -> dict:
+        out = {}
+        for i in range(len(self.files)):
+            s = self.state(i)
+            out[s] = out.get(s, 0) + 1
+        return out
+
+
+def latest_incomplete(folder: str = JOURNAL_DIR):
+    """BatchState cua batch gan nhat chua chay het, None neu khong co."""
+    if not os.path.isdir(folder):
+        return None
+    for name in sorted(os.listdir(folder), reverse=True):
+        if not name.endswith(".jsonl"):
+            continue
+        try:
+            state = BatchState(os.path.join(folder, name))
+        except OSError:
+            continue
+        if state.complete:
+            return None       # batch moi nhat da xong => khong co gi de tiep tuc
+        if state.header and state.incomplete():
+            return state
+        return None
+    return None
+
+
+def _prune(folder: str):
+    names = sorted(n for n in os.listdir(folder) if n.endswith(".jsonl"))
+    for name in names[:-KEEP_JOURNALS]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
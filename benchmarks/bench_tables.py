@@ -0,0 +1,112 @@
+"""Benchmark bang queue: QTableWidget (cu) vs QueueModel + QTableView (moi).
+
+Do thoi gian them N dong (nhu dan 20k URL / load thu muc lon), thoi gian cap nhat trang thai
+tung dong va bo nho tang them. Moi bien the chay trong process rieng de so RSS khong lan nhau.
+
+    python benchmarks/bench_tables.py              # 100000 dong
+    python benchmarks/bench_tables.py -n 20000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+VARIANTS = ("widget", "model")
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        # macOS without psutil: peak only (ru_maxrss is in bytes there)
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e6
+    except ImportError:
+        return 0.0      # Windows without psutil: not measured
+
+
+def _rows(n: int) -> list:
+    return [(f"https://www.tiktok.com/@user{i % 500}/video/{7300000000000000000 + i}", "TikTok", "Cho")
+            for i in range(n)]
+
+
+def run_one(variant: str, n: int) -> dict:
+    from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem, QTableView
+
+    app = QApplication.instance() or QApplication([])
+    rows = _rows(n)
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    if variant == "widget":
+        view = QTableWidget(0, 3)
+        view.show()
+        # Same loop the tabs used before: insertRow + 3 items per row
+        for url, platform, status in rows:
+            r = view.rowCount()
+            view.insertRow(r)
+            view.setItem(r, 0, QTableWidgetItem(url))
+            view.setItem(r, 1, QTableWidgetItem(platform))
+            view.setItem(r, 2, QTableWidgetItem(status))
+        app.processEvents()
+        t_insert = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for r in range(n):
+            view.item(r, 2).setText("Xong")
+        app.processEvents()
+    else:
+        import queue_model
+        model = queue_model.QueueModel(["URL", "Nen tang", "Trang thai"], 2)
+        proxy = queue_model.StatusFilterProxy()
+        proxy.setSourceModel(model)
+        view = QTableView()
+        view.setModel(proxy)
+        view.show()
+        # Pasted in chunks of 1000 to mimic streaming inserts
+        for i in range(0, n, 1000):
+            model.append_rows(rows[i:i + 1000])
+        app.processEvents()
+        t_insert = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for r in range(n):
+            model.set(r, 2, "Xong")
+        model.flush()
+        app.processEvents()
+    t_update = time.perf_counter() - t0
+    return {"variant": variant, "rows": n, "insert_s": round(t_insert, 3),
+            "update_s": round(t_update, 3), "mem_mb": round(_rss_mb() - base, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", type=int, default=100_000, help="so dong")
+    ap.add_argument("--one", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.one:
+        print(json.dumps(run_one(args.one, args.n)))
+        return
+    print(f"{'bien the':<8} {'dong':>8} {'them (s)':>10} {'cap nhat (s)':>13} {'RAM (MB)':>10}")
+    for variant in VARIANTS:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--one", variant, "-n", str(args.n)],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{variant:<8} loi: {out.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{variant:<8} {r['rows']:>8} {r['insert_s']:>10} {r['update_s']:>13} {r['mem_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
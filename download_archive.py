@@ -0,0 +1,163 @@
+"""Lich su tai (archive) theo khoa chuan (nen tang, id video) => link da tai roi thi bo qua.
+
+URL duoc chuan hoa thanh (platform, video_id) bang regex; link rut gon (vm.tiktok.com, fb.watch...)
+can 1 request HTTP de biet link that, ket qua luu lai trong bang short_links nen moi link chi
+phai mo 1 lan. Luu trong SQLite (cache/download_archive.sqlite), dung chung giua UI va worker.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+ARCHIVE_PATH = os.path.join("cache", "download_archive.sqlite")
+
+# (platform, host suffix, id regex) tried in order on the full URL
+ID_PATTERNS = [
+    ("tiktok", "tiktok.com", re.compile(r"/(?:video|photo|v|embed(?:/v2)?)/(\d{8,})")),
+    ("youtube", "youtube.com", re.compile(r"(?:[?&]v=|/shorts/|/embed/|/live/|/v/)([\w-]{11})")),
+    ("youtube", "youtu.be", re.compile(r"youtu\.be/([\w-]{11})")),
+    ("instagram", "instagram.com", re.compile(r"/(?:p|reels?|tv)/([\w-]+)")),
+    ("instagram", "instagr.am", re.compile(r"/(?:p|reels?|tv)/([\w-]+)")),
+    ("facebook", "facebook.com", re.compile(r"(?:/videos/(?:[\w.]+/)?|/reel/|[?&]v=)(\d{6,})")),
+]
+# Links that only redirect to the real video page
+SHORT_HOSTS = ("vm.tiktok.com", "vt.tiktok.com", "fb.watch")
+SHORT_PATHS = (("tiktok.com", "/t/"), ("facebook.com", "/share/"))
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+
+def _host(url: str) -> str:
+    try:
+        host = urlsplit(url if "://" in url else "https://" + url).hostname or ""
+    except ValueError:
+        return ""
+    return host.lower()
+
+
+def normalize(url: str) -> str:
+    """Dang so sanh cua URL khi khong lay duoc id: bo scheme, www./m., fragment, / cuoi."""
+    url = re.sub(r"^[a-z]+://", "", url.strip(), flags=re.I)
+    url = re.sub(r"^(www\.|m\.)", "", url, flags=re.I).split("#", 1)[0].rstrip("/")
+    host, sep, rest = url.partition("/")
+    # Only the host is case-insensitive; short-link codes and ids are not
+    return host.lower() + sep + rest
+
+
+def parse_key(url: str):
+    """(platform, video_id) doc truc tiep tu URL (khong mang); None neu khong nhan ra."""
+    host = _host(url)
+    for platform, suffix, pattern in ID_PATTERNS:
+        if host == suffix or host.endswith("." + suffix):
+            m = pattern.search(url)
+            if m:
+                return platform, m.group(1)
+    return None
+
+
+def is_short_link(url: str) -> bool:
+    host = _host(url)
+    if host in SHORT_HOSTS:
+        return True
+    path = urlsplit(url if "://" in url else "https://" + url).path
+    return any((host == h or host.endswith("." + h)) and path.startswith(p) for h, p in SHORT_PATHS)
+
+
+def resolve_redirect(url: str, proxy: str = "", timeout: float = 10) -> str:
+    """Link that sau khi theo redirect (chi doc header, khong tai noi dung trang)."""
+    handlers = [urllib.request.ProxyHandler({"http": proxy, "https": proxy})] if proxy else []
+    opener = urllib.request.build_opener(*handlers)
+    req = urllib.request.Request(url if "://" in url else "https://" + url,
+                                 headers={"User-Agent": USER_AGENT})
+    with opener.open(req, timeout=timeout) as resp:
+        return resp.geturl()
+
+
+class DownloadArchive:
+    """Index SQLite: video da tai (platform, video_id) + cache link rut gon. Thread-safe."""
+
+    def __init__(self, path: str = ARCHIVE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS downloads ("
+                " platform TEXT, video_id TEXT, url TEXT, downloaded_at REAL,"
+                " PRIMARY KEY (platform, video_id))")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS short_links ("
+                " url TEXT PRIMARY KEY, resolved TEXT, resolved_at REAL)")
+
+    # ── Canonical keys ───────────────────────────────────────
+
+    def cached_resolution(self, url: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT resolved FROM short_links WHERE url = ?", (normalize(url),)).fetchone()
+        return row[0] if row else None
+
+    def key_for(self, url: str, resolve: bool = False, proxy: str = ""):
+        """Khoa chuan cua URL. Link rut gon: dung ket qua da cache; resolve=True thi mo link
+        (co mang, goi tu thread nen) neu chua co. Khong xac dinh duoc => None."""
+        key = parse_key(url)
+        if key is not None or not is_short_link(url):
+            return key
+        target = self.cached_resolution(url)
+        if target is None and resolve:
+            target = resolve_redirect(url, proxy)
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO short_links (url, resolved, resolved_at) VALUES (?, ?, ?)",
+                    (normalize(url), target, time.time()))
+        return parse_key(target) if target else None
+
+    def queue_key(self, url: str):
+        """Khoa de loai trung trong queue: khoa chuan neu biet (khong mang), khong thi URL chuan hoa."""
+        return self.key_for(url) or ("url", normalize(url))
+
+    # ── Archive ──────────────────────────────────────────────
+
+    def has(self, key) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM downloads WHERE platform = ? AND video_id = ?", key).fetchone() is not None
+
+    def add(self, key, url: str):
+        if key is None:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads (platform, video_id, url, downloaded_at)"
+                " VALUES (?, ?, ?, ?)", (key[0], key[1], url, time.time()))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM downloads")
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> DownloadArchive:
+    """Archive dung chung trong process (UI + worker)."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = DownloadArchive()
+        return _archive
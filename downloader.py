@@ -1,81 +1,358 @@
+import collections
 import os
+import re
+import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 from PyQt5.QtCore import QThread, pyqtSignal
+import json
 import settings
+import download_archive
+import info_cache
+import proc_utils
+import state_hub
+import stats
+import ytdlp_pool
+
+
+PLATFORMS = ("tiktok", "youtube", "instagram", "facebook")
+# Default parallel downloads per platform (rate limits / bans hit small sites first)
+DEFAULT_PLATFORM_LIMITS = {"tiktok": 3, "youtube": 3, "instagram": 1, "facebook": 2}
+
+
+def download_limits(s: dict = None) -> tuple:
+    """(gioi han chung, {platform: gioi han}) tu settings; "auto" dung gioi han chung."""
+    s = s or settings.load_settings()
+    total = max(1, int(s.get("download_max_parallel", 4) or 1))
+    per = {p: max(1, int(s.get(f"download_limit_{p}", DEFAULT_PLATFORM_LIMITS[p]) or 1))
+           for p in PLATFORMS}
+    return total, per
+
+
+def run_limited(tasks: list, fn, total_limit: int, limits: dict, should_stop):
+    """Chay fn(task) tren thread pool: toi da total_limit cung luc, moi task["platform"] toi da
+    limits[platform]. Lay task dau tien con slot => 1 nen tang day khong chan cac nen tang khac."""
+    waiting = list(tasks)
+    active = {}            # future -> platform
+    running = collections.Counter()
+    with ThreadPoolExecutor(max_workers=total_limit) as pool:
+        while (waiting or active) and not should_stop():
+            # Start every waiting task whose platform still has a free slot (queue order kept)
+            for task in list(waiting):
+                if len(active) >= total_limit:
+                    break
+                platform = task["platform"]
+                if running[platform] >= limits.get(platform, total_limit):
+                    continue
+                waiting.remove(task)
+                running[platform] += 1
+                active[pool.submit(fn, task)] = platform
+            if not active:
+                break
+            done, _ = wait(active, return_when=FIRST_COMPLETED)
+            for fut in done:
+                running[active.pop(fut)] -= 1
+        wait(active)
+
+
+# yt-dlp CLI prints one line per progress tick in this format (--newline --progress-template)
+PROGRESS_TAG = "[RV]"
+PROGRESS_TEMPLATE = (PROGRESS_TAG + " %(progress.downloaded_bytes)s %(progress.total_bytes)s"
+                     " %(progress.total_bytes_estimate)s %(progress.speed)s %(progress.eta)s")
+_PROGRESS_RE = re.compile(re.escape(PROGRESS_TAG) + r" (\S+) (\S+) (\S+) (\S+) (\S+)")
+
+# Current speed of every running download (all workers), read by the dashboard
+_speeds = {}
+_speeds_lock = threading.Lock()
+
+
+def total_speed() -> float:
+    """Tong toc do tai hien tai (bytes/s) cua moi link dang tai."""
+    with _speeds_lock:
+        return sum(_speeds.values())
+
+
+def parse_progress(line: str):
+    """Dong tien do CLI -> (downloaded, total, speed, eta) (None neu yt-dlp in NA), khong khop => None."""
+    m = _PROGRESS_RE.search(line)
+    if not m:
+        return None
+
+    def num(v):
+        try:
+            return float(v)
+        except ValueError:
+            return None
+    downloaded, total, estimate, speed, eta = (num(v) for v in m.groups())
+    return downloaded, total or estimate, speed, eta
+
+
+def fmt_bytes(n) -> str:
+    if not n:
+        return "0 MB"
+    if n >= 1024 ** 3:
+        return f"{n / 1024 ** 3:.2f} GB"
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def fmt_speed(bps) -> str:
+    return f"{(bps or 0) / (1024 * 1024):.2f} MB/s"
+
+
+def fmt_eta(seconds) -> str:
+    if seconds is None:
+        return "?"
+    m, s = divmod(int(seconds), 60)
+    return f"{m // 60}:{m % 60:02d}:{s:02d}" if m >= 60 else f"{m}:{s:02d}"
 
 
 class DownloadWorker(QThread):
-    """Worker thread để download video từ URL list."""
-    progress = pyqtSignal(int, str)   # (row_index, status_text)
-    log = pyqtSignal(str)
-    row_progress = pyqtSignal(int, int)  # (row_index, percent)
+    """Worker thread để download video từ URL list (song song, gioi han chung + theo nen tang).
+
+    Trang thai tung dong + log ghi vao self.state (state_hub.StateHub):
+        state.update(row, status=...)
+        state.update(row, percent=..., downloaded=..., total=..., speed=..., eta=...)
+    """
     finished = pyqtSignal(int, int)   # (success_count, error_count)
+    POOL_NAME = "download"            # ytdlp_pool of this kind of job (Stop kills only its own)
 
-    def __init__(self, tasks: list, output_dir: str, options: dict = None):
+    def __init__(self, tasks: list, output_dir: str, options: dict = None, hub=None):
         """
         tasks: list of {'url': str, 'row': int}
         options: dict with keys: quality, no_watermark, ytdlp_path, proxy, cookies_tiktok, cookies_instagram
+        hub: StateHub dung chung voi UI, None => tao moi (self.state)
         """
         super().__init__()
+        self.state = hub or state_hub.StateHub()
         self.tasks = tasks
         self.output_dir = output_dir
         self.options = options or {}
         self._stop = False
+        self._procs = set()
+        self._lock = threading.Lock()
+        self._success = 0
+        self._errors = 0
+        self._pool = None
+        self._sizes = {}       # row -> last known total bytes
+        self._archive = None
+        self._keys = {}        # row -> canonical (platform, video_id)
+        self._claimed = {}     # key -> row of this run downloading it
+        self._waiting = {}     # key -> tasks of other rows with the same video (wait for that row)
+        self._skipped = 0
 
     def stop(self):
+        """Dung queue va kill ngay cac yt-dlp dang tai."""
         self._stop = True
+        if self._pool is not None:
+            # The progress hook is not called while extracting or merging: kill the processes
+            ytdlp_pool.discard(self._pool, terminate=True)
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            proc_utils.terminate_async(proc)
 
-    def run(self):
+    def _configure(self) -> tuple:
+        """Doc tuy chon + chon backend (CLI / pool yt_dlp). Tra ve (gioi han chung, theo nen tang)."""
         s = settings.load_settings()
-        ytdlp = self.options.get("ytdlp_path") or s.get("ytdlp_path", "yt-dlp")
-        quality = self.options.get("quality") or s.get("download_quality", "best")
-        no_watermark = self.options.get("no_watermark", s.get("no_watermark_tiktok", True))
-        proxy = self.options.get("proxy") or s.get("proxy", "")
+        self._ytdlp = self.options.get("ytdlp_path") or s.get("ytdlp_path", "yt-dlp")
+        self._quality = self.options.get("quality") or s.get("download_quality", "best")
+        self._no_watermark = self.options.get("no_watermark", s.get("no_watermark_tiktok", True))
+        self._proxy = self.options.get("proxy") or s.get("proxy", "")
+        total_limit, limits = download_limits(s)
+        if s.get("download_archive_enabled", True):
+            self._archive = download_archive.get_archive()
+        if ytdlp_pool.is_selected(self._ytdlp):
+            if ytdlp_pool.available():
+                self._pool = ytdlp_pool.get_pool(total_limit, self.POOL_NAME)
+                self._pool.reset_cancel()
+                self.state.log("[Download] Dung yt_dlp API (process song lau)")
+            else:
+                self._ytdlp = "yt-dlp"
+                self.state.log("[WARN] Khong co module yt_dlp => chay yt-dlp CLI")
+        self._info = info_cache.get_info_cache()
+        return total_limit, limits
 
-        success = 0
-        errors = 0
+    def _pending_tasks(self) -> list:
+        waiting = [t for t in self.tasks if t["url"].strip()]
+        for t in waiting:
+            t["platform"] = self._detect_platform(t["url"])
+        return waiting
 
-        for task in self.tasks:
-            if self._stop:
-                break
+    def run(self):
+        total_limit, limits = self._configure()
+        waiting = self._pending_tasks()
+        self.state.log(f"[Download] {len(waiting)} URL, toi da {total_limit} luong"
+                       f" ({', '.join(f'{p} {n}' for p, n in limits.items())})")
+        run_limited(waiting, self._download_one, total_limit, limits, lambda: self._stop)
+
+        try:
+            os.rmdir(os.path.join(self.output_dir, ".ytdl_tmp"))
+        except OSError:
+            pass
+        if self._skipped:
+            self.state.log(f"[Download] Bo qua {self._skipped} link da tai truoc do")
 
-            url = task["url"].strip()
-            row = task["row"]
+        self.finished.emit(self._success, self._errors)
 
-            if not url:
-                continue
+    def _download_one(self, task: dict):
+        url = task["url"].strip()
+        row = task["row"]
+        if self._stop:
+            return
+        if self._archive is not None and self._already_have(task):
+            return
+        self.state.update(row, status="Dang tai...")
+        self.state.log(f"[Download] Bat dau tai: {url}")
 
-            self.progress.emit(row, "Dang tai...")
-            self.log.emit(f"[Download] Bat dau tai: {url}")
+        # Partial files go to a per-row temp dir so a cancel can clean them up
+        temp_dir = os.path.join(self.output_dir, ".ytdl_tmp", str(row)).replace("\\", "/")
+        run = self._run_api if self._pool is not None else self._run_cli
+        # Prefetched info skips a second extraction; its media links expire, hence the fallback
+        info_path = self._info.fresh_path(url, self._quality) or ""
+        try:
+            ok, err = run(url, row, task["platform"], temp_dir, info_path)
+            if not ok and info_path and not self._stop:
+                self.state.log(f"[WARN] Info luu san khong dung duoc, trich xuat lai: {url}")
+                self._info.invalidate(url, self._quality)
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                ok, err = run(url, row, task["platform"], temp_dir, "")
+        except Exception as e:
+            ok, err = False, f"Exception: {e}"
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        self._finish_row(url, row, ok, err, cancelled=self._stop and not ok)
 
-            # Detect platform
-            platform = self._detect_platform(url)
+    def _run_cli(self, url: str, row: int, platform: str, temp_dir: str, info_path: str) -> tuple:
+        cmd = self._build_command(url, platform, self._ytdlp, self._quality,
+                                  self._no_watermark, self._proxy, temp_dir, info_path)
+        proc = None
+        try:
+            # stderr is merged so one reader sees progress lines and errors without blocking
+            proc = proc_utils.popen_group(
+                cmd, shell=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding="utf-8", errors="replace", bufsize=1
+            )
+            with self._lock:
+                self._procs.add(proc)
+            if self._stop:
+                proc_utils.terminate_async(proc)
+            tail = collections.deque(maxlen=20)    # last non-progress lines, for the error log
+            for line in proc.stdout:
+                progress = parse_progress(line)
+                if progress is not None:
+                    self._report(row, *progress)
+                elif line.strip():
+                    tail.append(line.rstrip())
+            proc.wait()
+            errors = [l for l in tail if "ERROR" in l] or list(tail)
+            return proc.returncode == 0, "\n".join(errors)
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
 
-            # Build command
-            cmd = self._build_command(url, platform, ytdlp, quality, no_watermark, proxy)
+    def _already_have(self, task: dict) -> bool:
+        """Link da co trong archive => bo qua. Trung video voi dong khac dang tai cua lan nay =>
+        cho dong do (xong => "Da co", loi => dong nay tai thay)."""
+        url, row = task["url"].strip(), task["row"]
+        try:
+            # Short links are opened here, off the UI thread; the result is cached
+            key = self._archive.key_for(url, resolve=True, proxy=self._proxy)
+        except (OSError, ValueError) as e:
+            self.state.log(f"[WARN] Khong mo duoc link rut gon {url}: {e}")
+            return False
+        if key is None:
+            return False
+        if self._archive.has(key):
+            with self._lock:
+                self._skipped += 1
+            self.state.update(row, status="Da co")
+            self.state.log(f"[Download] Bo qua (da tai {key[0]} {key[1]}): {url}")
+            return True
+        with self._lock:
+            owner = self._claimed.get(key)
+            if owner is None:
+                self._claimed[key] = row
+                self._keys[row] = key
+                return False
+            self._waiting.setdefault(key, []).append(task)
+        self.state.update(row, status=f"Trung dong {owner + 1}")
+        self.state.log(f"[Download] Trung video voi dong {owner + 1}, cho dong do: {url}")
+        return True
 
-            try:
-                result = subprocess.run(
-                    cmd, shell=True,
-                    capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    success += 1
-                    settings.increment("stat_downloaded")
-                    self.progress.emit(row, "Xong")
-                    self.row_progress.emit(row, 100)
-                    self.log.emit(f"[OK] Tai thanh cong: {url}")
-                else:
-                    errors += 1
-                    settings.increment("stat_errors")
-                    self.progress.emit(row, "Loi")
-                    self.log.emit(f"[ERR] Loi tai {url}:\n{result.stderr[:300]}")
-            except Exception as e:
-                errors += 1
-                self.progress.emit(row, "Loi")
-                self.log.emit(f"[ERR] Exception: {e}")
-
-        self.finished.emit(success, errors)
+    def _run_api(self, url: str, row: int, platform: str, temp_dir: str, info_path: str) -> tuple:
+        opts = ytdlp_pool.build_options(platform, self._quality, self._no_watermark, self._proxy)
+        try:
+            return self._pool.download(url, opts, self.output_dir, temp_dir,
+                                       progress=lambda *p: self._report(row, *p), info_path=info_path)
+        except BrokenProcessPool as e:
+            if self._stop:
+                return False, "cancelled"
+            # A worker process died; drop the pool so the next run starts a fresh one
+            ytdlp_pool.discard(self._pool)
+            return False, f"process yt_dlp bi dung dot ngot ({e})"
+
+    def _report(self, row: int, downloaded, total, speed, eta):
+        """Tien do 1 dong (goi tu thread tai / thread doc tien do cua pool)."""
+        fields = {"downloaded": downloaded, "total": total, "speed": speed, "eta": eta}
+        if downloaded and total:
+            fields["percent"] = min(99.9, downloaded * 100.0 / total)
+        self.state.update(row, **fields)
+        if total:
+            self._sizes[row] = total
+        with _speeds_lock:
+            _speeds[(id(self), row)] = speed or 0.0
+
+    def _finish_row(self, url: str, row: int, ok: bool, err: str = "", cancelled: bool = False):
+        with _speeds_lock:
+            _speeds.pop((id(self), row), None)
+        self._release(row, ok, cancelled)
+        if cancelled:
+            self.state.update(row, status="Da dung", speed=None, eta=None)
+            self.state.log(f"[STOP] Huy tai: {url}")
+        elif ok:
+            with self._lock:
+                self._success += 1
+            if self._archive is not None:
+                self._archive.add(self._keys.get(row), url)
+            stats.incr(stats.DOWNLOADED)
+            total = self._sizes.pop(row, None)
+            self.state.update(row, status="Xong", percent=100, downloaded=total, total=total,
+                              speed=None, eta=None)
+            self.state.log(f"[OK] Tai thanh cong: {url}")
+        else:
+            with self._lock:
+                self._errors += 1
+            stats.incr(stats.ERRORS)
+            self.state.update(row, status="Loi", speed=None, eta=None)
+            self.state.log(f"[ERR] Loi tai {url}:\n{err[:300]}")
+
+    def _release(self, row: int, ok: bool, cancelled: bool):
+        """Dong da xong: cac dong trung video dang cho => "Da co" (ok) hoac dong dau tai thay."""
+        with self._lock:
+            key = self._keys.get(row)
+            if key is None or self._claimed.get(key) != row:
+                return
+            del self._claimed[key]
+            waiting = self._waiting.pop(key, [])
+            if ok:
+                self._skipped += len(waiting)
+        if ok:
+            for task in waiting:
+                self.state.update(task["row"], status="Da co")
+            return
+        if cancelled or self._stop:
+            for task in waiting:
+                self.state.update(task["row"], status="Da dung")
+            return
+        if waiting:
+            # The next duplicate downloads in this slot; the others now wait on it
+            with self._lock:
+                self._waiting[key] = waiting[1:]
+            self._download_one(waiting[0])
 
     def _detect_platform(self, url: str) -> str:
         url_lower = url.lower()
@@ -89,9 +366,13 @@ class DownloadWorker(QThread):
             return "facebook"
         return "auto"
 
-    def _build_command(self, url, platform, ytdlp, quality, no_watermark, proxy):
+    def _build_command(self, url, platform, ytdlp, quality, no_watermark, proxy, temp_dir="",
+                       info_path=""):
         output_dir = self.output_dir.replace("\\", "/")
-        output_template = f'"{output_dir}/%(title).80s.%(ext)s"'
+        output_template = '"%(title).80s.%(ext)s"'
+        paths = f'-P "home:{output_dir}" '
+        if temp_dir:
+            paths += f'-P "temp:{temp_dir}" '
 
         format_str = ""
         if quality == "best":
@@ -118,9 +399,90 @@ class DownloadWorker(QThread):
             f'{ytdlp} {format_str} '
             f'--merge-output-format mp4 '
             f'--no-playlist '
+            f'--newline --progress-template "download:{PROGRESS_TEMPLATE}" '
             f'--embed-thumbnail --embed-metadata '
-            f'-o {output_template} '
+            f'{paths}-o {output_template} '
             f'{extra} '
-            f'"{url}"'
+            + (f'--load-info-json "{info_path}"' if info_path else f'"{url}"')
         )
         return cmd
+
+    def _build_info_command(self, url, platform, ytdlp, quality, no_watermark, proxy):
+        """Lenh chi in info JSON (-J), cung format/header/proxy voi lenh tai."""
+        cmd = self._build_command(url, platform, ytdlp, quality, no_watermark, proxy)
+        # Reuse the download flags so the selected formats (and their sizes) match the real download
+        return cmd.replace(f'{ytdlp} ', f'{ytdlp} -J ', 1)
+
+
+class PrefetchWorker(DownloadWorker):
+    """Lay info (tieu de, thoi luong, dung luong) cua ca queue truoc khi tai, song song voi cung
+    gioi han nhu khi tai; info JSON luu vao info_cache de DownloadWorker dung lai.
+
+        state.update(row, title=..., duration=..., size=...)  hoac  state.update(row, info_error=...)
+    """
+
+    POOL_NAME = "prefetch"
+
+    def run(self):
+        total_limit, limits = self._configure()
+        waiting = []
+        for task in self._pending_tasks():
+            info = self._info.get(task["url"].strip(), self._quality)
+            if info is not None:
+                self.state.update(task["row"], **info_cache.summarize(info))
+            else:
+                waiting.append(task)
+        self.state.log(f"[Info] Lay thong tin {len(waiting)} link"
+                       f" ({len(self.tasks) - len(waiting)} da co trong cache)")
+        run_limited(waiting, self._fetch_one, total_limit, limits, lambda: self._stop)
+        self.finished.emit(self._success, self._errors)
+
+    def _fetch_one(self, task: dict):
+        url = task["url"].strip()
+        row = task["row"]
+        if self._stop:
+            return
+        try:
+            info = self._extract(url, task["platform"])
+            self._info.put(url, info, self._quality)
+        except Exception as e:
+            if self._stop:
+                return      # the pool was killed by Stop, not a real failure
+            with self._lock:
+                self._errors += 1
+            self.state.update(row, info_error=str(e)[:300] or type(e).__name__)
+            self.state.log(f"[WARN] Khong lay duoc thong tin {url}: {str(e)[:200]}")
+            return
+        with self._lock:
+            self._success += 1
+        self.state.update(row, **info_cache.summarize(info))
+
+    def _extract(self, url: str, platform: str) -> dict:
+        if self._pool is not None:
+            opts = ytdlp_pool.build_options(platform, self._quality, self._no_watermark, self._proxy)
+            try:
+                return self._pool.extract_info(url, opts)
+            except BrokenProcessPool as e:
+                if not self._stop:
+                    ytdlp_pool.discard(self._pool)
+                raise RuntimeError(f"process yt_dlp bi dung dot ngot ({e})")
+        cmd = self._build_info_command(url, platform, self._ytdlp, self._quality,
+                                       self._no_watermark, self._proxy)
+        proc = proc_utils.popen_group(
+            cmd, shell=True, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace"
+        )
+        with self._lock:
+            self._procs.add(proc)
+        try:
+            if self._stop:
+                proc_utils.terminate_async(proc)
+            out, err = proc.communicate()
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+        if proc.returncode != 0:
+            errors = [l for l in err.splitlines() if "ERROR" in l] or err.strip().splitlines()[-3:]
+            raise RuntimeError("\n".join(errors) or f"yt-dlp tra ve ma {proc.returncode}")
+        return json.loads(out)
@@ -0,0 +1,104 @@
+import re
+from collections import deque
+
+DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def format_eta(seconds) -> str:
+    if seconds is None or seconds < 0:
+        return "--:--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class StderrTail:
+    """Chi giu N dong cuoi cua stderr de bao loi, bo nho khong tang theo do dai job."""
+
+    def __init__(self, max_lines: int = 40):
+        self._lines = deque(maxlen=max_lines)
+
+    def append(self, line: str):
+        line = line.rstrip()
+        if line:
+            self._lines.append(line)
+
+    def text(self) -> str:
+        return "\n".join(self._lines)
+
+
+class ProgressParser:
+    """Parse tung dong key=value cua ffmpeg -progress, tra ve snapshot moi khi gap 'progress='."""
+
+    def __init__(self, duration: float = 0.0, to_output=None):
+        """duration: thoi luong input (0 => doc tu dong "Duration:" cua stderr).
+        to_output(input_duration): thoi luong output du kien (setpts, -t...), None => nhu input."""
+        self._to_output = to_output
+        self._known = bool(duration)
+        self.duration = self._output(duration) if duration else 0.0
+        self._fields = {}
+
+    def _output(self, duration: float) -> float:
+        return self._to_output(duration) if self._to_output else duration
+
+    def feed_stderr(self, line: str):
+        # Lay tong thoi luong tu dong "Duration:" neu chua biet
+        if self._known:
+            return
+        m = DURATION_RE.search(line)
+        if m:
+            h, mi, s = m.groups()
+            self._known = True
+            self.duration = self._output(int(h) * 3600 + int(mi) * 60 + float(s))
+
+    def feed(self, line: str):
+        line = line.strip()
+        if "=" not in line:
+            return None
+        key, _, value = line.partition("=")
+        self._fields[key] = value.strip()
+        if key != "progress":
+            return None
+        snap = self._snapshot(value.strip() == "end")
+        self._fields = {}
+        return snap
+
+    def _snapshot(self, done: bool) -> dict:
+        f = self._fields
+        out_time = 0.0
+        us = f.get("out_time_us") or f.get("out_time_ms")
+        if us and us.lstrip("-").isdigit():
+            out_time = max(0, int(us)) / 1_000_000
+        fps = _to_float(f.get("fps"))
+        speed = _to_float((f.get("speed") or "").rstrip("x"))
+
+        percent = 0
+        eta = None
+        if self.duration > 0:
+            percent = max(0, min(100, int(out_time * 100 / self.duration)))
+            if speed > 0:
+                eta = (self.duration - out_time) / speed
+        if done:
+            percent, eta = 100, 0
+        return {
+            "percent": percent,
+            "fps": fps,
+            "speed": speed,
+            "eta": eta,
+            "out_time": out_time,
+            "done": done,
+        }
+
+
+def describe(snap: dict) -> str:
+    """Chuoi ngan hien thi tren bang: '42% | 87 fps | 2.1x | ETA 03:12'."""
+    return (f"{snap['percent']}% | {snap['fps']:.0f} fps | {snap['speed']:.2f}x"
+            f" | ETA {format_eta(snap['eta'])}")
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,333 @@
+"""Toi uu chuoi filter video truoc khi encode.
+
+- Bo cap filter trung hoa nhau (hflip,hflip / vflip,vflip / transpose=1,transpose=2) va filter rong.
+- Gop cac eq lien tiep: contrast c1*c2, brightness c2*b1+b2, saturation s1*s2 - chi khi eq dau
+  khong the cat (clip) gia tri, neu khong phan bi cat o giua se mat khi gop.
+- Muc "aggressive" dua scale thu nho len truoc flip / negate, filter mau (eq, hue, curves, lut...),
+  vignette va noise/blur/sharpen de chung chay tren it pixel hon. Ket qua chi gan giong: vi tri
+  mau va lam tron cua swscale khong doi xung qua phep lat / 255-x (framemd5 khac het, tru scale
+  dung 1/2 voi hflip). Muc "safe" chi bo cac filter khong doi gi (null).
+
+Kiem tra ket qua tren 1 clip (so sanh framemd5 cua graph goc va graph da toi uu):
+    python filter_optimizer.py show scripts/20_combo_reup.txt [--aggressive]
+    python filter_optimizer.py verify scripts/20_combo_reup.txt clip.mp4 [--aggressive]
+"""
+import argparse
+import dataclasses
+import re
+import subprocess
+import sys
+
+from script_compiler import Filter, FilterChain, ScriptModel, compile_script
+
+LEVEL_OFF = "off"
+LEVEL_SAFE = "safe"
+LEVEL_AGGRESSIVE = "aggressive"
+LEVELS = (LEVEL_OFF, LEVEL_SAFE, LEVEL_AGGRESSIVE)
+
+# Filter doi cho voi scale ma frame van giong het (da verify framemd5)
+EXACT = {"null"}
+# Lat / dao mau: doi cho voi scale chi gan giong (swscale lam tron khong doi xung) => chi aggressive
+MIRROR = {"hflip", "vflip", "negate"}
+# Filter tung pixel nhung phi tuyen / co cat gia tri, hoac phu thuoc vi tri (vignette): chay sau
+# scale (da noi suy) thi pixel khac di => chi aggressive
+POINTWISE = {
+    "eq", "hue", "curves", "colorchannelmixer", "colorbalance", "colorlevels", "colorize",
+    "lut", "lutyuv", "lutrgb", "vibrance", "vignette",
+}
+# Filter co ban kinh tinh theo pixel: chay sau scale thi hat noise / do mo khac di (chi aggressive)
+NEIGHBORHOOD = {
+    "noise", "boxblur", "avgblur", "gblur", "smartblur", "unsharp", "cas", "deband",
+    "hqdn3d", "nlmeans", "atadenoise",
+}
+EQ_PARAMS = ["contrast", "brightness", "saturation", "gamma", "gamma_r", "gamma_g", "gamma_b",
+             "gamma_weight", "eval"]
+EQ_DEFAULTS = {"contrast": 1.0, "brightness": 0.0, "saturation": 1.0}
+EQ_RANGES = {"contrast": (-1000.0, 1000.0), "brightness": (-1.0, 1.0), "saturation": (0.0, 3.0)}
+TRANSPOSE_DIRS = {"0": 0, "1": 1, "2": 2, "3": 3,
+                  "cclock_flip": 0, "clock": 1, "cclock": 2, "clock_flip": 3}
+# Cap transpose trung hoa: clock + cclock, va 2 lan cung 1 phep lat qua duong cheo
+TRANSPOSE_INVERSE = {0: 0, 1: 2, 2: 1, 3: 3}
+SCALE_KEYS = {"w", "h", "width", "height", "force_original_aspect_ratio", "flags"}
+RATIO_RE = re.compile(r"^i([wh])\s*([*/])\s*([0-9.]+)$")
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.6g}"
+
+
+# ── tung luat ─────────────────────────────────────────────
+
+def _eq_values(filt: Filter):
+    """{contrast, brightness, saturation} dang so, None neu eq dung option khac / bieu thuc."""
+    positional, named = filt.params()
+    values = dict(EQ_DEFAULTS)
+    for key, raw in list(zip(EQ_PARAMS, positional)) + list(named.items()):
+        if key not in EQ_DEFAULTS:
+            return None
+        try:
+            values[key] = float(raw)
+        except ValueError:
+            return None
+    return values
+
+
+def _can_clip(values: dict) -> bool:
+    """eq co the day gia tri ra ngoai [0, max] (roi bi cat) khong."""
+    return (values["brightness"] != 0.0 or not 0.0 <= values["contrast"] <= 1.0
+            or not 0.0 <= values["saturation"] <= 1.0)
+
+
+def _fold_eq(a: dict, b: dict):
+    """eq(b) sau eq(a) thanh 1 eq; None neu eq(a) co the cat gia tri (phan bi cat khong lay lai
+    duoc, vd. contrast=2 roi contrast=0.5 khong phai la bo qua) hoac gia tri gop vuot gioi han."""
+    if _can_clip(a):
+        return None
+    folded = {
+        "contrast": a["contrast"] * b["contrast"],
+        "brightness": b["contrast"] * a["brightness"] + b["brightness"],
+        "saturation": a["saturation"] * b["saturation"],
+    }
+    for key, (lo, hi) in EQ_RANGES.items():
+        if not lo <= folded[key] <= hi:
+            return None
+    return folded
+
+
+def _eq_filter(values: dict, name: str = "eq"):
+    args = ":".join(f"{k}={_fmt(v)}" for k, v in values.items() if abs(v - EQ_DEFAULTS[k]) > 1e-9)
+    return Filter(name, args) if args else None
+
+
+def _transpose_dir(filt: Filter):
+    positional, named = filt.params()
+    if filt.name != "transpose" or "passthrough" in named:
+        return None
+    raw = named.get("dir", positional[0] if positional else "0")
+    return TRANSPOSE_DIRS.get(raw)
+
+
+def _cancels(a: Filter, b: Filter) -> bool:
+    if a.name in ("hflip", "vflip") and a.name == b.name and not a.args and not b.args:
+        return True
+    da, db = _transpose_dir(a), _transpose_dir(b)
+    return da is not None and db is not None and TRANSPOSE_INVERSE[da] == db
+
+
+def _scale_target(filt: Filter):
+    """(w, h, mode) cua scale: w/h la bieu thuc chuoi, mode theo force_original_aspect_ratio."""
+    positional, named = filt.params()
+    if set(named) - SCALE_KEYS:
+        return None
+    w = named.get("w", named.get("width", positional[0] if positional else None))
+    h = named.get("h", named.get("height", positional[1] if len(positional) > 1 else None))
+    mode = named.get("force_original_aspect_ratio", "disable")
+    return w, h, mode
+
+
+def _dim(expr, axis: str):
+    """Kich thuoc dau ra theo 1 truc: so pixel, hoac ('ratio', f) neu la iw/N, iw*f."""
+    if expr is None:
+        return None
+    expr = expr.strip()
+    m = RATIO_RE.match(expr)
+    if m and m.group(1) == axis:
+        f = float(m.group(3))
+        return ("ratio", 1 / f if m.group(2) == "/" else f) if f else None
+    try:
+        return float(expr)
+    except ValueError:
+        return None
+
+
+def _is_downscale(filt: Filter, size) -> bool:
+    """True neu scale chac chan lam giam so pixel (size = (w, h) dau vao neu biet)."""
+    target = _scale_target(filt)
+    if not target:
+        return False
+    w_expr, h_expr, mode = target
+    factors = []
+    for expr, axis, src in ((w_expr, "w", size[0] if size else 0),
+                            (h_expr, "h", size[1] if size else 0)):
+        d = _dim(expr, axis)
+        if isinstance(d, tuple):
+            factors.append(d[1])
+        elif d is None:
+            return False
+        elif d < 0:
+            factors.append(None)          # -1 / -2: giu ti le theo truc con lai
+        elif src:
+            factors.append(d / src)
+        else:
+            return False
+    fw, fh = factors
+    if fw is None and fh is None:
+        return False
+    fw = fh if fw is None else fw
+    fh = fw if fh is None else fh
+    if mode == "decrease":
+        return min(fw, fh) < 1
+    if mode == "increase":
+        return max(fw, fh) < 1
+    return fw <= 1 and fh <= 1 and (fw < 1 or fh < 1)
+
+
+# ── toi uu chuoi ──────────────────────────────────────────
+
+def optimize(chain: FilterChain, level: str = LEVEL_SAFE, size=None):
+    """Tra ve (FilterChain moi, [ghi chu]). size = (w, h) cua video vao neu biet (tu probe)."""
+    if level == LEVEL_OFF or not chain or not chain.is_simple:
+        return chain, []
+    notes = []
+    filters = [Filter(f.name, f.args) for f in chain.filters]
+
+    # 1. Bo filter rong va cap trung hoa (lap lai: hflip,vflip,vflip,hflip -> rong)
+    changed = True
+    while changed:
+        changed = False
+        for i, f in enumerate(filters):
+            if f.name == "null":
+                notes.append("bo null")
+                del filters[i]
+                changed = True
+                break
+            if i + 1 < len(filters) and _cancels(f, filters[i + 1]):
+                notes.append(f"bo cap {f.render()},{filters[i + 1].render()}")
+                del filters[i:i + 2]
+                changed = True
+                break
+
+    # 2. Gop eq lien tiep
+    out = []
+    for f in filters:
+        prev = out[-1] if out else None
+        if f.name == "eq" and prev is not None and prev.name == "eq":
+            a, b = _eq_values(prev), _eq_values(f)
+            folded = _fold_eq(a, b) if a is not None and b is not None else None
+            if folded is not None:
+                merged = _eq_filter(folded)
+                notes.append(f"gop {prev.render()} + {f.render()}")
+                out.pop()
+                if merged:
+                    out.append(merged)
+                continue
+        out.append(f)
+    filters = []
+    for f in out:
+        if f.name == "eq" and _eq_values(f) == EQ_DEFAULTS:
+            notes.append(f"bo {f.render()} (khong doi gi)")
+        else:
+            filters.append(f)
+
+    # 3. Dua scale thu nho len truoc cac filter khong doi kich thuoc (safe: chi EXACT)
+    movable = EXACT | (MIRROR | POINTWISE | NEIGHBORHOOD if level == LEVEL_AGGRESSIVE else set())
+    i = 0
+    while i < len(filters):
+        f = filters[i]
+        if f.name == "scale":
+            # Cac filter dung truoc scale chi giu nguyen kich thuoc neu deu thuoc movable
+            j = i
+            while j > 0 and filters[j - 1].name in movable:
+                j -= 1
+            in_size = size if all(x.name in EXACT | MIRROR | POINTWISE | NEIGHBORHOOD
+                                  for x in filters[:i]) else None
+            if j < i and _is_downscale(f, in_size):
+                passed = ",".join(x.name for x in filters[j:i])
+                notes.append(f"dua {f.render()} len truoc {passed}")
+                filters.insert(j, filters.pop(i))
+        i += 1
+
+    if not notes:
+        return chain, []
+    return FilterChain(filters=filters), notes
+
+
+def optimize_model(model: ScriptModel, level: str = LEVEL_SAFE, size=None):
+    """(ScriptModel voi -vf da toi uu, [ghi chu]); model goc giu nguyen."""
+    vf, notes = optimize(model.vf, level, size)
+    if not notes:
+        return model, []
+    return dataclasses.replace(model, vf=vf), notes
+
+
+# ── kiem tra bang framemd5 ────────────────────────────────
+
+def frame_hashes(clip: str, chain: FilterChain, ffmpeg: str = "ffmpeg", seconds: float = 5.0) -> list:
+    """md5 cua tung frame video sau chuoi filter (ffmpeg -f framemd5)."""
+    argv = [ffmpeg, "-v", "error", "-t", str(seconds), "-i", clip, "-an", "-sn"]
+    if chain:
+        argv += ["-vf", chain.render()]
+    argv += ["-f", "framemd5", "-"]
+    result = subprocess.run(argv, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip()[-300:])
+    lines = result.stdout.decode("utf-8", "replace").splitlines()
+    return [ln.rsplit(",", 1)[-1].strip() for ln in lines if ln and not ln.startswith("#")]
+
+
+def verify(model: ScriptModel, clip: str, level: str = LEVEL_SAFE, ffmpeg: str = "ffmpeg",
+           seconds: float = 5.0, size=None) -> dict:
+    """So sanh frame hash cua graph goc va graph da toi uu tren clip thu."""
+    optimized, notes = optimize_model(model, level, size)
+    original = frame_hashes(clip, model.vf, ffmpeg, seconds)
+    new = original if optimized is model else frame_hashes(clip, optimized.vf, ffmpeg, seconds)
+    matched = sum(1 for a, b in zip(original, new) if a == b)
+    return {
+        "original": model.vf.render(),
+        "optimized": optimized.vf.render(),
+        "notes": notes,
+        "frames": len(original),
+        "matched": matched,
+        "identical": len(original) == len(new) and matched == len(original),
+    }
+
+
+def _main(argv):
+    ap = argparse.ArgumentParser(prog="filter_optimizer.py")
+    ap.add_argument("action", choices=["show", "verify"])
+    ap.add_argument("script")
+    ap.add_argument("clip", nargs="?")
+    ap.add_argument("--aggressive", action="store_true")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--ffmpeg", default="ffmpeg")
+    args = ap.parse_args(argv[1:])
+    level = LEVEL_AGGRESSIVE if args.aggressive else LEVEL_SAFE
+    with open(args.script, "r", encoding="utf-8") as f:
+        model = compile_script(f.read(), args.script)
+
+    size = None
+    if args.clip:
+        import probe
+        try:
+            info = probe.probe(args.clip)
+            size = (info.width, info.height)
+        except probe.ProbeError as e:
+            print(f"[WARN] Khong probe duoc clip: {e}")
+
+    if args.action == "show":
+        optimized, notes = optimize_model(model, level, size)
+        print(f"Goc     : {model.vf.render() or '(khong co -vf)'}")
+        print(f"Toi uu  : {optimized.vf.render() or '(khong co -vf)'}")
+        for note in notes or ["khong co gi de toi uu"]:
+            print(f"  - {note}")
+        return 0
+
+    if not args.clip:
+        print("verify can clip thu: python filter_optimizer.py verify <script> <clip>")
+        return 1
+    try:
+        res = verify(model, args.clip, level, args.ffmpeg, args.seconds, size)
+    except (OSError, RuntimeError) as e:
+        print(f"[ERR] {e}")
+        return 1
+    print(f"Goc     : {res['original']}")
+    print(f"Toi uu  : {res['optimized']}")
+    for note in res["notes"]:
+        print(f"  - {note}")
+    state = "[OK] Giong het" if res["identical"] else "[DIFF] Khac"
+    print(f"{state}: {res['matched']}/{res['frames']} frame trung hash")
+    return 0 if res["identical"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,105 @@
+"""Hot folder: theo doi thu muc input, file video moi (da ghi xong) duoc day vao worker dang chay.
+
+Dung QFileSystemWatcher (inotify / ReadDirectoryChangesW) tren thu muc goc va cac thu muc con da
+quet; 1 loat thay doi lien tiep chi gay 1 lan quet. Neu khong watch duoc (o mang, qua gioi han
+inotify) thi quet dinh ky. File chi duoc coi la "xong" khi size + mtime dung yen stable_seconds.
+"""
+import os
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+import scanner
+
+DEBOUNCE_MS = 300
+
+
+class FolderWatcher(QObject):
+    files_ready = pyqtSignal(list)   # duong dan cac file moi da on dinh
+    log = pyqtSignal(str)
+
+    def __init__(self, folder: str, stable_seconds: float = 3.0, poll_seconds: float = 5.0,
+                 ignore=None, scan_options=None, parent=None):
+        """ignore: tap duong dan (abspath) da biet, khong bao lai (file da xu ly / dang trong bang).
+        scan_options: include/exclude/max_depth nhu scanner.scan (giong luc load bang).
+        """
+        super().__init__(parent)
+        self.folder = folder
+        self.stable_seconds = stable_seconds
+        self._scan_options = scan_options or {}
+        self._known = {os.path.abspath(p) for p in (ignore or ())}
+        self._pending = {}            # path -> (size, mtime_ns, thoi diem bat dau dung yen)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_changed)
+        # A burst of new files (a copy of many clips) is coalesced into one scan
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._scan)
+        # Polling runs anyway (slowly) as a safety net; it is the only source if watching failed
+        self._poll = QTimer(self)
+        self._poll.timeout.connect(self._scan)
+        self._poll_seconds = poll_seconds
+        # Stability checks only run while something is waiting to settle
+        self._settle = QTimer(self)
+        self._settle.setInterval(1000)
+        self._settle.timeout.connect(self._check_pending)
+
+    def start(self):
+        watching = self._watcher.addPath(self.folder)
+        interval = self._poll_seconds if watching else min(self._poll_seconds, 2.0)
+        self._poll.start(int(interval * 1000))
+        mode = "inotify/QFileSystemWatcher" if watching else f"quet moi {interval:g}s"
+        self.log.emit(f"[Hot folder] Theo doi {self.folder} ({mode})")
+        self._scan()
+
+    def stop(self):
+        self._poll.stop()
+        self._settle.stop()
+        self._debounce.stop()
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+
+    def mark_known(self, paths):
+        self._known.update(os.path.abspath(p) for p in paths)
+
+    def _on_changed(self, _path: str):
+        # Not restarted on every event: a steady stream still gets scanned every DEBOUNCE_MS
+        if not self._debounce.isActive():
+            self._debounce.start()
+
+    def _scan(self):
+        dirs = set()
+        for path, size, mtime_ns in scanner.scan(self.folder, on_dir=dirs.add, **self._scan_options):
+            path = os.path.abspath(path)
+            if path in self._known or path in self._pending:
+                continue
+            self._pending[path] = (size, mtime_ns, time.monotonic())
+        if self._pending and not self._settle.isActive():
+            self._settle.start()
+        # Subfolders within max_depth are watched too (new ones show up on the parent's change)
+        if self._watcher.directories():
+            new = dirs.difference(self._watcher.directories())
+            if new:
+                self._watcher.addPaths(sorted(new))
+
+    def _check_pending(self):
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]      # removed / renamed away while settling
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns) or st.st_size == 0:
+                self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.stable_seconds:
+                del self._pending[path]
+                ready.append(path)
+        if not self._pending:
+            self._settle.stop()
+        if ready:
+            self._known.update(ready)
+            self.files_ready.emit(sorted(ready))
@@ -0,0 +1,118 @@
+"""Cache info JSON cua yt-dlp (tieu de, thoi luong, format, dung luong) tren dia, co han (TTL).
+
+Buoc "Lay thong tin" cua tab tai ghi info vao cache/info/<platform>_<id>_<quality>.json (format
+duoc chon va dung luong phu thuoc chat luong); khi tai that, DownloadWorker dung lai file nay
+(--load-info-json / download_with_info_file) thay vi trich xuat lai. Link video trong info het
+han sau vai gio (YouTube ~6h) nen TTL mac dinh 2h.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import download_archive
+import settings
+
+INFO_DIR = os.path.join("cache", "info")
+
+
+def estimate_size(info: dict):
+    """Dung luong du kien (bytes) cua format duoc chon; None neu yt-dlp khong biet."""
+    formats = info.get("requested_formats") or [info]
+    sizes = [f.get("filesize") or f.get("filesize_approx") for f in formats]
+    if sizes and all(sizes):
+        return int(sum(sizes))
+    if info.get("tbr") and info.get("duration"):
+        return int(info["tbr"] * 1000 / 8 * info["duration"])
+    return None
+
+
+def summarize(info: dict) -> dict:
+    """Phan hien thi trong queue: title, duration (giay), size (bytes), height."""
+    return {"title": info.get("title") or "", "duration": info.get("duration"),
+            "size": estimate_size(info), "height": info.get("height")}
+
+
+class InfoCache:
+    """File JSON moi (video, chat luong); ten file theo khoa chuan (platform, id), khong co thi hash URL."""
+
+    def __init__(self, folder: str = INFO_DIR, ttl_minutes: float = 120):
+        # Absolute: the path is handed to yt-dlp processes (--load-info-json)
+        self.folder = os.path.abspath(folder)
+        self.ttl = ttl_minutes * 60
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, url: str, quality: str = "best") -> str:
+        key = download_archive.get_archive().key_for(url)
+        if key is not None:
+            name = f"{key[0]}_{key[1]}"
+        else:
+            name = "url_" + hashlib.sha1(download_archive.normalize(url).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.folder, f"{name}_{quality or 'best'}.json")
+
+    def fresh_path(self, url: str, quality: str = "best"):
+        """Duong dan info con han cua URL o chat luong quality, None neu chua co / het han."""
+        path = self.path_for(url, quality)
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def get(self, url: str, quality: str = "best"):
+        path = self.fresh_path(url, quality)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, info: dict, quality: str = "best") -> str:
+        """Ghi info (file tam + os.replace => worker tai khong doc phai file do)."""
+        path = self.path_for(url, quality)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    def invalidate(self, url: str, quality: str = "best"):
+        try:
+            os.remove(self.path_for(url, quality))
+        except OSError:
+            pass
+
+    def prune(self) -> int:
+        """Xoa file het han. Tra ve so file da xoa."""
+        removed = 0
+        now = time.time()
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.folder, name)
+            try:
+                if now - os.path.getmtime(path) >= self.ttl:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_info_cache() -> InfoCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = InfoCache(ttl_minutes=float(settings.get("info_cache_ttl_minutes", 120)))
+            _cache.prune()
+        return _cache
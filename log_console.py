@@ -0,0 +1,199 @@
+"""Log chung cho cac tab: view gioi han so dong, cap nhat theo lo (toi da log_fps lan/giay),
+ghi day du ra file xoay vong (logs/app.log) tren thread rieng qua QueueHandler/QueueListener.
+
+Moi tab dung 1 LogConsole(source); level suy ra tu tag trong message ([ERR], [WARN]...),
+co loc theo level va tim kiem. recent_logs trong settings giu vai tram dong cuoi khi tat app
+de lan mo sau con xem duoc.
+"""
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QComboBox, QLineEdit, QPushButton, QLabel
+)
+from PyQt5.QtCore import QTimer
+
+import settings
+
+LOG_DIR = "logs"
+LOG_FILE = "app.log"
+RECENT_MAX = 200
+
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+# Tag -> level; per-file detail lines count as DEBUG so they can be hidden
+TAG_LEVELS = [
+    (("[ERR]", "[Loi]", "Loi:"), logging.ERROR),
+    (("[WARN]", "[STOP]"), logging.WARNING),
+    (("[Cache]", "[Plan]", "[Filter]", "[Segment]", "[Schedule]", "[Probe]"), logging.DEBUG),
+]
+LEVEL_COLORS = {logging.ERROR: "#f85149", logging.WARNING: "#e3b341", logging.DEBUG: "#8b949e"}
+
+
+def level_of(msg: str) -> int:
+    for tags, level in TAG_LEVELS:
+        if any(tag in msg for tag in tags):
+            return level
+    return logging.INFO
+
+
+class LogHub:
+    """Logger "reupvideo" ghi ra file xoay vong tren thread nen + bo dem recent_logs."""
+
+    def __init__(self, folder: str = LOG_DIR, max_mb: float = 5, backups: int = 5):
+        self.logger = logging.getLogger("reupvideo")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.recent = collections.deque(settings.get("recent_logs", []) or [], maxlen=RECENT_MAX)
+        self._listener = None
+        try:
+            os.makedirs(folder, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(folder, LOG_FILE), maxBytes=int(max_mb * 1024 * 1024),
+                backupCount=backups, encoding="utf-8", delay=True)
+        except OSError as e:
+            print(f"[Log] Khong mo duoc file log: {e}")
+            return
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+        # The GUI thread only enqueues; disk I/O happens on the listener thread
+        q = queue.Queue(-1)
+        self.logger.addHandler(logging.handlers.QueueHandler(q))
+        self._listener = logging.handlers.QueueListener(q, handler, respect_handler_level=False)
+        self._listener.start()
+
+    def emit(self, source: str, level: int, msg: str):
+        self.logger.getChild(source).log(level, msg)
+        self.recent.append({"t": time.time(), "src": source, "level": level, "msg": msg})
+
+    def close(self):
+        """Luu recent_logs va doi ghi het file log (goi khi tat app)."""
+        settings.set_value("recent_logs", list(self.recent))
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+
+
+_hub = None
+
+
+def get_hub() -> LogHub:
+    global _hub
+    if _hub is None:
+        s = settings.load_settings()
+        _hub = LogHub(max_mb=float(s.get("log_file_max_mb", 5)),
+                      backups=int(s.get("log_file_backups", 5)))
+        atexit.register(_hub.close)
+    return _hub
+
+
+class LogConsole(QWidget):
+    """View log cua 1 tab: ring buffer max_lines dong, flush theo lo, loc level + tim kiem."""
+
+    def __init__(self, source: str, font=None, parent=None):
+        super().__init__(parent)
+        s = settings.load_settings()
+        self.source = source
+        self.max_lines = int(s.get("log_max_lines", 5000))
+        self._hub = get_hub()
+        self._lines = collections.deque(maxlen=self.max_lines)   # (level, text)
+        self._pending = []
+        self._min_level = logging.getLevelName(s.get("log_level", "INFO"))
+        self._search = ""
+
+        lay = QVBoxLayout(self)
+        lay.setContentsMargins(0, 0, 0, 0)
+        lay.setSpacing(4)
+        bar = QHBoxLayout()
+        bar.addWidget(QLabel("Level:"))
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(LEVELS)
+        self.level_combo.setCurrentText(logging.getLevelName(self._min_level))
+        self.level_combo.currentTextChanged.connect(self._on_level)
+        bar.addWidget(self.level_combo)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Tim trong log...")
+        self.search_input.textChanged.connect(self._on_search)
+        bar.addWidget(self.search_input, stretch=1)
+        btn_clear = QPushButton("Xoa")
+        btn_clear.setObjectName("btn_flat")
+        btn_clear.clicked.connect(self.clear)
+        bar.addWidget(btn_clear)
+        lay.addLayout(bar)
+
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        # The document itself is capped too: old blocks are dropped as new ones arrive
+        self.view.setMaximumBlockCount(self.max_lines)
+        if font is not None:
+            self.view.setFont(font)
+        lay.addWidget(self.view)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(16, int(1000 / max(1, float(s.get("log_fps", 10))))))
+        self._timer.timeout.connect(self.flush)
+
+        for rec in self._hub.recent:
+            if rec.get("src") == source:
+                stamp = time.strftime("%H:%M:%S", time.localtime(rec.get("t", 0)))
+                self._lines.append((rec.get("level", logging.INFO), f"{stamp} {rec.get('msg', '')}"))
+        self._rebuild()
+
+    def log(self, msg: str, level: int = None):
+        """Them 1 dong (re: chi dua vao hang doi, view cap nhat o lan flush tiep theo)."""
+        level = level_of(msg) if level is None else level
+        self._hub.emit(self.source, level, msg)
+        entry = (level, f"{time.strftime('%H:%M:%S')} {msg}")
+        self._lines.append(entry)
+        self._pending.append(entry)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _visible(self, entry) -> bool:
+        level, text = entry
+        return level >= self._min_level and (not self._search or self._search in text.lower())
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        # Only the tail can survive the block cap, so older pending lines are not rendered
+        shown = [e for e in pending[-self.max_lines:] if self._visible(e)]
+        if not shown:
+            return
+        bar = self.view.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 4
+        self.view.appendHtml("".join(self._html(e) for e in shown))
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
+    def _html(self, entry) -> str:
+        level, text = entry
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        color = LEVEL_COLORS.get(level)
+        # One <div> per line => one document block, so the block cap counts lines
+        return f'<div style="color:{color}">{text}</div>' if color else f"<div>{text}</div>"
+
+    def _rebuild(self):
+        self._pending = []
+        self.view.clear()
+        shown = [self._html(e) for e in self._lines if self._visible(e)]
+        if shown:
+            self.view.appendHtml("".join(shown))
+        bar = self.view.verticalScrollBar()
+        bar.setValue(bar.maximum())
+
+    def _on_level(self, name: str):
+        self._min_level = logging.getLevelName(name)
+        settings.set_value("log_level", name)
+        self._rebuild()
+
+    def _on_search(self, text: str):
+        self._search = text.strip().lower()
+        self._rebuild()
+
+    def clear(self):
+        self._lines.clear()
+        self._rebuild()
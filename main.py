@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 import urllib.request
 
 # Ensure working directory is the app's directory
@@ -61,4 +62,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed by the yt_dlp process pool when the app is frozen (PyInstaller) on Windows
+    multiprocessing.freeze_support()
     main()
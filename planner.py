@@ -0,0 +1,238 @@
+"""Chon cach xu ly re nhat cho tung input: remux (copy), chi xu ly audio, hay encode day du.
+
+Vi du: script "fps=30" tren video da 30fps, scale 720x1280 tren file da 720x1280, hay
+"-c:v libx264 -c:a aac" tren file da la H.264/AAC => khong can encode lai video.
+"""
+from dataclasses import dataclass
+
+from script_compiler import ENCODER_OPTS, FilterChain, ScriptModel
+
+MODE_COPY = "copy"        # remux: -c copy, khong filter
+MODE_AUDIO = "audio"      # copy video, chi xu ly audio
+MODE_ENCODE = "encode"    # chay script nguyen ban
+
+MODE_LABELS = {
+    MODE_COPY: "remux (copy)",
+    MODE_AUDIO: "copy video + xu ly audio",
+    MODE_ENCODE: "encode day du",
+}
+
+# Encoder -> codec_name ma ffprobe bao cho stream da encode bang encoder do
+ENCODER_CODECS = {
+    "libx264": "h264", "h264": "h264", "h264_nvenc": "h264", "h264_qsv": "h264", "h264_amf": "h264",
+    "libx265": "hevc", "hevc": "hevc", "hevc_nvenc": "hevc", "hevc_qsv": "hevc",
+    "libvpx": "vp8", "libvpx-vp9": "vp9", "libaom-av1": "av1", "libsvtav1": "av1",
+    "mpeg4": "mpeg4",
+    "aac": "aac", "libfdk_aac": "aac", "libmp3lame": "mp3", "libopus": "opus",
+    "libvorbis": "vorbis", "ac3": "ac3", "flac": "flac",
+}
+# Codec dat duoc vao container nao khi remux
+CONTAINER_CODECS = {
+    ".mp4": {"h264", "hevc", "mpeg4", "av1", "aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"},
+    ".mov": {"h264", "hevc", "mpeg4", "prores", "aac", "mp3", "ac3", "alac", "pcm_s16le"},
+    ".webm": {"vp8", "vp9", "av1", "opus", "vorbis"},
+}
+# Encoder ffmpeg tu chon theo duoi file khi script khong ghi -c:v / -c:a
+DEFAULT_ENCODERS = {
+    ".mp4": {"v": "libx264", "a": "aac"},
+    ".mov": {"v": "libx264", "a": "aac"},
+    ".m4v": {"v": "libx264", "a": "aac"},
+    ".mkv": {"v": "libx264", "a": "libvorbis"},
+    ".webm": {"v": "libvpx-vp9", "a": "libopus"},
+}
+# Option output van dung khi copy stream (khong lien quan encoder)
+COPY_SAFE_OPTS = {"-movflags", "-f", "-shortest", "-an", "-vn", "-sn", "-dn",
+                  "-map_metadata", "-metadata", "-map_chapters"}
+VIDEO_ENCODER_OPTS = (ENCODER_OPTS - {"-b:a", "-q:a", "-movflags", "-f"}) | {"-pix_fmt", "-r", "-s", "-aspect"}
+
+
+@dataclass
+class Plan:
+    mode: str
+    model: ScriptModel
+    reason: str = ""
+
+    def describe(self) -> str:
+        label = MODE_LABELS[self.mode]
+        return f"{label} ({self.reason})" if self.reason else label
+
+
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _arg(filt, index: int, name: str):
+    positional, named = filt.params()
+    if name in named:
+        return named[name]
+    return positional[index] if index < len(positional) else None
+
+
+def _same_fps(a: float, b: float) -> bool:
+    return a > 0 and b > 0 and abs(a - b) < 0.01
+
+
+def _video_filter_noop(filt, info) -> bool:
+    """True neu filter khong lam thay doi video nay."""
+    name = filt.name.split("@")[0]
+    if name in ("null", "copy"):
+        return True
+    if name == "fps":
+        fps = _arg(filt, 0, "fps")
+        return fps is not None and _same_fps(_num(fps) or 0, info.fps)
+    if name == "scale":
+        w, h = _num(_arg(filt, 0, "w") or _arg(filt, 0, "width")), _num(_arg(filt, 1, "h") or _arg(filt, 1, "height"))
+        _, named = filt.params()
+        if set(named) - {"w", "h", "width", "height", "force_original_aspect_ratio", "flags"}:
+            return False
+        if w is None or h is None:
+            return False
+        ok_w = w == info.width or (w in (-1, -2) and h == info.height)
+        ok_h = h == info.height or (h in (-1, -2) and w == info.width)
+        # -2 lam tron ve so chan => chi no-op khi kich thuoc goc da chan
+        if (w == -2 and info.width % 2) or (h == -2 and info.height % 2):
+            return False
+        return ok_w and ok_h and not (w < 0 and h < 0)
+    if name == "pad":
+        w, h = _num(_arg(filt, 0, "w") or _arg(filt, 0, "width")), _num(_arg(filt, 1, "h") or _arg(filt, 1, "height"))
+        return w == info.width and h == info.height
+    if name == "setsar":
+        sar = (_arg(filt, 0, "sar") or _arg(filt, 0, "r") or "").replace("/", ":")
+        return sar in ("1", "1:1") and info.sar in ("", "0:1", "1:1", "N/A")
+    if name == "format":
+        return (_arg(filt, 0, "pix_fmts") or "") == info.pix_fmt
+    return False
+
+
+def _audio_filter_noop(filt, info) -> bool:
+    name = filt.name.split("@")[0]
+    if name in ("anull", "acopy"):
+        return True
+    if name == "volume":
+        return _num(_arg(filt, 0, "volume")) == 1.0
+    if name == "aresample":
+        return _num(_arg(filt, 0, "sample_rate")) == info.sample_rate
+    return False
+
+
+def _chain_noop(chain: FilterChain, info, check) -> bool:
+    if not chain:
+        return True
+    return chain.is_simple and all(check(f, info) for f in chain.filters)
+
+
+def _stream_copyable(model: ScriptModel, kind: str, codec_name: str, check, info) -> str:
+    """"" neu stream copy duoc (ket qua giong nhu encode theo script), nguoc lai la ly do."""
+    chain = model.vf if kind == "v" else model.af
+    if not _chain_noop(chain, info, check):
+        return "filter " + ("video" if kind == "v" else "audio")
+    # No -c:v/-c:a => ffmpeg re-encodes with the container's default encoder
+    encoder = model.codec(kind) or DEFAULT_ENCODERS.get(model.ext.lower(), {}).get(kind)
+    if not encoder:
+        return f"khong ro encoder mac dinh cua {model.ext}"
+    if encoder != "copy" and ENCODER_CODECS.get(encoder) != codec_name:
+        return f"doi codec {codec_name} -> {encoder}"
+    allowed = CONTAINER_CODECS.get(model.ext.lower())
+    if allowed is not None and codec_name not in allowed:
+        return f"{codec_name} khong hop {model.ext}"
+    return ""
+
+
+def _video_options_noop(model: ScriptModel, info) -> str:
+    for opt, value in model.options:
+        if opt == "-r" and _same_fps(_num(value) or 0, info.fps):
+            continue
+        if opt == "-pix_fmt" and value == info.pix_fmt:
+            continue
+        if opt in VIDEO_ENCODER_OPTS:
+            return f"option {opt}"
+    return ""
+
+
+def _copy_model(model: ScriptModel, keep_audio: bool) -> ScriptModel:
+    """Ban sao cua model voi video (va audio neu keep_audio=False) duoc copy."""
+    if keep_audio:
+        codecs = {"v": "copy"}
+        if model.codec("a"):
+            codecs["a"] = model.codec("a")
+        af = model.af
+        options = [(o, v) for o, v in model.options if o not in VIDEO_ENCODER_OPTS]
+    else:
+        # Chi copy v/a: subtitle van theo encoder mac dinh cua container nhu lenh goc
+        codecs = {"v": "copy", "a": "copy"}
+        af = FilterChain()
+        options = [(o, v) for o, v in model.options if o in COPY_SAFE_OPTS]
+    return ScriptModel(binary=model.binary, global_opts=list(model.global_opts),
+                       inputs=model.inputs, vf=FilterChain(), af=af, codecs=codecs,
+                       options=options, output=model.output, name=model.name)
+
+
+def plan(model: ScriptModel, info) -> Plan:
+    """Chon Plan re nhat cho cap (script, input) dua tren MediaInfo cua input."""
+    encode = Plan(MODE_ENCODE, model)
+    if model.filter_complex or model.extra_inputs() or model.has("-map"):
+        encode.reason = "lenh phuc tap"
+        return encode
+    if model.main_input.options:
+        encode.reason = "co option input (-ss...)"
+        return encode
+    if any(opt in ("-t", "-to", "-ss", "-frames:v", "-vframes") for opt, _ in model.options):
+        # Cat bang stream copy chi chinh xac theo keyframe
+        encode.reason = "co cat thoi gian"
+        return encode
+    if not info.has_video or model.has("-vn"):
+        encode.reason = "khong co video"
+        return encode
+
+    if info.rotation and model.vf:
+        # ffmpeg autorotates before the filters, so checks on coded width/height do not apply
+        encode.reason = f"video xoay {info.rotation} do"
+        return encode
+
+    why = (_stream_copyable(model, "v", info.vcodec, _video_filter_noop, info)
+           or _video_options_noop(model, info))
+    if why:
+        encode.reason = why
+        return encode
+
+    if not info.has_audio or model.has("-an"):
+        audio_why = ""
+    else:
+        audio_why = _stream_copyable(model, "a", info.acodec, _audio_filter_noop, info)
+        if not audio_why and any(o in ("-b:a", "-q:a", "-ar", "-ac") for o, _ in model.options):
+            audio_why = "option audio"
+    if audio_why and model.codec("a") == "copy":
+        encode.reason = audio_why
+        return encode
+    if audio_why:
+        return Plan(MODE_AUDIO, _copy_model(model, keep_audio=True), audio_why)
+    return Plan(MODE_COPY, _copy_model(model, keep_audio=False), info.summary())
+
+
+# ── Uoc luong chi phi (dung de xep lich) ───────────────────
+
+# Thoi gian encode tuong doi cua libx264 theo preset (medium = 1)
+PRESET_COST = {
+    "ultrafast": 0.25, "superfast": 0.35, "veryfast": 0.5, "faster": 0.7, "fast": 0.85,
+    "medium": 1.0, "slow": 1.8, "slower": 3.0, "veryslow": 6.0, "placebo": 12.0,
+}
+ENCODER_COST = {"libx265": 3.0, "libvpx-vp9": 4.0, "libaom-av1": 8.0, "libsvtav1": 2.5}
+# Filter nang hon muc trung binh (tinh them vao chi phi cua 1 filter)
+HEAVY_FILTERS = {"minterpolate": 8.0, "nlmeans": 6.0, "hqdn3d": 0.6, "noise": 0.4, "boxblur": 0.5,
+                 "gblur": 0.5, "smartblur": 0.6, "unsharp": 0.3, "zoompan": 1.0, "loudnorm": 0.2}
+
+
+def estimate_cost(model: ScriptModel) -> float:
+    """Chi phi xu ly uoc luong cho 1 giay video (don vi: 1 = libx264 medium, khong filter)."""
+    if model.codec("v") == "copy" and not model.vf:
+        return 0.05 + (0.1 if model.af else 0.0)
+    cost = PRESET_COST.get(model.option("-preset", "medium"), 1.0)
+    cost *= ENCODER_COST.get(model.codec("v"), 1.0)
+    filters = model.vf.filters if model.vf.is_simple else []
+    cost += sum(0.1 + HEAVY_FILTERS.get(f.name, 0.0) for f in filters)
+    if model.filter_complex or (model.vf and not model.vf.is_simple):
+        cost += 0.5
+    return cost
@@ -0,0 +1,226 @@
+"""Doc thong tin media (ffprobe): thoi luong, do phan giai, fps, codec, audio...
+
+Ket qua luu trong index SQLite (cache/probe_index.sqlite) theo (path, size, mtime): moi file chi
+probe 1 lan, file bi sua (doi size/mtime) thi probe lai.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, asdict, fields
+
+import settings
+
+INDEX_PATH = os.path.join("cache", "probe_index.sqlite")
+
+
+class ProbeError(RuntimeError):
+    """ffprobe khong chay duoc hoac file khong doc duoc."""
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    duration: float = 0.0
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0
+    vcodec: str = ""
+    acodec: str = ""
+    pix_fmt: str = ""
+    sar: str = ""
+    sample_rate: int = 0
+    channels: int = 0
+    bitrate: int = 0
+    format_name: str = ""
+    has_video: bool = False
+    has_audio: bool = False
+    rotation: int = 0          # do xoay hien thi (displaymatrix / tag rotate), 0/90/180/270
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        """Chuoi ngan: '1920x1080 30fps h264/aac'."""
+        parts = []
+        if self.has_video:
+            parts.append(f"{self.width}x{self.height} {self.fps:g}fps")
+        codecs = "/".join(c for c in (self.vcodec, self.acodec) if c)
+        if codecs:
+            parts.append(codecs)
+        return " ".join(parts) or "?"
+
+
+MEDIA_FIELDS = {f.name for f in fields(MediaInfo)}
+
+
+def ffprobe_path() -> str:
+    """ffprobe nam canh ffmpeg trong settings (ffmpeg.exe -> ffprobe.exe)."""
+    ffmpeg = settings.get("ffmpeg_path", "ffmpeg") or "ffmpeg"
+    folder, name = os.path.split(ffmpeg)
+    if name.lower().startswith("ffmpeg"):
+        name = "ffprobe" + name[len("ffmpeg"):]
+    else:
+        name = "ffprobe"
+    return os.path.join(folder, name) if folder else name
+
+
+def _rate(value: str) -> float:
+    num, _, den = (value or "0").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _rotation(stream: dict) -> int:
+    """Goc xoay cua stream video: side data displaymatrix (ffprobe moi) hoac tag rotate (cu)."""
+    for side in stream.get("side_data_list") or []:
+        if "rotation" in side:
+            return _int(side["rotation"]) % 360
+    return _int((stream.get("tags") or {}).get("rotate")) % 360
+
+
+def parse(path: str, data: dict) -> MediaInfo:
+    """Dung MediaInfo tu output JSON cua ffprobe -show_streams -show_format."""
+    info = MediaInfo(path=path)
+    fmt = data.get("format", {})
+    info.duration = float(fmt.get("duration") or 0)
+    info.bitrate = _int(fmt.get("bit_rate"))
+    info.format_name = fmt.get("format_name", "")
+    for st in data.get("streams", []):
+        disposition = st.get("disposition", {})
+        if st.get("codec_type") == "video" and not info.has_video and not disposition.get("attached_pic"):
+            info.has_video = True
+            info.vcodec = st.get("codec_name", "")
+            info.width = _int(st.get("width"))
+            info.height = _int(st.get("height"))
+            info.fps = round(_rate(st.get("avg_frame_rate")) or _rate(st.get("r_frame_rate")), 3)
+            info.pix_fmt = st.get("pix_fmt", "")
+            info.sar = st.get("sample_aspect_ratio", "")
+            info.rotation = _rotation(st)
+            if not info.duration:
+                info.duration = float(st.get("duration") or 0)
+        elif st.get("codec_type") == "audio" and not info.has_audio:
+            info.has_audio = True
+            info.acodec = st.get("codec_name", "")
+            info.sample_rate = _int(st.get("sample_rate"))
+            info.channels = _int(st.get("channels"))
+    return info
+
+
+class ProbeIndex:
+    """Index SQLite path -> MediaInfo, hop le khi size + mtime khong doi. Thread-safe."""
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " info TEXT, probed_at REAL)")
+
+    def get(self, path: str, size: int, mtime_ns: int):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, info FROM media WHERE path = ?", (path,)).fetchone()
+        if not row or row[0] != size or row[1] != mtime_ns:
+            return None
+        try:
+            data = json.loads(row[2])
+        except ValueError:
+            return None
+        # Entries written before a field was added (e.g. rotation) are re-probed
+        if set(data) != MEDIA_FIELDS:
+            return None
+        return MediaInfo(**data)
+
+    def put(self, info: MediaInfo, size: int, mtime_ns: int):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO media (path, size, mtime_ns, info, probed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (info.path, size, mtime_ns, json.dumps(info.to_dict()), time.time()))
+
+    def purge_missing(self) -> int:
+        """Xoa entry cua file khong con ton tai. Tra ve so entry da xoa."""
+        with self._lock:
+            paths = [r[0] for r in self._db.execute("SELECT path FROM media")]
+        gone = [(p,) for p in paths if not os.path.exists(p)]
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM media WHERE path = ?", gone)
+        return len(gone)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ProbeIndex:
+    """Index dung chung trong process (UI + worker)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProbeIndex()
+        return _index
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        raise ProbeError(str(e))
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def cached(path: str):
+    """MediaInfo trong index neu con hop le, None neu chua probe (khong chay ffprobe)."""
+    try:
+        key, size, mtime_ns = _stat(path)
+    except ProbeError:
+        return None
+    return get_index().get(key, size, mtime_ns)
+
+
+def probe(path: str, ffprobe: str = None, timeout: float = 30) -> MediaInfo:
+    """MediaInfo tu index, chua co (hoac file da doi) thi chay ffprobe. Raise ProbeError neu loi."""
+    key, size, mtime_ns = _stat(path)
+    index = get_index()
+    info = index.get(key, size, mtime_ns)
+    if info:
+        return info
+
+    cmd = [ffprobe or ffprobe_path(), "-v", "error", "-print_format", "json",
+           "-show_format", "-show_streams", path]
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise ProbeError(f"Khong chay duoc ffprobe: {e}")
+    if result.returncode != 0:
+        raise ProbeError(result.stderr.decode("utf-8", "replace").strip()[-200:] or "ffprobe loi")
+    try:
+        info = parse(key, json.loads(result.stdout.decode("utf-8", "replace")))
+    except ValueError as e:
+        raise ProbeError(f"Output ffprobe khong hop le: {e}")
+    index.put(info, size, mtime_ns)
+    return info
+
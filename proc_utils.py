@@ -0,0 +1,71 @@
+import os
+import signal
+import subprocess
+import threading
+
+IS_WINDOWS = os.name == "nt"
+
+
+def popen_group(cmd, **kwargs) -> subprocess.Popen:
+    """Popen trong process group rieng de co the kill ca cay tien trinh (shell + ffmpeg/yt-dlp)."""
+    if IS_WINDOWS:
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(cmd, **kwargs)
+
+
+def terminate_tree(proc: subprocess.Popen, timeout: float = 3.0):
+    """Dung mem (SIGTERM / CTRL_BREAK), qua timeout thi kill cung ca process group."""
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        if IS_WINDOWS:
+            proc.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            os.killpg(proc.pid, signal.SIGTERM)
+    except OSError:
+        pass
+    try:
+        proc.wait(timeout=timeout)
+        return
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        if IS_WINDOWS:
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                           capture_output=True)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+def kill_pid_tree(pid: int):
+    """Kill cung process pid va cac process con (pid phai la truong nhom tren POSIX)."""
+    try:
+        if IS_WINDOWS:
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(pid)], capture_output=True)
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def terminate_async(proc: subprocess.Popen, timeout: float = 3.0):
+    """Goi terminate_tree tren thread rieng de khong chan UI thread."""
+    if proc is None or proc.poll() is not None:
+        return
+    threading.Thread(target=terminate_tree, args=(proc, timeout), daemon=True).start()
+
+
+def remove_quietly(path: str):
+    try:
+        if path and os.path.isfile(path):
+            os.remove(path)
+    except OSError:
+        pass
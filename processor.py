@@ -1,109 +1,746 @@
+import io
 import os
+import queue
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from PyQt5.QtCore import QThread, pyqtSignal
 import settings
+import batch_journal
+import ffmpeg_progress
+import filter_optimizer
+import planner
+import probe
+import proc_utils
+import result_cache
+import scanner
+import script_compiler
+import segmenter
+import state_hub
+import stats
+
+
+def resolve_workers(value=None) -> int:
+    """Doi gia tri max_workers (so nguyen hoac "auto") thanh so tien trinh FFmpeg."""
+    if value is None:
+        value = settings.get("max_workers", 2)
+    cpus = os.cpu_count() or 1
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value == "auto":
+            # libx264 tu chia thread, nen "auto" chi chay nua so core
+            return max(1, cpus // 2)
+        try:
+            value = int(value)
+        except ValueError:
+            return 1
+    return max(1, int(value))
+
+
+SCHEDULE_POLICIES = ("filename", "longest_first", "shortest_first", "round_robin")
+
+
+def order_tasks(tasks: list, policy: str, costs: dict = None) -> list:
+    """Sap xep task theo chinh sach lich.
+
+    filename: theo ten file (nhu cu); longest_first: viec nang nhat truoc (giam duoi batch khi chay
+    song song); shortest_first: ket qua dau tien nhanh nhat; round_robin: xen ke giua cac thu muc.
+    costs: path -> chi phi uoc luong (thoi luong x chi phi script).
+    """
+    if policy == "round_robin":
+        groups = {}
+        for t in sorted(tasks, key=lambda t: t["path"]):
+            groups.setdefault(os.path.dirname(t["path"]), []).append(t)
+        ordered = []
+        queues = list(groups.values())
+        while queues:
+            ordered += [q.pop(0) for q in queues]
+            queues = [q for q in queues if q]
+        return ordered
+    if policy in ("longest_first", "shortest_first") and costs:
+        return sorted(tasks, key=lambda t: costs.get(t["path"], 0.0),
+                      reverse=policy == "longest_first")
+    return list(tasks)   # filename: danh sach da sap xep theo ten tu get_video_files
+
+
+def ffmpeg_binary(model) -> str:
+    """Script ghi 'ffmpeg' tran => dung duong dan ffmpeg trong settings."""
+    if script_compiler.is_default_ffmpeg(model.binary):
+        return settings.get("ffmpeg_path", "ffmpeg") or "ffmpeg"
+    return model.binary
+
+
+def _text(stream):
+    return io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
 
 
 class ProcessWorker(QThread):
-    """Worker thread chạy FFmpeg commands trên batch video files."""
-    progress = pyqtSignal(int, int)       # (current, total)
-    file_status = pyqtSignal(int, str)    # (row_index, status)
-    log = pyqtSignal(str)
+    """Worker thread chạy FFmpeg commands trên batch video files (song song theo max_workers).
+
+    Trang thai tung dong va log duoc ghi vao self.state (state_hub.StateHub), UI doc theo nhip:
+        state.update(row, status=..., percent=..., progress="fps | speed | ETA")
+        state.update("batch", done=..., total=...)
+    """
     finished = pyqtSignal(int, int)       # (success, errors)
 
-    def __init__(self, input_files: list, output_dir: str, command_template: str, naming_pattern: str = "{name}_reup"):
+    def __init__(self, input_files: list, output_dir: str, command_template: str,
+                 naming_pattern: str = "{name}_reup", max_workers=None, use_cache=None,
+                 scripts=None, pipeline=False, smart_plan=None, schedule_policy=None,
+                 journal=None, keep_alive=False, hub=None):
         """
         input_files: list of {'path': str, 'row': int}
         command_template: FFmpeg command với {input} và {output} placeholder
+            (duoc bien dich 1 lan, raise script_compiler.ScriptError neu sai cu phap)
         naming_pattern: {name}_reup => output file name
+        max_workers: so ffmpeg chay cung luc, None => lay tu settings ("auto" = theo so CPU)
+        use_cache: dung lai ket qua cu cho cap (input, lenh) giong het, None => theo settings
+        scripts: list (ten_script, noi_dung) => che do nhieu script: moi input decode 1 lan,
+            xuat 1 file cho moi script ({script} trong naming_pattern = ten script)
+        pipeline: True => scripts la 1 chuoi buoc noi tiep, gop thanh it lenh ffmpeg nhat
+            (filter noi nhau, encoder cua buoc cuoi), phan khong gop duoc noi qua pipe
+        smart_plan: probe input va bo qua encode khong can thiet (remux / chi xu ly audio),
+            None => theo settings
+        schedule_policy: thu tu xu ly (SCHEDULE_POLICIES), None => theo settings
+        journal: batch_journal.BatchJournal ghi trang thai tung job (job = row) de resume sau crash
+        keep_alive: True => het viec van cho task moi (add_tasks, che do hot folder) toi khi stop()
+        hub: StateHub dung chung voi UI, None => tao moi (self.state)
         """
         super().__init__()
+        self.state = hub or state_hub.StateHub()
         self.input_files = input_files
         self.output_dir = output_dir
         self.command_template = command_template
+        self.multi = bool(scripts) and not pipeline
+        self.stages = None
+        if scripts:
+            self.models = [script_compiler.compile_script(text, name) for name, text in scripts]
+        else:
+            self.models = [script_compiler.compile_script(command_template)]
+        if pipeline and scripts:
+            self.stages = script_compiler.plan_pipeline(self.models)
+            self.models = [self.stages[-1]]
+            if len(self.stages) == 1:
+                self.stages = None   # gop het thanh 1 lenh => chay nhu 1 script
+        # Per-script statistics: each script in multi mode, the whole chain in pipeline mode
+        if scripts and pipeline:
+            self._stat_labels = [" > ".join(name.replace(".txt", "") for name, _ in scripts)]
+        elif scripts:
+            self._stat_labels = [m.name.replace(".txt", "") for m in self.models]
+        else:
+            self._stat_labels = [self.models[0].name or "(lenh tu nhap)"]
         self.naming_pattern = naming_pattern
+        self.max_workers = max_workers
+        if use_cache is None:
+            use_cache = settings.get("result_cache_enabled", True)
+        self._cache = result_cache.get_cache() if use_cache else None
+        if smart_plan is None:
+            smart_plan = settings.get("smart_plan_enabled", True)
+        self.smart_plan = smart_plan
+        self.optimize_level = settings.get("filter_optimizer", filter_optimizer.LEVEL_SAFE)
+        self.segment_enabled = settings.get("segment_enabled", True)
+        self.segment_min_seconds = float(settings.get("segment_min_minutes", 20) or 0) * 60
+        self.segment_seconds = float(settings.get("segment_seconds", 60) or 60)
+        self._segment_workers = 1
+        self.schedule_policy = schedule_policy or settings.get("schedule_policy", "filename")
+        self.journal = journal
+        self._journal_failed = False
+        stages = self.stages or self.models
+        self._cmd_hash = batch_journal.command_hash(" | ".join(m.normalized() for m in stages))
+        self.keep_alive = keep_alive
+        self._queue = queue.Queue()
+        self._accepting = True    # False once run() has left its submit loop
+        self._total = len(input_files)
         self._stop = False
-        self._skip_current = False
+        self._lock = threading.Lock()
+        self._running = {}        # row -> [Popen] (rong khi chua spawn ffmpeg)
+        self._skip_rows = set()
+        self._reserved = set()
+        self._produced = set()    # output da ghi trong batch (hot folder khong nhan lai)
+        self._done = 0
+        self._success = 0
+        self._errors = 0
 
     def stop(self):
+        """Dung batch va kill ngay cac ffmpeg dang chay."""
         self._stop = True
+        with self._lock:
+            procs = [p for group in self._running.values() for p in group]
+        for proc in procs:
+            proc_utils.terminate_async(proc)
+
+    def set_keep_alive(self, on: bool) -> bool:
+        """Doi che do hot folder khi dang chay. False => vong nhan task da ket thuc (bat lai
+        khong co tac dung, can chay worker moi)."""
+        with self._lock:
+            self.keep_alive = on
+            return self._accepting
 
-    def skip(self):
-        self._skip_current = True
+    def add_tasks(self, tasks: list) -> bool:
+        """Them task vao worker dang chay (khong can khoi dong lai pool).
+        False => vong nhan task da ket thuc, task khong duoc nhan (can chay worker moi)."""
+        with self._lock:
+            if not self._accepting:
+                return False
+            self._total += len(tasks)
+            self.input_files = self.input_files + list(tasks)
+            # Queued under the lock so run() never sees an empty queue and exits in between
+            for task in tasks:
+                self._queue.put(task)
+        if self.journal:
+            self.journal.queued((t["row"] for t in tasks), [t["path"] for t in tasks])
+        return True
+
+    def is_output(self, path: str) -> bool:
+        """True neu path la output worker dang ghi / da ghi."""
+        path = os.path.abspath(path)
+        with self._lock:
+            return any(os.path.abspath(p) == path for p in self._reserved | self._produced)
+
+    def skip(self, rows=None):
+        """Bo qua (kill ngay) cac file dang xu ly. rows=None => tat ca file dang chay."""
+        with self._lock:
+            running = set(self._running)
+            targets = running if not rows else running & set(rows)
+            self._skip_rows |= targets
+            procs = [p for r in targets for p in self._running[r]]
+        for proc in procs:
+            proc_utils.terminate_async(proc)
 
     def run(self):
         total = len(self.input_files)
-        success = 0
-        errors = 0
+        max_workers = resolve_workers(self.max_workers)
+        workers = self._in_flight_limit(max_workers, total)
+        self.state.log(f"[Process] Chay song song {workers} tien trinh FFmpeg")
+        # Cores left over when there are fewer files than workers go to segments of long videos
+        self._segment_workers = max(1, max_workers // workers)
+        if self.stages:
+            names = " | ".join(st.name.replace(".txt", "") for st in self.stages)
+            self.state.log(f"[Pipeline] {len(self.stages)} lenh ffmpeg: {names}")
 
-        for idx, task in enumerate(self.input_files):
-            if self._stop:
-                self.log.emit("[STOP] Da dung xu ly.")
-                break
+        for task in self._schedule(self.input_files):
+            self._queue.put(task)
 
-            self._skip_current = False
-            input_path = task["path"]
-            row = task["row"]
-            filename = os.path.basename(input_path)
-            name_no_ext = os.path.splitext(filename)[0]
+        # Threads are created lazily: the pool is sized for hot folder mode being turned on later
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = set()
+            while not self._stop:
+                # Only keep `workers` jobs in flight so Stop does not leave a long queue behind
+                workers = self._in_flight_limit(max_workers, self._total)
+                while len(pending) >= workers:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                try:
+                    # The loop stays open while jobs run so hot folder can still be turned on
+                    task = (self._queue.get(timeout=0.5) if self.keep_alive or pending
+                            else self._queue.get_nowait())
+                except queue.Empty:
+                    pending = {f for f in pending if not f.done()}
+                    with self._lock:
+                        # keep_alive / add_tasks may have changed since the get: decide under the lock
+                        if self.keep_alive or pending or not self._queue.empty():
+                            continue
+                        self._accepting = False
+                    break
+                if self._stop:
+                    break
+                pending.add(pool.submit(self._process_one, task))
+            with self._lock:
+                self._accepting = False
+            wait(pending)
 
-            output_name = self.naming_pattern.replace("{name}", name_no_ext)
-            # Ensure output_name ends with .mp4 if command has {output}.mp4
-            if not output_name.endswith(".mp4"):
-                output_name += ".mp4"
+        if self._stop:
+            self.state.log("[STOP] Da dung xu ly.")
+        if self.journal:
+            # A stopped batch stays resumable; a finished one is closed for good
+            self.journal.close(complete=not self._stop)
+        self.finished.emit(self._success, self._errors)
 
-            output_path = os.path.join(self.output_dir, output_name)
+    def _in_flight_limit(self, max_workers: int, total: int) -> int:
+        # A fixed batch never needs more ffmpeg jobs than files; hot folder mode may get more
+        return max_workers if self.keep_alive else min(max_workers, max(1, total))
 
-            # Handle duplicate output
+    def _schedule(self, tasks: list) -> list:
+        """Sap xep task theo schedule_policy; chi phi = thoi luong (probe index) x chi phi script."""
+        policy = self.schedule_policy
+        if policy not in ("longest_first", "shortest_first"):
+            return order_tasks(tasks, policy)
+        script_cost = sum(planner.estimate_cost(m) for m in (self.stages or self.models))
+
+        def duration(task):
+            try:
+                return probe.probe(task["path"]).duration
+            except probe.ProbeError:
+                # Unknown duration: guess from the size at ~2 Mbit/s
+                try:
+                    return os.path.getsize(task["path"]) / 250_000
+                except OSError:
+                    return 0.0
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            durations = list(pool.map(duration, tasks))
+        costs = {t["path"]: d * script_cost for t, d in zip(tasks, durations)}
+        self.state.log(f"[Schedule] {policy}: tong ~{sum(durations) / 60:.0f} phut video,"
+                      f" chi phi script x{script_cost:.2f}")
+        return order_tasks(tasks, policy, costs)
+
+    @staticmethod
+    def _drain_stderr(stream, parser, tail):
+        # stderr must be read concurrently, otherwise ffmpeg blocks once the pipe buffer fills
+        for line in stream:
+            parser.feed_stderr(line)
+            tail.append(line)
+
+    def _reserve_output(self, output_path: str) -> str:
+        # Handle duplicate output (also against names picked by other running jobs)
+        with self._lock:
             counter = 1
-            base_out = output_path.replace(".mp4", "")
-            while os.path.exists(output_path):
-                output_path = f"{base_out}_{counter}.mp4"
+            base_out, ext = os.path.splitext(output_path)
+            while os.path.exists(output_path) or output_path in self._reserved:
+                output_path = f"{base_out}_{counter}{ext}"
                 counter += 1
+            self._reserved.add(output_path)
+        return output_path
 
-            cmd = self.command_template.strip()
-            cmd = cmd.replace("{input}", f'"{input_path}"')
-            cmd = cmd.replace("{output}", f'"{output_path.replace(".mp4", "")}"')
+    def _release(self, paths):
+        with self._lock:
+            for p in paths:
+                self._reserved.discard(p)
 
-            self.file_status.emit(row, "Dang xu ly...")
-            self.log.emit(f"[Process] Xu ly: {filename}")
-            self.log.emit(f"   -> {cmd[:120]}{'...' if len(cmd)>120 else ''}")
+    def _target(self, model, name_no_ext: str) -> dict:
+        """1 output can tao cho input hien tai (moi script 1 output)."""
+        pattern = self.naming_pattern
+        if self.multi and "{script}" not in pattern:
+            pattern += "_{script}"
+        output_name = (pattern.replace("{name}", name_no_ext)
+                       .replace("{script}", model.name.replace(".txt", "")))
+        # Ensure output_name ends with the extension the command writes ({output}.mp4 / .mkv)
+        if not output_name.endswith(model.ext):
+            output_name += model.ext
+        return {"model": model, "stages": self.stages,
+                "wanted": os.path.join(self.output_dir, output_name),
+                "path": None, "key": None}
 
-            try:
-                proc = subprocess.Popen(
-                    cmd, shell=True,
+    @staticmethod
+    def _base(target: dict) -> str:
+        return target["path"][:-len(target["model"].ext)]
+
+    def _reuse_cached(self, filename: str, input_path: str, target: dict) -> bool:
+        """Cache hit: giu output cu neu da dung, neu khong thi hardlink/copy ra ten moi."""
+        if not self._cache:
+            return False
+        stages = target["stages"] or [target["model"]]
+        command = " | ".join(st.normalized() for st in stages)
+        if self.optimize_level != filter_optimizer.LEVEL_OFF:
+            # A rewritten graph may not be bit-identical => never share entries across levels
+            command += f" | opt={self.optimize_level}"
+        if self.smart_plan:
+            # Remux / audio-only plans give different files than the full encode
+            command += " | plan=smart"
+        extras = [p for st in stages for p in st.extra_inputs()]
+        try:
+            target["key"] = self._cache.key(input_path, command, extras)
+            blob = self._cache.lookup(target["key"])
+            if not blob:
+                return False
+            wanted = target["wanted"]
+            if self._cache.is_same_output(blob, wanted):
+                target["path"] = wanted
+            else:
+                target["path"] = self._reserve_output(wanted)
+                try:
+                    result_cache.link_or_copy(blob, target["path"])
+                finally:
+                    self._release([target["path"]])
+        except OSError as e:
+            self.state.log(f"[Cache] Bo qua cache cho {filename}: {e}")
+            return False
+        self.state.log(f"[Cache] {filename} -> {os.path.basename(target['path'])}")
+        return True
+
+    def _store_cache(self, target: dict):
+        if not (self._cache and target["key"]):
+            return
+        try:
+            self._cache.store(target["key"], target["path"])
+        except OSError as e:
+            self.state.log(f"[Cache] Khong luu duoc cache: {e}")
+
+    def _probe(self, filename: str, input_path: str):
+        """MediaInfo tu probe index (chi chay ffprobe neu file chua co trong index)."""
+        try:
+            return probe.probe(input_path)
+        except probe.ProbeError as e:
+            self.state.log(f"   [Probe] Khong probe duoc {filename}, encode day du: {e}")
+            return None
+
+    def _plan(self, todo: list, info):
+        """Toi uu chuoi filter, roi doi model cua tung target sang cach re nhat cho input nay
+        (remux / copy video)."""
+        level = self.optimize_level
+        size = (info.width, info.height) if info and info.has_video else None
+        for t in todo:
+            label = t["model"].name.replace(".txt", "") or "script"
+            if t["stages"]:
+                stages, notes = [], []
+                for i, st in enumerate(t["stages"]):
+                    st, st_notes = filter_optimizer.optimize_model(st, level, size if i == 0 else None)
+                    stages.append(st)
+                    notes += st_notes
+                t["stages"] = stages
+            else:
+                t["model"], notes = filter_optimizer.optimize_model(t["model"], level, size)
+            if notes:
+                self.state.log(f"   [Filter] {label}: {'; '.join(notes)}")
+            if self.smart_plan and info and not t["stages"]:
+                p = planner.plan(t["model"], info)
+                t["model"] = p.model
+                self.state.log(f"   [Plan] {label}: {p.describe()}")
+
+    def _segment_job(self, filename: str, input_path: str, todo: list, info):
+        """SegmentJob neu input du dai va script chay theo doan duoc, nguoc lai None."""
+        if (not self.segment_enabled or not info or not info.has_video or len(todo) != 1
+                or todo[0]["stages"] or info.duration < max(self.segment_min_seconds, 2 * self.segment_seconds)):
+            return None
+        model = todo[0]["model"]
+        why = segmenter.segment_blocker(model)
+        if why:
+            self.state.log(f"   [Segment] Khong chia doan {filename}: {why}")
+            return None
+        return segmenter.SegmentJob(model, input_path, self.output_dir, self.segment_seconds,
+                                    ffmpeg=ffmpeg_binary(model))
+
+    def _run_segmented(self, row: int, job, target: dict, has_audio: bool):
+        """Cat theo keyframe -> encode cac doan song song (+ audio 1 lan) -> concat. (state, err)."""
+        if job.resumed:
+            self.state.log(f"   [Segment] Tiep tuc tu checkpoint: {len(job.state['done'])}"
+                          f"/{len(job.state['segments'])} doan da xong")
+        if not job.state["split"]:
+            state, err = self._run_ffmpeg(row, [job.split_argv()])
+            if state != "ok":
+                return state, err
+            job.mark_split()
+        n = len(job.state["segments"])
+        pending = job.pending()
+        workers = self._segment_workers
+        self.state.log(f"   [Segment] {n} doan, con {len(pending)} doan, {workers} doan song song")
+
+        lock = threading.Lock()
+        percents = {i: (0 if i in pending else 100) for i in range(n)}
+
+        def report(i, snap):
+            with lock:
+                percents[i] = snap["percent"]
+                pct = sum(percents.values()) // max(1, n)
+                done = len(job.state["done"])
+            self.state.update(row, percent=pct, progress=f"{pct}% | doan {done}/{n}")
+
+        def encode(i):
+            if self._stop or row in self._skip_rows:
+                return "stop" if self._stop else "skip", ""
+            state, err = self._run_ffmpeg(row, [job.segment_argv(i)], on_progress=lambda s: report(i, s))
+            with lock:
+                if state == "ok":
+                    percents[i] = 100
+                    job.mark_done(i)
+                else:
+                    proc_utils.remove_quietly(job.encoded(i))
+            return state, err
+
+        def audio():
+            state, err = self._run_ffmpeg(row, [job.audio_argv()], on_progress=lambda s: None)
+            if state == "ok":
+                with lock:
+                    job.mark_audio()
+            return state, err
+
+        result = ("ok", "")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(encode, i) for i in pending]
+            if has_audio and job.needs_audio:
+                futures.append(pool.submit(audio))
+            for fut in as_completed(futures):
+                state, err = fut.result()
+                if state != "ok" and result[0] == "ok":
+                    result = (state, err)
+                    # Segments already running finish and stay checkpointed for the next run
+                    for other in futures:
+                        other.cancel()
+        if result[0] != "ok":
+            return result
+
+        state, err = self._run_ffmpeg(row, [job.concat_argv(self._base(target))])
+        if state == "ok":
+            job.cleanup()
+        return state, err
+
+    def _commands(self, input_path: str, todo: list):
+        """Sinh (nhom target, [argv cua tung stage]).
+
+        Nhieu script thi gop fan-out de decode input 1 lan; pipeline thi noi cac stage qua pipe.
+        """
+        if self.stages:
+            t = todo[0]
+            yield [t], script_compiler.pipeline_argvs(
+                t["stages"], input_path, self._base(t),
+                ffmpeg=ffmpeg_binary(t["stages"][0]), progress=True)
+            return
+        by_model = {id(t["model"]): t for t in todo}
+        models = [t["model"] for t in todo]
+        plan, singles = script_compiler.plan_fanout(models) if len(models) > 1 else (None, models)
+        if plan:
+            group = [by_model[id(m)] for m in plan.models]
+            self.state.log(f"   [Fan-out] {len(group)} script, decode 1 lan")
+            yield group, [plan.argv(input_path, [self._base(t) for t in group],
+                                    ffmpeg=ffmpeg_binary(plan.models[0]), progress=True)]
+        for m in singles:
+            t = by_model[id(m)]
+            yield [t], [m.argv(input_path, self._base(t), ffmpeg=ffmpeg_binary(m), progress=True)]
+
+    def _run_ffmpeg(self, row: int, argvs: list, on_progress=None, duration: float = 0.0,
+                    models=None):
+        """Chay 1 hoac nhieu lenh ffmpeg noi nhau qua pipe (stdout stage truoc -> stdin stage sau),
+        stream progress cua stage cuoi. Tra ve (state, stderr tail), state: ok/error/skip/stop.
+
+        on_progress(snap): thay cho cap nhat progress mac dinh (vd gop progress cua nhieu doan).
+        duration: thoi luong input tu probe index => co % / ETA ngay tu dau.
+        models: cac output cua lenh (list cac chuoi stage) => % / ETA theo thoi luong output
+            (setpts, -t...) thay vi thoi luong input."""
+        # Fan-out: the progress clock runs until the longest output is written
+        to_output = (lambda d: max(script_compiler.output_duration(chain, d) for chain in models)
+                     ) if models else None
+        parser = ffmpeg_progress.ProgressParser(duration, to_output)
+        procs, tails, err_threads = [], [], []
+        stdin = subprocess.DEVNULL
+        try:
+            for argv in argvs:
+                # Binary pipes: intermediate stages stream NUT data through stdout
+                proc = proc_utils.popen_group(
+                    argv,
+                    stdin=stdin,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    text=True
                 )
-                out, err = proc.communicate()
-
-                if self._skip_current:
-                    proc.kill()
-                    self.file_status.emit(row, "⏭ Bỏ qua")
-                    self.log.emit(f"⏭ Bỏ qua: {filename}")
-                    continue
-
-                if proc.returncode == 0:
-                    success += 1
-                    settings.increment("stat_processed")
-                    self.file_status.emit(row, "Xong")
-                    self.log.emit(f"[OK] Xong: {filename} -> {os.path.basename(output_path)}")
-                else:
-                    errors += 1
-                    settings.increment("stat_errors")
-                    self.file_status.emit(row, "Loi")
-                    err_short = (err or "").strip()[-200:] if err else ""
-                    self.log.emit(f"[ERR] Loi xu ly {filename}:\n   {err_short}")
+                if stdin is not subprocess.DEVNULL:
+                    stdin.close()   # the next stage owns the read end now
+                stdin = proc.stdout
+                procs.append(proc)
+        finally:
+            with self._lock:
+                # Several commands may run for one row at once (segments) -> append, not replace
+                self._running.setdefault(row, []).extend(procs)
+                cancelled = self._stop or row in self._skip_rows
+            if cancelled or len(procs) < len(argvs):
+                # Stop/skip arrived before the processes existed, or a stage failed to start
+                for proc in procs:
+                    proc_utils.terminate_async(proc)
+
+        for proc in procs:
+            tail = ffmpeg_progress.StderrTail()
+            t = threading.Thread(
+                target=self._drain_stderr, args=(_text(proc.stderr), parser, tail), daemon=True)
+            t.start()
+            tails.append(tail)
+            err_threads.append(t)
+        for line in _text(procs[-1].stdout):
+            snap = parser.feed(line)
+            if snap and on_progress:
+                on_progress(snap)
+            elif snap:
+                self.state.update(row, percent=snap["percent"], progress=ffmpeg_progress.describe(snap))
+        for proc in procs:
+            proc.wait()
+        for t in err_threads:
+            t.join()
+
+        with self._lock:
+            self._running[row] = [p for p in self._running.get(row, []) if p not in procs]
+            skipped = row in self._skip_rows
+        failed = [tail.text() for proc, tail in zip(procs, tails) if proc.returncode != 0]
+        if skipped:
+            return "skip", ""
+        if self._stop and failed:
+            return "stop", ""
+        return ("error" if failed else "ok"), "\n".join(failed)
+
+    def _journal(self, row: int, state: str, outputs=(), error: str = ""):
+        if self.journal:
+            try:
+                self.journal.job(row, state, outputs, self._cmd_hash, error)
+            except (OSError, ValueError) as e:
+                # A full disk must not fail the file itself; the batch just resumes less precisely
+                if not self._journal_failed:
+                    self._journal_failed = True
+                    self.state.log(f"[WARN] Khong ghi duoc journal batch: {e}")
+
+    def _finish(self, row: int, result: str):
+        with self._lock:
+            self._running.pop(row, None)
+            self._skip_rows.discard(row)
+            if result == "ok":
+                self._success += 1
+            elif result == "error":
+                self._errors += 1
+            self._done += 1
+            done, total = self._done, self._total
+        self.state.update("batch", done=done, total=total)
+
+    def _process_one(self, task: dict):
+        """Xu ly 1 file; loi bat ky (ke ca truoc khi chay ffmpeg) => dong "Loi", khong treo."""
+        row = task["row"]
+        try:
+            self._process_task(task)
+        except Exception as e:
+            filename = os.path.basename(task["path"])
+            self.state.log(f"[ERR] Loi xu ly {filename}:\n   Exception: {e}")
+            with self._lock:
+                # _finish pops the row: still there => the job died before finishing it
+                pending = row in self._running
+            if pending:
+                self._journal(row, batch_journal.FAILED, (), f"Exception: {e}")
+                stats.incr(stats.ERRORS, scripts=self._stat_labels)
+                self.state.update(row, status="Loi")
+                self._finish(row, "error")
+
+    def _process_task(self, task: dict):
+        input_path = task["path"]
+        row = task["row"]
+        filename = os.path.basename(input_path)
+        name_no_ext = os.path.splitext(filename)[0]
+
+        with self._lock:
+            self._running[row] = []
+        targets = [self._target(m, name_no_ext) for m in self.models]
+        todo = [t for t in targets if not self._reuse_cached(filename, input_path, t)]
+        if not todo:
+            with self._lock:
+                self._produced.update(t["path"] for t in targets)
+            self._journal(row, batch_journal.DONE, [t["path"] for t in targets])
+            stats.incr(stats.PROCESSED, scripts=self._stat_labels)
+            self.state.update(row, status="Xong (cache)", percent=100, progress="100%")
+            self._finish(row, "ok")
+            return
+
+        for t in todo:
+            t["path"] = self._reserve_output(t["wanted"])
+        self._journal(row, batch_journal.RUNNING, [t["path"] for t in todo])
+        self.state.update(row, status="Dang xu ly...")
+        self.state.log(f"[Process] Xu ly: {filename}")
 
-            except Exception as e:
-                errors += 1
-                self.file_status.emit(row, "Loi")
-                self.log.emit(f"[ERR] Exception [{filename}]: {e}")
+        state, err = "error", ""
+        finished = []
+        try:
+            info = self._probe(filename, input_path)
+            self._plan(todo, info)
+            job = self._segment_job(filename, input_path, todo, info)
+            if job:
+                state, err = self._run_segmented(row, job, todo[0], info.has_audio)
+                if state == "ok":
+                    self._store_cache(todo[0])
+                    finished.append(todo[0])
+            for group, argvs in ([] if job else self._commands(input_path, todo)):
+                cmd = " | ".join(script_compiler.format_argv(a) for a in argvs)
+                self.state.log(f"   -> {cmd[:120]}{'...' if len(cmd)>120 else ''}")
+                state, err = self._run_ffmpeg(row, argvs, duration=info.duration if info else 0.0,
+                                              models=[t["stages"] or [t["model"]] for t in group])
+                if state != "ok":
+                    break
+                for t in group:
+                    self._store_cache(t)
+                    finished.append(t)
+        except Exception as e:
+            state, err = "error", f"Exception: {e}"
 
-            self.progress.emit(idx + 1, total)
+        # Partial outputs of the failed/cancelled command are removed
+        for t in todo:
+            if t not in finished:
+                proc_utils.remove_quietly(t["path"])
+        with self._lock:
+            self._produced.update(t["path"] for t in targets if t["path"])
+        self._release(t["path"] for t in todo)
 
-        self.finished.emit(success, errors)
+        self._journal(row, {"ok": batch_journal.DONE, "skip": batch_journal.SKIPPED,
+                            "stop": batch_journal.STOPPED}.get(state, batch_journal.FAILED),
+                      [t["path"] for t in targets if t["path"]] if state == "ok" else (), err)
+        if state == "ok":
+            stats.incr(stats.PROCESSED, scripts=self._stat_labels)
+            self.state.update(row, status="Xong", percent=100, progress="100%")
+            names = ", ".join(os.path.basename(t["path"]) for t in targets)
+            self.state.log(f"[OK] Xong: {filename} -> {names}")
+        elif state == "skip":
+            self.state.update(row, status="⏭ Bỏ qua")
+            self.state.log(f"⏭ Bỏ qua: {filename}")
+        elif state == "stop":
+            self.state.update(row, status="Da dung")
+            self.state.log(f"[STOP] Huy: {filename}")
+        else:
+            stats.incr(stats.ERRORS, scripts=self._stat_labels)
+            self.state.update(row, status="Loi")
+            err_short = err.strip()[-200:]
+            self.state.log(f"[ERR] Loi xu ly {filename}:\n   {err_short}")
+        self._finish(row, state)
+
+
+class ProbeWorker(QThread):
+    """Probe cac file video o background (doc tu probe index, chi chay ffprobe cho file moi/da doi).
+
+    Ket qua: state.update(row, probe={"size": bytes, "info": MediaInfo | None, "error": str})
+    """
+    finished = pyqtSignal(int)         # so file da probe
+
+    def __init__(self, files: list, max_workers: int = 4, streaming: bool = False, hub=None):
+        """files: list of {'path': str, 'row': int, 'size'?: int}
+        streaming: True => nhan them file qua add() toi khi close() (vd. khi dang quet thu muc).
+        """
+        super().__init__()
+        self.state = hub or state_hub.StateHub()
+        self.files = files
+        self.max_workers = max_workers
+        self._queue = queue.Queue()
+        for task in files:
+            self._queue.put(task)
+        self._open = streaming
+        self._stop = False
+
+    def add(self, tasks: list):
+        for task in tasks:
+            self._queue.put(task)
+
+    def close(self):
+        """Khong con file moi: probe het hang doi roi ket thuc."""
+        self._open = False
+
+    def stop(self):
+        self._stop = True
+
+    def _probe_one(self, task: dict):
+        if self._stop:
+            return
+        result = {"size": task.get("size", 0), "info": None, "error": ""}
+        try:
+            if "size" not in task:
+                result["size"] = os.path.getsize(task["path"])
+            result["info"] = probe.probe(task["path"])
+        except (OSError, probe.ProbeError) as e:
+            result["error"] = str(e)
+        if not self._stop:
+            self.state.update(task["row"], probe=result)
+
+    def run(self):
+        # Files already in the index answer instantly; only new/changed files hit ffprobe
+        count, pending = 0, set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while not self._stop:
+                while len(pending) >= self.max_workers * 2:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                try:
+                    task = self._queue.get(timeout=0.2) if self._open else self._queue.get_nowait()
+                except queue.Empty:
+                    if self._open:
+                        continue
+                    break
+                pending.add(pool.submit(self._probe_one, task))
+                count += 1
+            wait(pending)
+        self.finished.emit(count)
 
 
 def get_scripts(scripts_folder: str = "scripts") -> list:
@@ -139,12 +776,8 @@ def delete_script(name: str, scripts_folder: str = "scripts"):
         os.remove(path)
 
 
-def get_video_files(folder: str) -> list:
-    """Trả về list đường dẫn tuyệt đối của video files trong folder."""
-    exts = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.ts', '.wmv')
-    files = []
-    if os.path.exists(folder):
-        for f in os.listdir(folder):
-            if f.lower().endswith(exts):
-                files.append(os.path.join(folder, f))
-    return sorted(files)
+def get_video_files(folder: str, include=None, exclude=None, max_depth: int = 0) -> list:
+    """Trả về list đường dẫn tuyệt đối của video files trong folder (xem scanner.scan)."""
+    if not os.path.exists(folder):
+        return []
+    return [path for path, _, _ in scanner.scan(folder, include, exclude, max_depth)]
@@ -0,0 +1,144 @@
+"""Model cho bang queue lon (download / xu ly): du lieu luu theo cot (moi cot 1 list str),
+khong tao QTableWidgetItem cho tung o => 100k dong van nhe va them nhanh.
+
+Cap nhat o (set) khong bao view ngay ma gom lai, phat dataChanged theo khoang dong
+moi flush_ms; proxy StatusFilterProxy loc theo trang thai va sap xep (so theo sort key).
+"""
+from PyQt5.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QTimer, QVariant
+)
+from PyQt5.QtGui import QColor
+
+SORT_ROLE = Qt.UserRole + 1
+
+
+class QueueModel(QAbstractTableModel):
+    def __init__(self, headers: list, status_col: int, status_colors: dict = None,
+                 sort_cols=(), row_tip=None, flush_ms: int = 100, parent=None):
+        """sort_cols: cot co sort key rieng (vd. size bytes) thay vi so chuoi hien thi.
+        row_tip: ham(row) -> tooltip cot dau (vd. duong dan day du), khong luu tung dong.
+        """
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.status_col = status_col
+        self._colors = {k: QColor(v) for k, v in (status_colors or {}).items()}
+        self._default_color = QColor("#e6edf3")
+        self._cols = [[] for _ in self.headers]
+        self._keys = {c: [] for c in sort_cols}
+        self._tips = {}                 # (row, col) -> tooltip, chi cac o co tooltip
+        self._row_tip = row_tip
+        self._dirty = {}                # col -> [min_row, max_row] chua bao view
+        self._flush = QTimer(self)
+        self._flush.setSingleShot(True)
+        self._flush.setInterval(flush_ms)
+        self._flush.timeout.connect(self.flush)
+
+    # ── Qt model API ────────────────────────────────────────
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cols[0])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cols)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row, col = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self._cols[col][row]
+        if role == Qt.ForegroundRole and col == self.status_col:
+            return self._colors.get(self._cols[col][row], self._default_color)
+        if role == Qt.ToolTipRole:
+            tip = self._tips.get((row, col))
+            if tip is None and col == 0 and self._row_tip:
+                tip = self._row_tip(row)
+            return tip if tip is not None else QVariant()
+        if role == SORT_ROLE:
+            keys = self._keys.get(col)
+            return keys[row] if keys is not None else self._cols[col][row]
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return QVariant()
+
+    # ── API cho tab ─────────────────────────────────────────
+
+    def append_rows(self, rows: list, keys: dict = None) -> int:
+        """Them nhieu dong 1 lan (1 lan beginInsertRows). rows: list tuple theo cot.
+        keys: {col: [sort key tung dong]}. Tra ve chi so dong dau tien.
+        """
+        first = self.rowCount()
+        if not rows:
+            return first
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for col, values in enumerate(zip(*rows)):
+            self._cols[col].extend(values)
+        for col, arr in self._keys.items():
+            arr.extend((keys or {}).get(col) or [0] * len(rows))
+        self.endInsertRows()
+        return first
+
+    def value(self, row: int, col: int) -> str:
+        return self._cols[col][row]
+
+    def column(self, col: int) -> list:
+        return self._cols[col]
+
+    def set(self, row: int, col: int, text: str, key=None, tip: str = None):
+        """Doi 1 o; view duoc bao (dataChanged) o lan flush tiep theo."""
+        if row >= len(self._cols[col]):
+            return
+        self._cols[col][row] = text
+        if key is not None and col in self._keys:
+            self._keys[col][row] = key
+        if tip is not None:
+            self._tips[(row, col)] = tip
+        span = self._dirty.get(col)
+        if span is None:
+            self._dirty[col] = [row, row]
+        else:
+            span[0], span[1] = min(span[0], row), max(span[1], row)
+        if not self._flush.isActive():
+            self._flush.start()
+
+    def flush(self):
+        """Phat dataChanged cho cac o da doi (1 signal / cot)."""
+        dirty, self._dirty = self._dirty, {}
+        for col, (lo, hi) in dirty.items():
+            self.dataChanged.emit(self.index(lo, col), self.index(hi, col))
+
+    def clear(self):
+        self.beginResetModel()
+        self._cols = [[] for _ in self.headers]
+        self._keys = {c: [] for c in self._keys}
+        self._tips = {}
+        self._dirty = {}
+        self.endResetModel()
+
+
+class StatusFilterProxy(QSortFilterProxyModel):
+    """Loc dong theo trang thai (prefix, vd. "Loi" khop ca "Loi: ...") va sap xep theo SORT_ROLE."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._status = ""
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def set_status(self, status):
+        """status: prefix hoac tuple prefix; "" = hien tat ca."""
+        self._status = status or ""
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self._status:
+            return True
+        model = self.sourceModel()
+        return model.value(source_row, model.status_col).startswith(self._status)
+
+    def source_rows(self, proxy_indexes) -> set:
+        """Dong cua model goc tu cac index dang chon trong view."""
+        return {self.mapToSource(i).row() for i in proxy_indexes}
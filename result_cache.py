@@ -0,0 +1,240 @@
+"""Cache ket qua xu ly: (fingerprint input, lenh FFmpeg) -> file output da encode.
+
+Chay tu dong lenh:  python result_cache.py [stats|clear]
+"""
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+CACHE_DIR = os.path.join("cache", "results")
+INDEX_NAME = "index.json"
+SAMPLE_SIZE = 1 << 20   # 1 MB moi mau
+
+
+def fingerprint(path: str) -> str:
+    """Hash nhanh: kich thuoc + 3 mau 1MB (dau / giua / cuoi) cua file."""
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - SAMPLE_SIZE // 2), max(0, size - SAMPLE_SIZE)}):
+            f.seek(offset)
+            h.update(f.read(SAMPLE_SIZE))
+    return h.hexdigest()
+
+
+def normalize_template(template: str) -> str:
+    return " ".join(template.split())
+
+
+def link_or_copy(src: str, dst: str):
+    """Hardlink neu cung o dia, neu khong thi copy."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ResultCache:
+    """Cache co gioi han dung luong, xoa theo LRU. Thread-safe, index luu JSON."""
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = 20 * 1024 ** 3, save_delay: float = 2.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()    # one index writer at a time
+        self._index_path = os.path.join(root, INDEX_NAME)
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._dirty = False
+        self._timer = None
+        self._load()
+
+    # ── persistence ──────────────────────────────────────────
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = data.get("entries", {})
+            self._hits = data.get("hits", 0)
+            self._misses = data.get("misses", 0)
+        except Exception:
+            self._entries = {}
+
+    def _save(self):
+        """Danh dau index can ghi; ghi that sau save_delay giay (goi khi dang giu self._lock)."""
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Ghi index ra dia ngay neu co thay doi (file tam + os.replace)."""
+        with self._io_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                payload = json.dumps({"entries": self._entries, "hits": self._hits,
+                                      "misses": self._misses})
+                self._dirty = False
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self._index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self._index_path)
+
+    # ── API ─────────────────────────────────────────────────
+
+    def key(self, input_path: str, template: str, extra_inputs=()) -> str:
+        """extra_inputs: cac file phu trong lenh (nhac nen, logo...) cung duoc fingerprint."""
+        h = hashlib.blake2b(digest_size=20)
+        h.update(fingerprint(input_path).encode())
+        h.update(b"\0")
+        h.update(normalize_template(template).encode("utf-8"))
+        for extra in extra_inputs:
+            h.update(b"\0")
+            h.update(fingerprint(extra).encode() if os.path.isfile(extra) else extra.encode("utf-8"))
+        return h.hexdigest()
+
+    def _blob(self, key: str, entry: dict) -> str:
+        return os.path.join(self.root, key[:2], key + entry.get("ext", ""))
+
+    def lookup(self, key: str):
+        """Tra ve duong dan blob neu hit (va blob con nguyen ven), None neu miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            blob = self._blob(key, entry) if entry else None
+            if entry and (not os.path.exists(blob) or os.path.getsize(blob) != entry["size"]):
+                # Blob bi xoa/sua ben ngoai -> bo entry
+                del self._entries[key]
+                entry = None
+            if entry:
+                entry["last_used"] = time.time()
+                entry["hits"] = entry.get("hits", 0) + 1
+                self._hits += 1
+            else:
+                self._misses += 1
+            self._save()
+            return blob if entry else None
+
+    def store(self, key: str, output_path: str):
+        ext = os.path.splitext(output_path)[1]
+        blob = os.path.join(self.root, key[:2], key + ext)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        # Link/copy outside the lock: a cross-drive copy must not stall every other worker
+        tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            link_or_copy(output_path, tmp)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            os.replace(tmp, blob)
+            self._entries[key] = {
+                "ext": ext,
+                "size": os.path.getsize(blob),
+                "last_used": time.time(),
+                "hits": 0,
+            }
+            self._evict()
+            self._save()
+
+    def is_same_output(self, blob: str, path: str) -> bool:
+        """True neu path da la ket qua cua blob (hardlink hoac ban copy giong het)."""
+        if not os.path.exists(path):
+            return False
+        try:
+            if os.path.samefile(blob, path):
+                return True
+        except OSError:
+            return False
+        return (os.path.getsize(blob) == os.path.getsize(path)
+                and fingerprint(blob) == fingerprint(path))
+
+    def _evict(self):
+        total = sum(e["size"] for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob(key, entry))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e["size"] for e in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._entries = {}
+            self._hits = 0
+            self._misses = 0
+            self._save()
+        self.flush()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """Instance dung chung trong process (worker + dashboard)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            import settings
+            max_gb = float(settings.get("result_cache_max_gb", 20) or 0)
+            _cache = ResultCache(max_bytes=int(max_gb * 1024 ** 3))
+            atexit.register(_cache.flush)
+        return _cache
+
+
+def _main(argv):
+    cache = get_cache()
+    cmd = argv[1] if len(argv) > 1 else "stats"
+    if cmd == "clear":
+        cache.clear()
+        print("Da xoa cache ket qua.")
+        return 0
+    if cmd != "stats":
+        print("Cach dung: python result_cache.py [stats|clear]")
+        return 1
+    st = cache.stats()
+    print(f"Entries : {st['entries']}")
+    print(f"Dung luong: {st['bytes'] / (1024 * 1024):.1f} MB / {cache.max_bytes / 1024 ** 3:.1f} GB")
+    print(f"Hit/Miss: {st['hits']} / {st['misses']}  ({st['hit_rate'] * 100:.1f}% hit)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,125 @@
+"""Quet thu muc video o background: os.scandir de quy, dung lai stat cua scandir (khong goi
+getsize tung file), day ket qua ra UI theo tung lo de bang hien dan khi dang quet.
+
+Loc theo glob: include/exclude so voi ten file va duong dan tuong doi (dang a/b/c.mp4),
+vi du include "*.mp4;clip_*" / exclude "*_reup*;tmp/*". max_depth: 0 = chi thu muc goc,
+-1 = khong gioi han.
+"""
+import fnmatch
+import os
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+VIDEO_EXTS = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.ts', '.wmv')
+
+
+def split_patterns(text) -> list:
+    """'*.mp4; clip_*,x*' -> ['*.mp4', 'clip_*', 'x*'] (nhan ca list)."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        return [p.strip() for p in text if p and p.strip()]
+    return [p.strip() for p in text.replace(",", ";").split(";") if p.strip()]
+
+
+def _match(name: str, rel: str, patterns: list) -> bool:
+    # Case-insensitive like Windows Explorer; patterns with "/" match the relative path
+    name, rel = name.lower(), rel.lower()
+    return any(fnmatch.fnmatchcase(rel if "/" in p else name, p.lower()) for p in patterns)
+
+
+def scan(folder: str, include=None, exclude=None, max_depth: int = 0, exts=VIDEO_EXTS,
+         skip_dirs=(), should_stop=None, on_dir=None):
+    """Generator (path, size, mtime_ns) cua video trong folder, thu tu on dinh theo ten.
+    on_dir(path): goi cho moi thu muc da quet (vd. de watch ca thu muc con).
+
+    Thu muc an (.segments, .git...), symlink thu muc (tranh vong lap) va skip_dirs
+    (vd. thu muc output nam trong thu muc input) bi bo qua.
+    Thu muc khong doc duoc thi bo qua, khong lam hong ca lan quet.
+    """
+    include, exclude = split_patterns(include), split_patterns(exclude)
+    exts = tuple(e.lower() for e in exts)
+    skip = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs if d}
+    # Depth-first with an explicit stack: no recursion limit on deep trees
+    stack = [(folder, "", 0)]
+    while stack:
+        if should_stop and should_stop():
+            return
+        path, rel_dir, depth = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name.lower())
+        except OSError:
+            continue
+        if on_dir:
+            on_dir(path)
+        subdirs = []
+        for entry in entries:
+            rel = f"{rel_dir}{entry.name}"
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if (not entry.name.startswith(".") and (max_depth < 0 or depth < max_depth)
+                            and not (exclude and _match(entry.name, rel, exclude))
+                            and os.path.normcase(os.path.abspath(entry.path)) not in skip):
+                        subdirs.append((entry.path, rel + "/", depth + 1))
+                    continue
+                if not entry.name.lower().endswith(exts):
+                    continue
+                if include and not _match(entry.name, rel, include):
+                    continue
+                if exclude and _match(entry.name, rel, exclude):
+                    continue
+                # On Windows this stat comes free with the directory listing
+                st = entry.stat()
+            except OSError:
+                continue
+            yield entry.path, st.st_size, st.st_mtime_ns
+        # Reversed so the stack pops subfolders in name order
+        stack.extend(reversed(subdirs))
+
+
+def scan_options(s: dict) -> dict:
+    """Tham so scan() tu settings."""
+    return {"include": s.get("scan_include", ""), "exclude": s.get("scan_exclude", ""),
+            "max_depth": int(s.get("scan_max_depth", 0))}
+
+
+class ScanWorker(QThread):
+    """Chay scan() o background, phat ket qua theo lo (toi da batch_size file / batch_seconds)."""
+    batch = pyqtSignal(list)            # [(path, size, mtime_ns), ...]
+    finished = pyqtSignal(int, float)   # (tong so file, so giay)
+
+    def __init__(self, folder: str, include=None, exclude=None, max_depth: int = 0,
+                 skip_dirs=(), batch_size: int = 500, batch_seconds: float = 0.25):
+        super().__init__()
+        self.folder = folder
+        self.include = include
+        self.exclude = exclude
+        self.max_depth = max_depth
+        self.skip_dirs = skip_dirs
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self._stop = False
+
+    def stop(self):
+        self._stop = True
+
+    def run(self):
+        start = last = time.monotonic()
+        total, chunk = 0, []
+        for item in scan(self.folder, self.include, self.exclude, self.max_depth,
+                         skip_dirs=self.skip_dirs, should_stop=lambda: self._stop):
+            chunk.append(item)
+            now = time.monotonic()
+            # Flush by count or by time: a slow network share still shows rows early
+            if len(chunk) >= self.batch_size or now - last >= self.batch_seconds:
+                total += len(chunk)
+                self.batch.emit(chunk)
+                chunk, last = [], now
+            if self._stop:
+                break
+        if chunk and not self._stop:
+            total += len(chunk)
+            self.batch.emit(chunk)
+        self.finished.emit(total, time.monotonic() - start)
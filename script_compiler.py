@@ -0,0 +1,611 @@
+"""Bien dich script FFmpeg (scripts/*.txt) thanh model co cau truc va argv de exec truc tiep.
+
+Script la mot lenh ffmpeg voi placeholder {input} / {output}, vi du:
+    ffmpeg -y -i {input} -vf "scale=1280:720,hflip" -c:v libx264 -c:a aac {output}.mp4
+Dong bat dau bang '#' la comment.
+"""
+import os
+import re
+import shlex
+import subprocess
+from dataclasses import dataclass, field
+
+INPUT_PLACEHOLDER = "{input}"
+OUTPUT_PLACEHOLDER = "{output}"
+PLACEHOLDER_RE = re.compile(r"\{(input|output)\}")
+
+PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+# Options khong co gia tri di kem
+FLAG_OPTS = {
+    "-y", "-n", "-an", "-vn", "-sn", "-dn", "-shortest", "-nostdin", "-hide_banner",
+    "-stats", "-nostats", "-copyts", "-start_at_zero", "-re", "-autorotate", "-noautorotate",
+    "-accurate_seek", "-noaccurate_seek",
+}
+# Options toan cuc (dat o dau lenh, khong thuoc input/output nao)
+GLOBAL_OPTS = {
+    "-y", "-n", "-nostdin", "-hide_banner", "-loglevel", "-v", "-stats", "-nostats",
+    "-progress", "-filter_complex_threads", "-filter_threads",
+}
+VIDEO_FILTER_OPTS = {"-vf", "-filter:v", "-filter:v:0"}
+AUDIO_FILTER_OPTS = {"-af", "-filter:a", "-filter:a:0"}
+CODEC_OPTS = {"-c": "", "-codec": "", "-c:v": "v", "-codec:v": "v", "-vcodec": "v",
+              "-c:a": "a", "-codec:a": "a", "-acodec": "a"}
+FFMPEG_NAMES = {"ffmpeg", "ffmpeg.exe"}
+# setpts=k*PTS / PTS*k / PTS/k (co the kem -STARTPTS); bieu thuc khac => khong biet he so
+SETPTS_RE = re.compile(r"^(?:(?P<mul>[\d.]+)\*)?\(?PTS(?:-STARTPTS)?\)?(?:(?P<op>[*/])(?P<k>[\d.]+))?$")
+
+
+class ScriptError(ValueError):
+    """Loi cu phap trong script FFmpeg."""
+
+
+def _split_top(text: str, sep: str) -> list:
+    """Tach text theo sep, bo qua sep nam trong '...', [...] hoac sau dau '\\'."""
+    parts, buf = [], []
+    quote = False
+    depth = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            buf.append(text[i:i + 2])
+            i += 2
+            continue
+        if ch == "'":
+            quote = not quote
+        elif not quote and ch == "[":
+            depth += 1
+        elif not quote and ch == "]":
+            depth -= 1
+        if ch == sep and not quote and depth == 0:
+            parts.append("".join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    if quote:
+        raise ScriptError(f"Thieu dau ' dong trong filter: {text}")
+    parts.append("".join(buf))
+    return parts
+
+
+@dataclass
+class Filter:
+    name: str
+    args: str = ""
+
+    def params(self):
+        """Tach args thanh (positional list, named dict): 'a:b:x=1' -> (['a','b'], {'x':'1'})."""
+        positional, named = [], {}
+        if not self.args:
+            return positional, named
+        for part in _split_top(self.args, ":"):
+            key, eq, value = part.partition("=")
+            if eq and re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", key):
+                named[key] = value
+            else:
+                positional.append(part)
+        return positional, named
+
+    def render(self) -> str:
+        return f"{self.name}={self.args}" if self.args else self.name
+
+    @classmethod
+    def parse(cls, text: str) -> "Filter":
+        text = text.strip()
+        if not text:
+            raise ScriptError("Filter rong trong chuoi filter (thua dau ',')")
+        name, _, args = text.partition("=")
+        if not re.fullmatch(r"[A-Za-z0-9_]+(@[A-Za-z0-9_]+)?", name.strip()):
+            raise ScriptError(f"Ten filter khong hop le: '{name}'")
+        return cls(name.strip(), args.strip())
+
+
+@dataclass
+class FilterChain:
+    """Chuoi filter don gian (a,b,c). Graph co nhan [x] hoac ';' giu nguyen trong raw."""
+    filters: list = field(default_factory=list)
+    raw: str = ""
+
+    @property
+    def is_simple(self) -> bool:
+        return not self.raw
+
+    def __bool__(self):
+        return bool(self.raw or self.filters)
+
+    def names(self) -> list:
+        return [f.name for f in self.filters]
+
+    def render(self) -> str:
+        return self.raw or ",".join(f.render() for f in self.filters)
+
+    @classmethod
+    def parse(cls, text: str) -> "FilterChain":
+        text = text.strip()
+        if not text:
+            raise ScriptError("Chuoi filter rong")
+        if len(_split_top(text, ";")) > 1 or re.search(r"\[[^\]]*\]", text):
+            return cls(raw=text)
+        return cls(filters=[Filter.parse(p) for p in _split_top(text, ",")])
+
+
+@dataclass
+class InputSpec:
+    path: str
+    options: list = field(default_factory=list)   # [(opt, value|None)]
+
+    @property
+    def is_main(self) -> bool:
+        return INPUT_PLACEHOLDER in self.path
+
+
+@dataclass
+class ScriptModel:
+    binary: str = "ffmpeg"
+    global_opts: list = field(default_factory=list)    # [(opt, value|None)]
+    inputs: list = field(default_factory=list)         # [InputSpec]
+    vf: FilterChain = field(default_factory=FilterChain)
+    af: FilterChain = field(default_factory=FilterChain)
+    filter_complex: str = ""
+    codecs: dict = field(default_factory=dict)         # {"": copy, "v": libx264, "a": aac}
+    options: list = field(default_factory=list)        # output options con lai [(opt, value|None)]
+    output: str = OUTPUT_PLACEHOLDER + ".mp4"
+    name: str = ""
+
+    # ── truy van ────────────────────────────────────────────
+
+    @property
+    def ext(self) -> str:
+        tail = self.output.split(OUTPUT_PLACEHOLDER, 1)[1]
+        return os.path.splitext(tail)[1] or tail
+
+    @property
+    def main_input(self) -> InputSpec:
+        return next(i for i in self.inputs if i.is_main)
+
+    def extra_inputs(self) -> list:
+        return [i.path for i in self.inputs if not i.is_main]
+
+    def codec(self, kind: str) -> str:
+        """Encoder cho 'v' / 'a' ("" neu de ffmpeg tu chon)."""
+        return self.codecs.get(kind) or self.codecs.get("", "")
+
+    def has(self, opt: str) -> bool:
+        return any(o == opt for o, _ in self.options)
+
+    def option(self, opt: str, default=None):
+        for o, v in self.options:
+            if o == opt:
+                return v
+        return default
+
+    def output_duration(self, input_duration: float) -> float:
+        """Thoi luong output khi input dai input_duration giay (filter_complex: bo qua he so)."""
+        duration = _cut(input_duration, self.main_input.options)
+        streams = []
+        if not self.has("-vn"):
+            streams.append(duration * _time_factor(self.vf, "v"))
+        if not self.has("-an"):
+            streams.append(duration * _time_factor(self.af, "a"))
+        if streams:
+            duration = min(streams) if self.has("-shortest") else max(streams)
+        return _cut(duration, self.options)
+
+    # ── sinh lenh ───────────────────────────────────────────
+
+    def output_args(self) -> list:
+        args = []
+        if self.filter_complex:
+            args += ["-filter_complex", self.filter_complex]
+        if self.vf:
+            args += ["-vf", self.vf.render()]
+        if self.af:
+            args += ["-af", self.af.render()]
+        for spec, codec in self.codecs.items():
+            args += [f"-c:{spec}" if spec else "-c", codec]
+        args += _flatten(self.options)
+        return args
+
+    def argv(self, input_path: str = INPUT_PLACEHOLDER, output_base: str = OUTPUT_PLACEHOLDER,
+             ffmpeg: str = None, progress: bool = False) -> list:
+        """argv de Popen truc tiep (khong qua shell)."""
+        args = [ffmpeg or self.binary]
+        if progress:
+            args += PROGRESS_ARGS
+        args += _flatten(self.global_opts)
+        for inp in self.inputs:
+            args += _flatten(inp.options) + ["-i", inp.path]
+        args += self.output_args()
+        args.append(self.output)
+        values = {"input": input_path, "output": output_base}
+        return [PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], a) for a in args]
+
+    def normalized(self) -> str:
+        """Dang chuan hoa cua lenh (dung lam khoa cache), khong phu thuoc khoang trang/thu tu viet."""
+        return shlex.join(self.argv(ffmpeg="ffmpeg"))
+
+
+def parse_time(value) -> float:
+    """Thoi gian ffmpeg ('90', '1:30', '00:01:30.5') ra giay; None neu khong doc duoc."""
+    try:
+        seconds = 0.0
+        for part in str(value).strip().split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def _time_factor(chain: FilterChain, kind: str) -> float:
+    """He so doi thoi luong cua chuoi filter (setpts cho video, atempo cho audio); 1 neu khong doi."""
+    factor = 1.0
+    for f in chain.filters if chain.is_simple else []:
+        name = f.name.split("@")[0]
+        positional, named = f.params()
+        expr = (named.get("expr") or (positional[0] if positional else "")).replace(" ", "")
+        if kind == "v" and name == "setpts":
+            m = SETPTS_RE.match(expr)
+            if not m:
+                continue
+            k = float(m.group("k") or 1)
+            factor *= float(m.group("mul") or 1) * (1 / k if m.group("op") == "/" else k)
+        elif kind == "a" and name == "atempo":
+            tempo = parse_time(named.get("tempo") or expr)
+            if tempo:
+                factor /= tempo
+    return factor
+
+
+def _cut(duration: float, opts: list) -> float:
+    """Thoi luong sau -ss / -t / -to (cua 1 input hoac cua output)."""
+    values = {o: parse_time(v) for o, v in opts if o in ("-ss", "-t", "-to") and v is not None}
+    start = values.get("-ss") or 0.0
+    end = duration
+    if values.get("-to") is not None:
+        end = min(end, values["-to"])
+    if values.get("-t") is not None:
+        end = min(end, start + values["-t"])
+    return max(0.0, end - start)
+
+
+def output_duration(models: list, input_duration: float) -> float:
+    """Thoi luong du kien cua output cuoi (mau so cho % / ETA): ap dung -ss/-t/-to va he so
+    setpts/atempo cua tung buoc noi tiep. models: cac stage cua pipeline hoac 1 model."""
+    duration = input_duration
+    for model in models:
+        duration = model.output_duration(duration)
+    return duration
+
+
+def _flatten(opts: list) -> list:
+    out = []
+    for opt, value in opts:
+        out.append(opt)
+        if value is not None:
+            out.append(value)
+    return out
+
+
+def tokenize(text: str) -> list:
+    lines = [ln for ln in text.splitlines() if not ln.strip().startswith("#")]
+    lex = shlex.shlex(" ".join(lines), posix=True)
+    lex.whitespace_split = True
+    lex.commenters = ""
+    lex.escape = ""          # giu nguyen '\\' (duong dan Windows, escape trong filter)
+    try:
+        return list(lex)
+    except ValueError as e:
+        raise ScriptError(f"Loi dau nhay: {e}")
+
+
+def compile_script(text: str, name: str = "") -> ScriptModel:
+    """Parse script thanh ScriptModel. Raise ScriptError neu script sai."""
+    tokens = tokenize(text)
+    if not tokens:
+        raise ScriptError("Script trong")
+    model = ScriptModel(binary=tokens[0], name=name)
+    if model.binary.startswith("-"):
+        raise ScriptError("Script phai bat dau bang ten chuong trinh (ffmpeg)")
+
+    pending = []
+    outputs = []
+    i = 1
+    while i < len(tokens):
+        tok = tokens[i]
+        if not tok.startswith("-") or tok == "-":
+            outputs.append(tok)
+            i += 1
+            continue
+        if tok in FLAG_OPTS:
+            value = None
+            i += 1
+        else:
+            if i + 1 >= len(tokens):
+                raise ScriptError(f"Option {tok} thieu gia tri")
+            value = tokens[i + 1]
+            i += 2
+        if outputs:
+            raise ScriptError(f"Chi ho tro 1 output (option {tok} nam sau output)")
+
+        if tok in GLOBAL_OPTS:
+            model.global_opts.append((tok, value))
+        elif tok == "-i":
+            model.inputs.append(InputSpec(value, pending))
+            pending = []
+        elif tok in VIDEO_FILTER_OPTS:
+            model.vf = FilterChain.parse(value)
+        elif tok in AUDIO_FILTER_OPTS:
+            model.af = FilterChain.parse(value)
+        elif tok == "-filter_complex":
+            model.filter_complex = value
+        elif tok in CODEC_OPTS:
+            model.codecs[CODEC_OPTS[tok]] = value
+        else:
+            pending.append((tok, value))
+
+    model.options = pending
+    if not any(i.is_main for i in model.inputs):
+        raise ScriptError("Thieu '-i {input}'")
+    if len(outputs) != 1:
+        raise ScriptError("Can dung 1 output chua {output}, vi du {output}.mp4"
+                          if not outputs else f"Qua nhieu output: {' '.join(outputs)}")
+    if OUTPUT_PLACEHOLDER not in outputs[0]:
+        raise ScriptError(f"Output '{outputs[0]}' thieu placeholder {{output}}")
+    model.output = outputs[0]
+    return model
+
+
+def format_argv(argv: list) -> str:
+    """Hien thi argv thanh 1 dong lenh (de log / preview)."""
+    return subprocess.list2cmdline(argv) if os.name == "nt" else shlex.join(argv)
+
+
+def is_default_ffmpeg(binary: str) -> bool:
+    return os.path.basename(binary).lower() in FFMPEG_NAMES and not os.path.dirname(binary)
+
+
+# ── Fan-out: nhieu script, 1 lan decode ─────────────────────
+
+LABEL_RE = re.compile(r"\[([^\]]+)\]")
+
+
+def _branch_graph(chain: FilterChain, in_label: str, out_label: str, prefix: str) -> str:
+    """Gan nhan vao/ra cho 1 chuoi filter; nhan noi bo cua graph raw duoc doi ten cho khoi trung."""
+    body = chain.render()
+    if not chain.is_simple:
+        body = LABEL_RE.sub(lambda m: f"[{prefix}{m.group(1)}]", body)
+    return f"[{in_label}]{body}[{out_label}]"
+
+
+def fanout_blocker(model: ScriptModel) -> str:
+    """Ly do script khong the gop vao fan-out ("" neu gop duoc)."""
+    if model.extra_inputs():
+        return "co input phu"
+    if model.filter_complex:
+        return "da dung -filter_complex"
+    if model.has("-map"):
+        return "tu -map stream"
+    for chain in (model.vf, model.af):
+        raw = chain.raw.strip()
+        if raw and (raw.startswith("[") or raw.endswith("]")):
+            return "graph co nhan vao/ra"
+    return ""
+
+
+@dataclass
+class FanoutPlan:
+    """1 lenh ffmpeg: decode input 1 lan, split/asplit ra 1 output cho moi script."""
+    models: list
+
+    def filter_complex(self) -> str:
+        parts = []
+        for kind, split, attr in (("v", "split", "vf"), ("a", "asplit", "af")):
+            idx = [i for i, m in enumerate(self.models) if getattr(m, attr)]
+            if not idx:
+                continue
+            if len(idx) == 1:
+                srcs = {idx[0]: f"0:{kind}"}
+            else:
+                srcs = {i: f"{kind}s{i}" for i in idx}
+                parts.append(f"[0:{kind}]{split}={len(idx)}" + "".join(f"[{kind}s{i}]" for i in idx))
+            for i in idx:
+                parts.append(_branch_graph(getattr(self.models[i], attr), srcs[i],
+                                           f"{kind}o{i}", f"f{i}{kind}_"))
+        return ";".join(parts)
+
+    def argv(self, input_path: str, output_bases: list, ffmpeg: str = None,
+             progress: bool = False) -> list:
+        first = self.models[0]
+        args = [ffmpeg or first.binary]
+        if progress:
+            args += PROGRESS_ARGS
+        seen = []
+        for m in self.models:
+            for opt in m.global_opts:
+                if opt not in seen:
+                    seen.append(opt)
+        args += _flatten(seen)
+        args += _flatten(first.main_input.options) + ["-i", input_path]
+        graph = self.filter_complex()
+        if graph:
+            args += ["-filter_complex", graph]
+        for i, (m, base) in enumerate(zip(self.models, output_bases)):
+            if not m.has("-vn"):
+                args += ["-map", f"[vo{i}]" if m.vf else "0:v:0?"]
+            if not m.has("-an"):
+                args += ["-map", f"[ao{i}]" if m.af else "0:a:0?"]
+            for spec, codec in m.codecs.items():
+                args += [f"-c:{spec}" if spec else "-c", codec]
+            args += _flatten(m.options)
+            args.append(m.output.replace(OUTPUT_PLACEHOLDER, base))
+        return args
+
+
+def plan_fanout(models: list):
+    """Chia models thanh (FanoutPlan hoac None, [models phai chay rieng]).
+
+    Chi gop cac script khong co input phu/-map/-filter_complex va co cung input options (-ss...).
+    """
+    fusable, singles = [], []
+    for m in models:
+        if fanout_blocker(m) or (fusable and m.main_input.options != fusable[0].main_input.options):
+            singles.append(m)
+        else:
+            fusable.append(m)
+    if len(fusable) < 2:
+        return None, models
+    return FanoutPlan(fusable), singles
+
+
+# ── Pipeline: noi chuoi nhieu script, khong re-encode trung gian ──
+
+# Options chi anh huong encoder/container -> lay theo buoc cuoi khi gop
+ENCODER_OPTS = {
+    "-crf", "-preset", "-tune", "-profile", "-profile:v", "-level", "-b:v", "-b:a",
+    "-maxrate", "-bufsize", "-qp", "-q:v", "-q:a", "-x264-params", "-x265-params",
+    "-g", "-movflags", "-f",
+}
+# Options cua buoc truoc van giu nguyen nghia khi dua xuong cuoi lenh da gop
+CARRY_OPTS = {"-shortest", "-t", "-to", "-an", "-vn", "-sn"}
+TRIM_OPTS = {"-t", "-to", "-ss"}
+# Filter doi moc thoi gian / thoi luong: -t/-to cua buoc truoc khong duoc doi ra sau chung
+TIMING_FILTERS = {
+    "setpts", "asetpts", "atempo", "asetrate", "rubberband", "trim", "atrim", "tpad", "apad",
+    "loop", "aloop", "select", "aselect", "reverse", "areverse",
+}
+
+
+def _concat_chains(a: FilterChain, b: FilterChain) -> FilterChain:
+    if not a:
+        return b
+    if not b:
+        return a
+    return FilterChain(filters=a.filters + b.filters)
+
+
+def fusion_blocker(prev: ScriptModel, step: ScriptModel) -> str:
+    """Ly do khong gop duoc step vao sau prev ("" neu gop duoc)."""
+    if step.extra_inputs():
+        return "co input phu"
+    if prev.filter_complex or step.filter_complex:
+        return "dung -filter_complex"
+    if step.has("-map"):
+        return "tu -map stream"
+    if step.main_input.options:
+        return "co option input (-ss...)"
+    for a, b in ((prev.vf, step.vf), (prev.af, step.af)):
+        if a and b and not (a.is_simple and b.is_simple):
+            return "graph co nhan"
+    for opt, _ in prev.options:
+        if opt not in CARRY_OPTS and opt not in ENCODER_OPTS and opt != "-map":
+            return f"option {opt} o buoc truoc"
+    trims = [o for o, _ in prev.options if o in TRIM_OPTS]
+    if trims:
+        # The carried cut would apply after step's filters / next to step's own cut
+        timing = _timing_filters(step)
+        if timing:
+            return f"{trims[0]} o buoc truoc, filter thoi gian {', '.join(sorted(timing))} o buoc sau"
+        if any(o in TRIM_OPTS for o, _ in step.options):
+            return "cat thoi gian o ca 2 buoc"
+    return ""
+
+
+def _timing_filters(model: ScriptModel) -> set:
+    names = set()
+    for chain in (model.vf, model.af):
+        if chain:
+            names.update(n.split("@")[0] for n in re.findall(r"[A-Za-z0-9_@]+", chain.render()))
+    return names & TIMING_FILTERS
+
+
+def fuse(prev: ScriptModel, step: ScriptModel) -> ScriptModel:
+    """Gop 2 buoc: filter noi tiep nhau, encoder/container theo buoc sau."""
+    step_opts = {o for o, _ in step.options}
+    carried = [(o, v) for o, v in prev.options
+               if (o in CARRY_OPTS or o == "-map") and o not in step_opts]
+    global_opts = list(prev.global_opts) + [g for g in step.global_opts if g not in prev.global_opts]
+    fused = ScriptModel(
+        binary=prev.binary,
+        global_opts=global_opts,
+        inputs=[InputSpec(i.path, list(i.options)) for i in prev.inputs],
+        vf=_concat_chains(prev.vf, step.vf),
+        af=_concat_chains(prev.af, step.af),
+        codecs=dict(step.codecs),
+        options=carried + list(step.options),
+        output=step.output,
+        name=f"{prev.name}+{step.name}" if prev.name else step.name,
+    )
+    # Stream copy khong di kem filter duoc -> de ffmpeg chon encoder mac dinh cho stream do
+    for kind, chain in (("v", fused.vf), ("a", fused.af)):
+        if chain and fused.codec(kind) == "copy":
+            if fused.codecs.get("") == "copy":
+                del fused.codecs[""]
+                other = "a" if kind == "v" else "v"
+                fused.codecs.setdefault(other, "copy")
+            fused.codecs.pop(kind, None)
+    for kind, chain in (("v", fused.vf), ("a", fused.af)):
+        if chain and fused.codecs.get(kind) == "copy":
+            del fused.codecs[kind]
+    if fused.has("-an"):
+        fused.af = FilterChain()
+    if fused.has("-vn"):
+        fused.vf = FilterChain()
+    return fused
+
+
+def plan_pipeline(models: list) -> list:
+    """Gop chuoi script thanh it stage nhat co the. Moi stage la 1 lenh ffmpeg."""
+    stages = [models[0]]
+    for step in models[1:]:
+        if fusion_blocker(stages[-1], step):
+            stages.append(step)
+        else:
+            stages[-1] = fuse(stages[-1], step)
+    return stages
+
+
+DEFAULT_ENCODERS = {"v": "libx264", "a": "aac"}
+
+
+def _intermediate(model: ScriptModel, next_model: ScriptModel) -> ScriptModel:
+    """Stage giua: xuat NUT ra stdout.
+
+    Stream ma stage sau chi copy thi encode that (nhu khi chay rieng); con lai dung
+    rawvideo/pcm de khong mat chat luong qua them 1 the he encode.
+    """
+    codecs = {}
+    real_encode = False
+    for kind, raw in (("v", "rawvideo"), ("a", "pcm_s16le")):
+        chain = model.vf if kind == "v" else model.af
+        next_chain = next_model.vf if kind == "v" else next_model.af
+        if model.codec(kind) == "copy" and not chain:
+            codecs[kind] = "copy"
+        elif next_model.codec(kind) == "copy" and not next_chain:
+            codecs[kind] = model.codec(kind) or DEFAULT_ENCODERS[kind]
+            real_encode = True
+        else:
+            codecs[kind] = raw
+    options = [(o, v) for o, v in model.options
+               if o not in ENCODER_OPTS or (real_encode and o not in ("-f", "-movflags"))]
+    return ScriptModel(binary=model.binary, global_opts=model.global_opts, inputs=model.inputs,
+                       vf=model.vf, af=model.af, filter_complex=model.filter_complex,
+                       codecs=codecs, options=options + [("-f", "nut")],
+                       output="pipe:1", name=model.name)
+
+
+def pipeline_argvs(stages: list, input_path: str, output_base: str, ffmpeg: str = None,
+                   progress: bool = False) -> list:
+    """argv cho tung stage; stage k doc stdout cua stage k-1 qua pipe (khong ghi file trung gian)."""
+    argvs = []
+    for i, stage in enumerate(stages):
+        last = i == len(stages) - 1
+        model = stage if last else _intermediate(stage, stages[i + 1])
+        if i > 0:
+            inputs = [InputSpec(inp.path, [("-f", "nut")] + inp.options) if inp.is_main else inp
+                      for inp in model.inputs]
+            model = ScriptModel(**{**model.__dict__, "inputs": inputs})
+        argvs.append(model.argv("pipe:0" if i else input_path, output_base,
+                                ffmpeg=ffmpeg, progress=progress and last))
+    return argvs
@@ -0,0 +1,174 @@
+"""Encode video dai theo doan song song: cat theo keyframe (stream copy), encode tung doan
+cung script tren nhieu core, audio encode 1 lan, roi noi lai bang concat demuxer.
+
+Moi doan xong duoc ghi vao state.json => job bi dung/crash chay lai se tiep tuc tu doan chua xong.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+
+from script_compiler import OUTPUT_PLACEHOLDER, FilterChain, ScriptModel
+
+SEGMENT_DIR = ".segments"
+STATE_NAME = "state.json"
+
+# Filter phu thuoc thoi gian tuyet doi / toan bo video => cat doan se cho ket qua khac
+TIME_FILTERS = {
+    "fade", "trim", "select", "tpad", "loop", "reverse", "tblend", "tmix", "minterpolate",
+    "framestep", "zoompan", "deflicker", "thumbnail", "xfade", "setpts",
+}
+# Option output chi danh cho file cuoi (container), khong dung cho tung doan
+MUX_OPTS = {"-movflags", "-f", "-metadata", "-map_metadata", "-shortest"}
+
+
+def segment_blocker(model: ScriptModel) -> str:
+    """Ly do script khong chay duoc theo doan ("" neu duoc)."""
+    if model.extra_inputs() or model.filter_complex or model.has("-map"):
+        return "lenh phuc tap"
+    if model.main_input.options:
+        return "co option input (-ss...)"
+    if any(o in ("-t", "-to", "-ss", "-frames:v", "-vframes", "-vn") for o, _ in model.options):
+        return "co cat thoi gian / khong co video"
+    if model.codec("v") == "copy":
+        return "video chi copy"
+    if not model.vf.is_simple:
+        return "graph co nhan"
+    used = TIME_FILTERS.intersection(f.name.split("@")[0] for f in model.vf.filters)
+    if used:
+        return f"filter theo thoi gian: {', '.join(sorted(used))}"
+    return ""
+
+
+def _atomic_json(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+class SegmentJob:
+    """1 input x 1 script chay theo doan. Thu muc lam viec: <output_dir>/.segments/<ten>_<hash>/."""
+
+    def __init__(self, model: ScriptModel, input_path: str, output_dir: str,
+                 segment_seconds: float = 60, ffmpeg: str = "ffmpeg"):
+        self.model = model
+        self.input_path = input_path
+        self.segment_seconds = segment_seconds
+        self.ffmpeg = ffmpeg
+        st = os.stat(input_path)
+        ident = f"{os.path.abspath(input_path)}|{st.st_size}|{st.st_mtime_ns}|{model.normalized()}"
+        digest = hashlib.blake2b(ident.encode("utf-8"), digest_size=6).hexdigest()
+        name = os.path.splitext(os.path.basename(input_path))[0][:40]
+        self.dir = os.path.join(output_dir, SEGMENT_DIR, f"{name}_{digest}")
+        self._state_path = os.path.join(self.dir, STATE_NAME)
+        self.state = {"input": os.path.abspath(input_path), "segment_seconds": segment_seconds,
+                      "split": False, "segments": [], "done": [], "audio": False}
+        self.resumed = False
+        if os.path.exists(self._state_path):
+            try:
+                with open(self._state_path, "r", encoding="utf-8") as f:
+                    self.state.update(json.load(f))
+                self.resumed = bool(self.state["done"]) or self.state["audio"]
+            except (OSError, ValueError):
+                pass
+
+    # ── trang thai ──────────────────────────────────────────
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def save(self):
+        _atomic_json(self._state_path, self.state)
+
+    @property
+    def ext(self) -> str:
+        return self.model.ext
+
+    def encoded(self, i: int) -> str:
+        return self._path(f"enc_{i:04d}{self.ext}")
+
+    def pending(self) -> list:
+        """Chi so cac doan chua encode xong (file doan da xong phai con nguyen)."""
+        done = [i for i in self.state["done"]
+                if os.path.isfile(self.encoded(i)) and os.path.getsize(self.encoded(i)) > 0]
+        self.state["done"] = done
+        return [i for i in range(len(self.state["segments"])) if i not in done]
+
+    def mark_split(self):
+        names = sorted(f for f in os.listdir(self.dir) if f.startswith("src_"))
+        self.state["segments"] = names
+        self.state["split"] = True
+        self.save()
+
+    def mark_done(self, i: int):
+        if i not in self.state["done"]:
+            self.state["done"].append(i)
+        self.save()
+
+    def mark_audio(self):
+        self.state["audio"] = True
+        self.save()
+
+    @property
+    def needs_audio(self) -> bool:
+        return not self.model.has("-an") and not self.state["audio"]
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.dir))   # .segments rong thi xoa luon
+        except OSError:
+            pass
+
+    # ── lenh ffmpeg ─────────────────────────────────────────
+
+    def split_argv(self) -> list:
+        """Cat video (khong audio) thanh doan ~segment_seconds, chi cat tai keyframe (stream copy)."""
+        os.makedirs(self.dir, exist_ok=True)
+        for f in os.listdir(self.dir):
+            if f.startswith("src_"):
+                os.remove(self._path(f))
+        src_ext = os.path.splitext(self.input_path)[1].lower()
+        src_ext = src_ext if src_ext in (".mp4", ".mkv", ".mov", ".ts") else ".mkv"
+        return [self.ffmpeg, "-y", "-v", "error", "-i", self.input_path,
+                "-map", "0:v:0", "-c", "copy", "-f", "segment",
+                "-segment_time", str(self.segment_seconds), "-reset_timestamps", "1",
+                self._path(f"src_%04d{src_ext}")]
+
+    def segment_argv(self, i: int) -> list:
+        model = dataclasses.replace(
+            self.model, af=FilterChain(),
+            options=[(o, v) for o, v in self.model.options if o not in MUX_OPTS] + [("-an", None)],
+            output=OUTPUT_PLACEHOLDER + self.ext)
+        return model.argv(self._path(self.state["segments"][i]), self._path(f"enc_{i:04d}"),
+                          ffmpeg=self.ffmpeg, progress=True)
+
+    def audio_argv(self) -> list:
+        """Audio cua ca file trong 1 lan (filter audio + codec theo script)."""
+        model = dataclasses.replace(
+            self.model, vf=FilterChain(),
+            options=[(o, v) for o, v in self.model.options if o not in MUX_OPTS] + [("-vn", None)],
+            output=OUTPUT_PLACEHOLDER + self.ext)
+        return model.argv(self.input_path, self._path("audio"), ffmpeg=self.ffmpeg, progress=True)
+
+    def concat_argv(self, output_base: str) -> list:
+        list_path = self._path("list.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for i in range(len(self.state["segments"])):
+                f.write(f"file '{os.path.basename(self.encoded(i))}'\n")
+        argv = [self.ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+        audio = self._path("audio" + self.ext)
+        has_audio = not self.model.has("-an") and os.path.isfile(audio)
+        if has_audio:
+            argv += ["-i", audio]
+        argv += ["-map", "0:v:0"]
+        if has_audio:
+            argv += ["-map", "1:a:0?"]
+        argv += ["-c", "copy"]
+        for o, v in self.model.options:
+            if o in MUX_OPTS:
+                argv += [o] + ([v] if v is not None else [])
+        argv.append(self.model.output.replace(OUTPUT_PLACEHOLDER, output_base))
+        return argv
@@ -1,5 +1,7 @@
+import atexit
 import json
 import os
+import threading
 
 SETTINGS_FILE = "settings.json"
 
@@ -10,6 +12,13 @@ DEFAULT_SETTINGS = {
     "input_folder": "",
     "scripts_folder": "scripts",
     "download_quality": "best",
+    "download_max_parallel": 4,
+    "download_limit_tiktok": 3,
+    "download_limit_youtube": 3,
+    "download_limit_instagram": 1,
+    "download_limit_facebook": 2,
+    "download_archive_enabled": True,
+    "info_cache_ttl_minutes": 120,
     "no_watermark_tiktok": True,
     "auto_reup_after_download": False,
     "output_naming": "{name}_reup",
@@ -19,6 +28,27 @@ DEFAULT_SETTINGS = {
     "scheduler_action": "download_and_process",
     "theme": "dark",
     "max_workers": 2,
+    "result_cache_enabled": True,
+    "result_cache_max_gb": 20,
+    "last_pipeline": [],
+    "smart_plan_enabled": True,
+    "filter_optimizer": "safe",
+    "segment_enabled": True,
+    "segment_min_minutes": 20,
+    "segment_seconds": 60,
+    "schedule_policy": "filename",
+    "hot_folder_stable_seconds": 3,
+    "hot_folder_poll_seconds": 5,
+    "scan_include": "",
+    "scan_exclude": "",
+    "scan_max_depth": 0,
+    "log_max_lines": 5000,
+    "log_fps": 10,
+    "log_level": "INFO",
+    "log_file_max_mb": 5,
+    "log_file_backups": 5,
+    "ui_refresh_hz": 10,
+    "stats_flush_seconds": 10,
     "stat_downloaded": 0,
     "stat_processed": 0,
     "stat_errors": 0,
@@ -30,39 +60,141 @@ DEFAULT_SETTINGS = {
 }
 
 
-def load_settings() -> dict:
-    if os.path.exists(SETTINGS_FILE):
+class _SettingsStore:
+    """settings.json doc 1 lan, doc tiep tu RAM; file doi tu ben ngoai (mtime/size) thi doc lai.
+    Ghi duoc gom lai (debounce) va ghi nguyen tu (file tam + os.replace)."""
+
+    def __init__(self, path: str = SETTINGS_FILE, save_delay: float = 0.3):
+        self.path = path
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._data = None
+        self._stamp = None          # (mtime_ns, size) cua file da doc / da ghi
+        self._timer = None
+        self._subscribers = []
+
+    def _file_stamp(self):
         try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # Merge with defaults for any missing keys
-            merged = {**DEFAULT_SETTINGS, **data}
-            return merged
-        except Exception:
-            pass
-    return dict(DEFAULT_SETTINGS)
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _read(self) -> dict:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                # Merge with defaults for any missing keys
+                return {**DEFAULT_SETTINGS, **data}
+            except Exception:
+                pass
+        return dict(DEFAULT_SETTINGS)
+
+    def data(self) -> dict:
+        """Ban trong RAM (khong copy); doc lai neu file bi sua ngoai app."""
+        changed = None
+        with self._lock:
+            stamp = self._file_stamp()
+            # A pending save wins over the file: it holds newer values
+            if self._data is None or (stamp != self._stamp and self._timer is None):
+                old, self._data, self._stamp = self._data, self._read(), stamp
+                if old is not None:
+                    changed = {k for k in set(old) | set(self._data) if old.get(k) != self._data.get(k)}
+            data = self._data
+        if changed:
+            self._notify(changed)
+        return data
+
+    def update(self, values: dict, replace: bool = False):
+        with self._lock:
+            current = self.data()
+            new = {**DEFAULT_SETTINGS, **values} if replace else {**current, **values}
+            changed = {k for k in set(current) | set(new) if current.get(k) != new.get(k)}
+            if not changed:
+                return
+            self._data = new
+            self._schedule_save()
+        self._notify(changed)
+
+    def _schedule_save(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Ghi ngay phan dang cho (goi khi tat app)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            else:
+                return
+            payload = json.dumps(self._data, indent=2, ensure_ascii=False)
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp, self.path)
+                self._stamp = self._file_stamp()
+            except Exception as e:
+                print(f"[Settings] Lỗi lưu settings: {e}")
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, keys: set):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(keys)
+            except Exception as e:
+                print(f"[Settings] Loi subscriber: {e}")
+
+
+_store = _SettingsStore()
+atexit.register(_store.flush)
+
+
+def load_settings() -> dict:
+    """Ban sao cua settings (sua thoai mai roi save_settings)."""
+    return dict(_store.data())
 
 
 def save_settings(settings: dict):
-    try:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"[Settings] Lỗi lưu settings: {e}")
+    _store.update(settings, replace=True)
 
 
 def get(key: str, default=None):
-    s = load_settings()
-    return s.get(key, default)
+    return _store.data().get(key, default)
 
 
 def set_value(key: str, value):
-    s = load_settings()
-    s[key] = value
-    save_settings(s)
+    _store.update({key: value})
+
+
+def reload_if_changed():
+    """Kiem tra file (mtime/size), doc lai va bao subscriber neu bi sua ngoai app."""
+    _store.data()
+
+
+def flush():
+    _store.flush()
+
+
+def subscribe(callback):
+    """callback(keys: set) khi settings doi (trong app hoac file bi sua ngoai).
+    Co the chay tren thread bat ky: code Qt nen dung settings_bridge."""
+    _store.subscribe(callback)
 
 
-def increment(key: str, by: int = 1):
-    s = load_settings()
-    s[key] = s.get(key, 0) + by
-    save_settings(s)
+def unsubscribe(callback):
+    _store.unsubscribe(callback)
@@ -0,0 +1,62 @@
+"""Chuyen thong bao doi settings sang thread UI (signal Qt) va theo doi settings.json bi sua
+ngoai app bang QFileSystemWatcher => cac tab subscribe thay vi tu doc lai dinh ky.
+"""
+import os
+
+from PyQt5.QtCore import QCoreApplication, QObject, QFileSystemWatcher, pyqtSignal
+
+import settings
+
+
+class SettingsBridge(QObject):
+    changed = pyqtSignal(object)     # set cac key vua doi
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings.subscribe(self._forward)
+        app = QCoreApplication.instance()
+        if app is not None:
+            # Saves made at exit (atexit) must not reach widgets that are already gone
+            app.aboutToQuit.connect(self.close)
+        self._watcher = QFileSystemWatcher(self)
+        # The folder is watched too: an atomic save replaces the file and drops a file watch
+        path = os.path.abspath(settings.SETTINGS_FILE)
+        self._watcher.addPath(os.path.dirname(path))
+        if os.path.exists(path):
+            self._watcher.addPath(path)
+        self._watcher.directoryChanged.connect(self._on_fs_change)
+        self._watcher.fileChanged.connect(self._on_fs_change)
+
+    def _forward(self, keys: set):
+        # Emitting from any thread is fine: Qt queues the signal to GUI-thread receivers
+        self.changed.emit(keys)
+
+    def close(self):
+        settings.unsubscribe(self._forward)
+
+    def _on_fs_change(self, _path: str):
+        path = os.path.abspath(settings.SETTINGS_FILE)
+        if os.path.exists(path) and path not in self._watcher.files():
+            self._watcher.addPath(path)
+        settings.reload_if_changed()
+
+    def on_change(self, keys, callback):
+        """Goi callback(changed_keys) khi 1 trong keys doi (keys=None: moi key)."""
+        wanted = set(keys) if keys else None
+
+        def handler(changed):
+            if wanted is None or wanted & changed:
+                callback(changed)
+        self.changed.connect(handler)
+        return handler
+
+
+_bridge = None
+
+
+def bridge() -> SettingsBridge:
+    """Bridge dung chung (tao lan dau tren thread UI)."""
+    global _bridge
+    if _bridge is None:
+        _bridge = SettingsBridge()
+    return _bridge
@@ -0,0 +1,69 @@
+"""Gop cap nhat tu worker truoc khi toi UI: worker (thread bat ky) ghi vao snapshot chung,
+UI lay phan thay doi theo tan so co dinh (mac dinh 10 Hz) va ap dung 1 lan.
+
+Nhieu lan doi cua cung 1 dong trong 1 frame chi con ban cuoi (vd. 30 lan progress -> 1).
+Log khong gop ma giu thu tu, chuyen sang UI theo lo.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class StateHub:
+    """Snapshot thay doi chua ap dung: {key: {field: value}} + danh sach log."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = {}
+        self._logs = []
+
+    def update(self, key, **fields):
+        """key: so dong (hoac ten, vd. "batch"); field trung trong cung frame -> giu gia tri moi nhat."""
+        with self._lock:
+            entry = self._dirty.get(key)
+            if entry is None:
+                self._dirty[key] = fields
+            else:
+                entry.update(fields)
+
+    def log(self, msg: str):
+        with self._lock:
+            self._logs.append(msg)
+
+    def take(self):
+        """Lay va xoa phan thay doi: (changes, logs)."""
+        with self._lock:
+            changes, self._dirty = self._dirty, {}
+            logs, self._logs = self._logs, []
+        return changes, logs
+
+    def discard(self, field: str = None):
+        """Bo phan chua ap dung (chi field do neu co, vd. ket qua probe cua danh sach cu)."""
+        with self._lock:
+            if field is None:
+                self._dirty, self._logs = {}, []
+                return
+            for entry in self._dirty.values():
+                entry.pop(field, None)
+
+
+class StatePoller(QObject):
+    """Doc StateHub tren thread UI moi 1/hz giay, phat updated(changes, logs) neu co thay doi."""
+    updated = pyqtSignal(object, object)   # (changes: dict, logs: list)
+
+    def __init__(self, hub: StateHub, hz: float = 10, parent=None):
+        super().__init__(parent)
+        self.hub = hub
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(16, int(1000 / max(1.0, hz))))
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def flush(self):
+        """Ap dung ngay (vd. truoc khi xu ly finished de trang thai cuoi khong bi tre)."""
+        changes, logs = self.hub.take()
+        if changes or logs:
+            self.updated.emit(changes, logs)
+
+    def stop(self):
+        self._timer.stop()
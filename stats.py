@@ -0,0 +1,140 @@
+"""Thong ke (so video tai / xu ly / loi) giu trong RAM, ghi ra cache/stats.json dinh ky
+(file tam + rename) va khi tat app, thay cho settings.increment doc/ghi settings.json moi file.
+
+Dang luu:
+    {"totals": {"processed": n, ...},
+     "days": {"2024-05-01": {"processed": n, ...}},
+     "scripts": {"ten_script": {"processed": n, "errors": n}}}
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+import settings
+
+STATS_PATH = os.path.join("cache", "stats.json")
+KEEP_DAYS = 90
+
+DOWNLOADED, PROCESSED, ERRORS = "downloaded", "processed", "errors"
+# Counters that used to live in settings.json (seeded once on first run)
+LEGACY_KEYS = {DOWNLOADED: "stat_downloaded", PROCESSED: "stat_processed", ERRORS: "stat_errors"}
+
+
+class StatsStore:
+    def __init__(self, path: str = STATS_PATH, flush_seconds: float = 10):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()    # one writer at a time, newest snapshot last
+        self._dirty = False
+        self._data = self._load()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, name="stats-flush", daemon=True)
+        self._thread.start()
+
+    def _load(self) -> dict:
+        data = {"totals": {}, "days": {}, "scripts": {}}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data.update(json.load(f))
+            return data
+        except (OSError, ValueError):
+            pass
+        s = settings.load_settings()
+        for key, legacy in LEGACY_KEYS.items():
+            if s.get(legacy):
+                data["totals"][key] = int(s[legacy])
+        self._dirty = bool(data["totals"])
+        return data
+
+    def incr(self, key: str, by: int = 1, scripts=()):
+        """Cong by vao tong, ngay hom nay va tung script trong scripts (an toan giua cac thread)."""
+        day = time.strftime("%Y-%m-%d")
+        with self._lock:
+            d = self._data
+            d["totals"][key] = d["totals"].get(key, 0) + by
+            today = d["days"].setdefault(day, {})
+            today[key] = today.get(key, 0) + by
+            for name in scripts:
+                per = d["scripts"].setdefault(name, {})
+                per[key] = per.get(key, 0) + by
+            self._dirty = True
+
+    def totals(self) -> dict:
+        with self._lock:
+            return dict(self._data["totals"])
+
+    def day(self, day: str = None) -> dict:
+        with self._lock:
+            return dict(self._data["days"].get(day or time.strftime("%Y-%m-%d"), {}))
+
+    def days(self, n: int = 7) -> list:
+        """[(ngay, {key: n}), ...] n ngay gan nhat co so lieu, moi nhat truoc."""
+        with self._lock:
+            return [(k, dict(v)) for k, v in sorted(self._data["days"].items(), reverse=True)[:n]]
+
+    def scripts(self) -> dict:
+        with self._lock:
+            return {k: dict(v) for k, v in self._data["scripts"].items()}
+
+    def reset(self):
+        with self._lock:
+            self._data = {"totals": {}, "days": {}, "scripts": {}}
+            self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """Ghi ra dia neu co thay doi (file tam + os.replace => khong bao gio con file ghi do)."""
+        with self._io_lock:
+            self._write()
+
+    def _write(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            days = self._data["days"]
+            for old in sorted(days)[:-KEEP_DAYS]:
+                del days[old]
+            payload = json.dumps(self._data, ensure_ascii=False, indent=1)
+            self._dirty = False
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            with self._lock:
+                self._dirty = True       # retry on the next tick
+            print(f"[Stats] Khong ghi duoc {self.path}: {e}")
+
+    def _flush_loop(self):
+        while not self._wake.wait(self.flush_seconds):
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_stats() -> StatsStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StatsStore(flush_seconds=float(settings.get("stats_flush_seconds", 10)))
+            atexit.register(_store.close)
+        return _store
+
+
+def incr(key: str, by: int = 1, scripts=()):
+    get_stats().incr(key, by, scripts)
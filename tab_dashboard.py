@@ -4,6 +4,10 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QTimer
 import settings
+import downloader
+import result_cache
+import settings_bridge
+import stats
 
 
 class StatCard(QWidget):
@@ -39,8 +43,14 @@ class DashboardTab(QWidget):
         self._build_ui()
         self._refresh_timer = QTimer()
         self._refresh_timer.timeout.connect(self.refresh_stats)
+        # Counters change on every file (stats store); settings changes arrive as notifications
         self._refresh_timer.start(5000)
+        settings_bridge.bridge().on_change(None, lambda _keys: self.refresh_stats())
         self.refresh_stats()
+        # Download speed is live, so it gets its own faster (and much cheaper) refresh
+        self._speed_timer = QTimer(self)
+        self._speed_timer.timeout.connect(self.refresh_speed)
+        self._speed_timer.start(1000)
 
     def _build_ui(self):
         outer = QVBoxLayout(self)
@@ -54,7 +64,10 @@ class DashboardTab(QWidget):
         self.card_processed  = StatCard("Video da xu ly", "0", "#2ea043")
         self.card_errors     = StatCard("Loi", "0", "#f85149")
         self.card_scripts    = StatCard("Script FFmpeg", "0", "#e3b341")
-        for c in [self.card_downloaded, self.card_processed, self.card_errors, self.card_scripts]:
+        self.card_cache      = StatCard("Cache hit", "0%", "#a371f7")
+        self.card_speed      = StatCard("Toc do tai", "0.00 MB/s", "#00d4ff")
+        for c in [self.card_downloaded, self.card_processed, self.card_errors,
+                  self.card_scripts, self.card_cache, self.card_speed]:
             stats_row.addWidget(c)
         outer.addLayout(stats_row)
 
@@ -113,9 +126,16 @@ class DashboardTab(QWidget):
 
     def refresh_stats(self):
         s = settings.load_settings()
-        self.card_downloaded.set_value(s.get("stat_downloaded", 0))
-        self.card_processed.set_value(s.get("stat_processed", 0))
-        self.card_errors.set_value(s.get("stat_errors", 0))
+        store = stats.get_stats()
+        totals = store.totals()
+        self.card_downloaded.set_value(totals.get(stats.DOWNLOADED, 0))
+        self.card_processed.set_value(totals.get(stats.PROCESSED, 0))
+        self.card_errors.set_value(totals.get(stats.ERRORS, 0))
+        today = store.day()
+        top = sorted(store.scripts().items(), key=lambda kv: -kv[1].get(stats.PROCESSED, 0))[:5]
+        top_text = ", ".join(f"{name} ({c.get(stats.PROCESSED, 0)}"
+                             + (f", {c[stats.ERRORS]} loi" if c.get(stats.ERRORS) else "") + ")"
+                             for name, c in top) or "(chua co)"
 
         import os
         scripts_dir = s.get("scripts_folder", "scripts")
@@ -124,6 +144,9 @@ class DashboardTab(QWidget):
             n_scripts = len([f for f in os.listdir(scripts_dir) if f.endswith(".txt")])
         self.card_scripts.set_value(n_scripts)
 
+        cache = result_cache.get_cache().stats()
+        self.card_cache.set_value(f"{cache['hit_rate'] * 100:.0f}%")
+
         ffmpeg = s.get("ffmpeg_path", "ffmpeg")
         ytdlp  = s.get("ytdlp_path", "yt-dlp")
         output = s.get("output_folder", "") or "(chua dat)"
@@ -132,9 +155,18 @@ class DashboardTab(QWidget):
             f"<b>FFmpeg:</b> {ffmpeg}<br>"
             f"<b>yt-dlp:</b> {ytdlp}<br>"
             f"<b>Thu muc xuat mac dinh:</b> {output}<br>"
-            f"<b>Lich tu dong:</b> {sched}"
+            f"<b>Lich tu dong:</b> {sched}<br>"
+            f"<b>Hom nay:</b> {today.get(stats.DOWNLOADED, 0)} tai, "
+            f"{today.get(stats.PROCESSED, 0)} xu ly, {today.get(stats.ERRORS, 0)} loi<br>"
+            f"<b>Script dung nhieu:</b> {top_text}<br>"
+            f"<b>Cache ket qua:</b> {cache['entries']} file, "
+            f"{cache['bytes'] / (1024 * 1024):.0f} MB, "
+            f"{cache['hits']} hit / {cache['misses']} miss"
         )
 
+    def refresh_speed(self):
+        self.card_speed.set_value(downloader.fmt_speed(downloader.total_speed()))
+
     def _open_output(self):
         import subprocess, os
         folder = settings.get("output_folder", "")
@@ -148,7 +180,5 @@ class DashboardTab(QWidget):
             subprocess.Popen(f'explorer "{folder}"')
 
     def _reset_stats(self):
-        settings.set_value("stat_downloaded", 0)
-        settings.set_value("stat_processed", 0)
-        settings.set_value("stat_errors", 0)
+        stats.get_stats().reset()
         self.refresh_stats()
@@ -1,28 +1,46 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTextEdit, QComboBox, QCheckBox, QTableWidget, QTableWidgetItem,
+    QTextEdit, QComboBox, QCheckBox, QTableView,
     QHeaderView, QFrame, QFileDialog, QAbstractItemView,
     QSplitter, QLineEdit
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor
 import settings
-from downloader import DownloadWorker
+import download_archive
+import log_console
+import queue_model
+import settings_bridge
+import state_hub
+from downloader import DownloadWorker, PrefetchWorker, fmt_bytes, fmt_speed, fmt_eta
 
 STATUS_COLORS = {
     "Dang tai...": "#e3b341",
     "Xong":        "#2ea043",
     "Loi":         "#f85149",
+    "Da dung":     "#8b949e",
+    "Da co":       "#58a6ff",
     "Cho":         "#484f58",
 }
 
+COL_URL, COL_PLATFORM, COL_STATUS, COL_DURATION, COL_SIZE, COL_PROGRESS, COL_SPEED = range(7)
+# (nhan, prefix trang thai) cho bo loc queue
+STATUS_FILTERS = [("Tat ca", ""), ("Cho", "Cho"), ("Dang tai", "Dang tai"), ("Xong", "Xong"),
+                  ("Loi", "Loi"), ("Da dung", "Da dung"), ("Da co", "Da co"),
+                  ("Trung dong", "Trung dong")]
+
 
 class DownloaderTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._worker = None
+        self._prefetch = None
+        self._hub = state_hub.StateHub()
+        self._archive = download_archive.get_archive()
+        self._queue_keys = set()       # dedupe keys of every URL in the queue
         self._build_ui()
+        self._poller = state_hub.StatePoller(self._hub, settings.get("ui_refresh_hz", 10), parent=self)
+        self._poller.updated.connect(self._apply_state)
 
     def _build_ui(self):
         # Root layout
@@ -97,6 +115,8 @@ class DownloaderTab(QWidget):
         btn_row.setSpacing(8)
         self.btn_add   = QPushButton("Them vao Queue")
         self.btn_add.setObjectName("btn_primary")
+        self.btn_info  = QPushButton("Lay thong tin")
+        self.btn_info.setToolTip("Lay tieu de, thoi luong, dung luong truoc khi tai (de loc / sap xep)")
         self.btn_start = QPushButton("Bat dau tai")
         self.btn_start.setObjectName("btn_success")
         self.btn_stop  = QPushButton("Dung")
@@ -104,9 +124,10 @@ class DownloaderTab(QWidget):
         self.btn_stop.setEnabled(False)
         self.btn_clear = QPushButton("Xoa tat ca")
         self.btn_clear.setObjectName("btn_flat")
-        for b in [self.btn_add, self.btn_start, self.btn_stop, self.btn_clear]:
+        for b in [self.btn_add, self.btn_info, self.btn_start, self.btn_stop, self.btn_clear]:
             b.setFixedHeight(36)
         btn_row.addWidget(self.btn_add)
+        btn_row.addWidget(self.btn_info)
         btn_row.addWidget(self.btn_start)
         btn_row.addWidget(self.btn_stop)
         btn_row.addStretch()
@@ -122,14 +143,33 @@ class DownloaderTab(QWidget):
         tbl_lay = QVBoxLayout(tbl_frame)
         tbl_lay.setContentsMargins(0, 0, 0, 0)
         tbl_lay.setSpacing(4)
-        tbl_lay.addWidget(QLabel("Queue tai:"))
+        tbl_head = QHBoxLayout()
+        tbl_head.addWidget(QLabel("Queue tai:"))
+        tbl_head.addStretch()
+        tbl_head.addWidget(QLabel("Loc:"))
+        self.status_filter = QComboBox()
+        self.status_filter.addItems([label for label, _ in STATUS_FILTERS])
+        self.status_filter.currentIndexChanged.connect(
+            lambda i: self.queue_proxy.set_status(STATUS_FILTERS[i][1]))
+        tbl_head.addWidget(self.status_filter)
+        tbl_lay.addLayout(tbl_head)
 
-        self.queue_table = QTableWidget(0, 3)
-        self.queue_table.setHorizontalHeaderLabels(["URL", "Nen tang", "Trang thai"])
+        self.queue_model = queue_model.QueueModel(
+            ["URL", "Nen tang", "Trang thai", "Thoi luong", "Dung luong", "Tien do", "Toc do / ETA"],
+            COL_STATUS, STATUS_COLORS,
+            sort_cols=(COL_DURATION, COL_SIZE, COL_PROGRESS, COL_SPEED), parent=self)
+        self.queue_proxy = queue_model.StatusFilterProxy(self)
+        self.queue_proxy.setSourceModel(self.queue_model)
+        self.queue_table = QTableView()
+        self.queue_table.setModel(self.queue_proxy)
+        self.queue_table.setSortingEnabled(True)
+        # Keep insertion order until the user clicks a header
+        self.queue_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.queue_proxy.sort(-1)
         h = self.queue_table.horizontalHeader()
         h.setSectionResizeMode(0, QHeaderView.Stretch)
-        h.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        h.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        for col in range(1, self.queue_model.columnCount()):
+            h.setSectionResizeMode(col, QHeaderView.ResizeToContents)
         self.queue_table.setAlternatingRowColors(True)
         self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
@@ -143,8 +183,7 @@ class DownloaderTab(QWidget):
         log_lay.setContentsMargins(0, 0, 0, 0)
         log_lay.setSpacing(4)
         log_lay.addWidget(QLabel("Log:"))
-        self.log_box = QTextEdit()
-        self.log_box.setReadOnly(True)
+        self.log_box = log_console.LogConsole("downloader")
         log_lay.addWidget(self.log_box)
         splitter.addWidget(log_frame)
 
@@ -153,11 +192,19 @@ class DownloaderTab(QWidget):
 
         # ── Connections ───────────────────────────────────────
         self.btn_add.clicked.connect(self._add_to_queue)
+        self.btn_info.clicked.connect(self._start_prefetch)
         self.btn_start.clicked.connect(self._start_download)
         self.btn_stop.clicked.connect(self._stop_download)
         self.btn_clear.clicked.connect(self._clear_queue)
 
-        # Load saved settings
+        # Load saved settings, and follow later changes (settings tab / edited file)
+        self._apply_settings()
+        self._restore_queue()
+        settings_bridge.bridge().on_change(
+            ["output_folder", "download_quality", "no_watermark_tiktok", "auto_reup_after_download"],
+            self._apply_settings)
+
+    def _apply_settings(self, _keys=None):
         s = settings.load_settings()
         if s.get("output_folder"):
             self.out_dir.setText(s["output_folder"])
@@ -189,60 +236,146 @@ class DownloaderTab(QWidget):
         raw = self.url_input.toPlainText().strip()
         if not raw:
             return
-        for url in [u.strip() for u in raw.splitlines() if u.strip()]:
-            row = self.queue_table.rowCount()
-            self.queue_table.insertRow(row)
-            self.queue_table.setItem(row, 0, QTableWidgetItem(url))
-            self.queue_table.setItem(row, 1, QTableWidgetItem(self._detect_platform(url)))
-            si = QTableWidgetItem("Cho")
-            si.setForeground(QColor("#484f58"))
-            self.queue_table.setItem(row, 2, si)
+        urls = [u.strip() for u in raw.splitlines() if u.strip()]
+        added = self._append_urls(urls)
         self.url_input.clear()
+        if len(added) < len(urls):
+            self._log(f"[Download] Bo {len(urls) - len(added)} link trung (da co trong queue)")
+        self._save_queue()
+
+    def _append_urls(self, urls: list) -> list:
+        """Them URL chua co trong queue (so theo nen tang + id video, khong thi URL chuan hoa)."""
+        added = []
+        for url in urls:
+            key = self._archive.queue_key(url)
+            if key in self._queue_keys:
+                continue
+            self._queue_keys.add(key)
+            added.append(url)
+        self.queue_model.append_rows([(url, self._detect_platform(url), "Cho", "", "", "", "") for url in added])
+        return added
+
+    def _restore_queue(self):
+        urls = settings.get("last_urls", []) or []
+        if urls:
+            self._append_urls(urls)
+            self._log(f"Khoi phuc {self.queue_model.rowCount()} link tu lan truoc")
+
+    def _save_queue(self):
+        settings.set_value("last_urls", list(self.queue_model.column(COL_URL)))
+
+    def _busy(self) -> bool:
+        return any(w is not None and w.isRunning() for w in (self._worker, self._prefetch))
+
+    def _visible_tasks(self) -> list:
+        """Cac dong dang hien (theo bo loc) theo thu tu dang sap xep trong bang."""
+        proxy = self.queue_proxy
+        urls = self.queue_model.column(COL_URL)
+        rows = [proxy.mapToSource(proxy.index(i, 0)).row() for i in range(proxy.rowCount())]
+        return [{"url": urls[r], "row": r} for r in rows]
+
+    def _worker_options(self) -> dict:
+        return {"quality": self.combo_quality.currentText(),
+                "no_watermark": self.chk_no_watermark.isChecked()}
+
+    def _set_running(self, running: bool):
+        self.btn_start.setEnabled(not running)
+        self.btn_info.setEnabled(not running)
+        self.btn_stop.setEnabled(running)
+
+    def _start_prefetch(self):
+        if self._busy():
+            return
+        tasks = self._visible_tasks()
+        if not tasks:
+            self._log("Queue trong, hay them URL truoc!")
+            return
+        for task in tasks:
+            self.queue_model.set(task["row"], COL_DURATION, "...")
+        self._prefetch = PrefetchWorker(tasks, self.out_dir.text().strip(), self._worker_options(),
+                                        hub=self._hub)
+        self._prefetch.finished.connect(self._on_prefetch_finished)
+        self._prefetch.start()
+        self._set_running(True)
+
+    def _on_prefetch_finished(self, success: int, errors: int):
+        self._poller.flush()
+        self._log(f"[Info] Xong: {success} link co thong tin | {errors} loi")
+        self._set_running(False)
 
     def _start_download(self):
-        if self._worker and self._worker.isRunning():
+        if self._busy():
             return
         out = self.out_dir.text().strip()
         if not out:
             self._log("Vui long chon thu muc tai ve!")
             return
-        tasks = [{"url": self.queue_table.item(r, 0).text(), "row": r}
-                 for r in range(self.queue_table.rowCount())]
+        # Downloads follow the table as shown: the status filter and the sorted column
+        tasks = self._visible_tasks()
         if not tasks:
             self._log("Queue trong, hay them URL truoc!")
             return
-        opts = {"quality": self.combo_quality.currentText(),
-                "no_watermark": self.chk_no_watermark.isChecked()}
-        self._worker = DownloadWorker(tasks, out, opts)
-        self._worker.progress.connect(self._on_progress)
-        self._worker.log.connect(self._log)
+        self._worker = DownloadWorker(tasks, out, self._worker_options(), hub=self._hub)
         self._worker.finished.connect(self._on_finished)
         self._worker.start()
-        self.btn_start.setEnabled(False)
-        self.btn_stop.setEnabled(True)
+        self._set_running(True)
         self._log("Bat dau tai batch...")
 
     def _stop_download(self):
-        if self._worker:
-            self._worker.stop()
-        self.btn_start.setEnabled(True)
-        self.btn_stop.setEnabled(False)
+        for worker in (self._worker, self._prefetch):
+            if worker:
+                worker.stop()
+        self._set_running(False)
 
     def _clear_queue(self):
-        self.queue_table.setRowCount(0)
+        self.queue_model.clear()
+        self._queue_keys.clear()
+        self._save_queue()
 
     def _on_progress(self, row: int, status: str):
-        item = self.queue_table.item(row, 2)
-        if item:
-            item.setText(status)
-            item.setForeground(QColor(STATUS_COLORS.get(status, "#e6edf3")))
+        self.queue_model.set(row, COL_STATUS, status)
+
+    def _apply_state(self, changes: dict, logs: list):
+        for msg in logs:
+            self._log(msg)
+        for row, fields in changes.items():
+            if "status" in fields:
+                self._on_progress(row, fields["status"])
+            if "percent" in fields or "downloaded" in fields:
+                self._show_progress(row, fields)
+            if "duration" in fields or "size" in fields:
+                self._show_info(row, fields)
+            if "info_error" in fields:
+                self.queue_model.set(row, COL_DURATION, "?", tip=fields["info_error"])
+            if "speed" in fields:
+                speed = fields["speed"]
+                text = f"{fmt_speed(speed)}, ETA {fmt_eta(fields.get('eta'))}" if speed else ""
+                self.queue_model.set(row, COL_SPEED, text, key=speed or 0)
+
+    def _show_info(self, row: int, fields: dict):
+        duration, size = fields.get("duration"), fields.get("size")
+        self.queue_model.set(row, COL_DURATION, fmt_eta(duration) if duration else "?",
+                             key=duration or 0)
+        self.queue_model.set(row, COL_SIZE, fmt_bytes(size) if size else "?", key=size or 0)
+        if fields.get("title"):
+            self.queue_model.set(row, COL_URL, self.queue_model.value(row, COL_URL),
+                                 tip=fields["title"])
+
+    def _show_progress(self, row: int, fields: dict):
+        percent = fields.get("percent")
+        done, total = fields.get("downloaded"), fields.get("total")
+        if done and total:
+            text = f"{percent or 0:.0f}% ({fmt_bytes(done)} / {fmt_bytes(total)})"
+        elif done:
+            text = fmt_bytes(done)
+        else:
+            text = f"{percent:.0f}%" if percent is not None else ""
+        self.queue_model.set(row, COL_PROGRESS, text, key=percent or 0)
 
     def _on_finished(self, success: int, errors: int):
+        self._poller.flush()
         self._log(f"Hoan thanh! {success} OK | {errors} loi")
-        self.btn_start.setEnabled(True)
-        self.btn_stop.setEnabled(False)
+        self._set_running(False)
 
     def _log(self, msg: str):
-        self.log_box.append(msg)
-        self.log_box.verticalScrollBar().setValue(
-            self.log_box.verticalScrollBar().maximum())
+        self.log_box.log(msg)
@@ -1,28 +1,62 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QComboBox, QTextEdit, QLineEdit, QTableWidget, QTableWidgetItem,
-    QHeaderView, QFrame, QFileDialog, QAbstractItemView, QSplitter
+    QComboBox, QTextEdit, QLineEdit, QTableView,
+    QHeaderView, QFrame, QFileDialog, QAbstractItemView, QSplitter, QMessageBox,
+    QListWidget, QListWidgetItem, QCheckBox
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtGui import QFont
 import settings
+import batch_journal
+import hot_folder
+import log_console
 import processor
+import queue_model
+import scanner
+import settings_bridge
+import state_hub
+import proc_utils
+import script_compiler
+import ffmpeg_progress
 
 STATUS_COLORS = {
     "Dang xu ly...": "#e3b341",
     "Xong":   "#2ea043",
+    "Xong (cache)": "#2ea043",
     "Loi":    "#f85149",
     "Bo qua": "#8b949e",
+    "⏭ Bỏ qua": "#8b949e",
+    "Da dung": "#8b949e",
     "Cho":    "#484f58",
 }
 
+COL_NAME, COL_SIZE, COL_DURATION, COL_INFO, COL_STATUS, COL_PROGRESS = range(6)
+# (nhan, prefix trang thai) cho bo loc bang
+STATUS_FILTERS = [("Tat ca", ""), ("Cho", "Cho"), ("Dang xu ly", "Dang"), ("Xong", "Xong"),
+                  ("Loi", "Loi"), ("Bo qua / dung", ("Bo qua", "⏭", "Da dung"))]
+
+MODE_SINGLE, MODE_MULTI, MODE_PIPELINE = range(3)
+
+SCHEDULE_LABELS = ["Theo ten file", "Dai nhat truoc", "Ngan nhat truoc", "Xen ke thu muc"]
+
 
 class ProcessorTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._worker = None
+        self._probe_workers = []
+        self._watcher = None
+        self._scan_worker = None
+        self._scan_probe = None
+        self._files = []            # duong dan theo thu tu dong trong bang
+        self._files_folder = ""     # thu muc da quet ra self._files
+        self._run_after_scan = False
+        # Workers publish row state here; the UI applies it in one pass per frame
+        self._hub = state_hub.StateHub()
         self._build_ui()
+        self._poller = state_hub.StatePoller(self._hub, settings.get("ui_refresh_hz", 10), parent=self)
+        self._poller.updated.connect(self._apply_state)
 
     def _build_ui(self):
         root = QVBoxLayout(self)
@@ -81,16 +115,45 @@ class ProcessorTab(QWidget):
         combo_col.addLayout(sc_h)
         sc_row.addLayout(combo_col, stretch=2)
 
+        mode_col = QVBoxLayout()
+        mode_col.addWidget(QLabel("Che do:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(["Mot script", "Nhieu script (fan-out)", "Pipeline (noi chuoi)"])
+        self.mode_combo.currentIndexChanged.connect(self._on_mode_changed)
+        mode_col.addWidget(self.mode_combo)
+        sc_row.addLayout(mode_col, stretch=1)
+
+        order_col = QVBoxLayout()
+        order_col.addWidget(QLabel("Thu tu xu ly:"))
+        self.schedule_combo = QComboBox()
+        self.schedule_combo.addItems(SCHEDULE_LABELS)
+        policy = settings.get("schedule_policy", "filename")
+        if policy in processor.SCHEDULE_POLICIES:
+            self.schedule_combo.setCurrentIndex(processor.SCHEDULE_POLICIES.index(policy))
+        self.schedule_combo.currentIndexChanged.connect(
+            lambda i: settings.set_value("schedule_policy", processor.SCHEDULE_POLICIES[i]))
+        order_col.addWidget(self.schedule_combo)
+        sc_row.addLayout(order_col, stretch=1)
+
         naming_col = QVBoxLayout()
-        naming_col.addWidget(QLabel("Ten file xuat ({name} = ten goc):"))
+        naming_col.addWidget(QLabel("Ten file xuat ({name} = ten goc, {script} = ten script):"))
         self.naming_input = QLineEdit("{name}_reup")
         naming_col.addWidget(self.naming_input)
         sc_row.addLayout(naming_col, stretch=1)
 
         root.addLayout(sc_row)
 
+        # ── Multi-script list (checked scripts, drag to reorder) ──
+        self.multi_label = QLabel("Tick cac script can ap dung (keo tha de doi thu tu):")
+        root.addWidget(self.multi_label)
+        self.multi_list = QListWidget()
+        self.multi_list.setFixedHeight(96)
+        self.multi_list.setDragDropMode(QAbstractItemView.InternalMove)
+        root.addWidget(self.multi_list)
+
         # ── Script preview ────────────────────────────────────
-        root.addWidget(QLabel("Preview lenh FFmpeg (co the sua truc tiep):"))
+        self.preview_label = QLabel("Preview lenh FFmpeg (co the sua truc tiep):")
+        root.addWidget(self.preview_label)
         self.script_preview = QTextEdit()
         self.script_preview.setPlaceholderText("ffmpeg -y -i {input} ... {output}.mp4")
         self.script_preview.setFixedHeight(62)
@@ -113,12 +176,19 @@ class ProcessorTab(QWidget):
         self.btn_stop.setEnabled(False)
         self.btn_skip = QPushButton("Bo qua file hien tai")
         self.btn_skip.setEnabled(False)
-        for b in [self.btn_load_files, self.btn_run, self.btn_stop, self.btn_skip]:
+        self.btn_resume = QPushButton("Tiep tuc batch")
+        self.btn_resume.setVisible(False)
+        for b in [self.btn_load_files, self.btn_run, self.btn_stop, self.btn_skip, self.btn_resume]:
             b.setFixedHeight(36)
         btn_row.addWidget(self.btn_load_files)
         btn_row.addWidget(self.btn_run)
         btn_row.addWidget(self.btn_stop)
         btn_row.addWidget(self.btn_skip)
+        btn_row.addWidget(self.btn_resume)
+        self.chk_watch = QCheckBox("Hot folder: tu xu ly file moi trong thu muc")
+        self.chk_watch.setToolTip("Worker chay lien tuc, file moi (da ghi xong) duoc them vao hang doi")
+        self.chk_watch.toggled.connect(self._on_watch_toggled)
+        btn_row.addWidget(self.chk_watch)
         btn_row.addStretch()
         root.addLayout(btn_row)
 
@@ -130,13 +200,35 @@ class ProcessorTab(QWidget):
         tbl_lay = QVBoxLayout(tbl_frame)
         tbl_lay.setContentsMargins(0, 0, 0, 0)
         tbl_lay.setSpacing(4)
-        tbl_lay.addWidget(QLabel("Danh sach video:"))
-        self.file_table = QTableWidget(0, 3)
-        self.file_table.setHorizontalHeaderLabels(["Ten file", "Kich thuoc", "Trang thai"])
+        tbl_head = QHBoxLayout()
+        tbl_head.addWidget(QLabel("Danh sach video:"))
+        tbl_head.addStretch()
+        tbl_head.addWidget(QLabel("Loc:"))
+        self.status_filter = QComboBox()
+        self.status_filter.addItems([label for label, _ in STATUS_FILTERS])
+        self.status_filter.currentIndexChanged.connect(
+            lambda i: self.file_proxy.set_status(STATUS_FILTERS[i][1]))
+        tbl_head.addWidget(self.status_filter)
+        tbl_lay.addLayout(tbl_head)
+        self.file_model = queue_model.QueueModel(
+            ["Ten file", "Kich thuoc", "Thoi luong", "Thong tin", "Trang thai", "Tien do"],
+            COL_STATUS, STATUS_COLORS, sort_cols=(COL_SIZE, COL_DURATION),
+            row_tip=lambda row: self._files[row] if row < len(self._files) else None, parent=self)
+        self.file_proxy = queue_model.StatusFilterProxy(self)
+        self.file_proxy.setSourceModel(self.file_model)
+        self.file_table = QTableView()
+        self.file_table.setModel(self.file_proxy)
+        self.file_table.setSortingEnabled(True)
+        # Keep scan order until the user clicks a header
+        self.file_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.file_proxy.sort(-1)
         h = self.file_table.horizontalHeader()
-        h.setSectionResizeMode(0, QHeaderView.Stretch)
-        h.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        h.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        h.setSectionResizeMode(COL_NAME, QHeaderView.Stretch)
+        h.setSectionResizeMode(COL_SIZE, QHeaderView.ResizeToContents)
+        h.setSectionResizeMode(COL_DURATION, QHeaderView.ResizeToContents)
+        h.setSectionResizeMode(COL_INFO, QHeaderView.ResizeToContents)
+        h.setSectionResizeMode(COL_STATUS, QHeaderView.ResizeToContents)
+        h.setSectionResizeMode(COL_PROGRESS, QHeaderView.ResizeToContents)
         self.file_table.setAlternatingRowColors(True)
         self.file_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.file_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
@@ -149,9 +241,7 @@ class ProcessorTab(QWidget):
         log_lay.setContentsMargins(0, 0, 0, 0)
         log_lay.setSpacing(4)
         log_lay.addWidget(QLabel("Log xu ly:"))
-        self.log_box = QTextEdit()
-        self.log_box.setReadOnly(True)
-        self.log_box.setFont(QFont("Consolas", 11))
+        self.log_box = log_console.LogConsole("processor", font=QFont("Consolas", 11))
         log_lay.addWidget(self.log_box)
         splitter.addWidget(log_frame)
 
@@ -163,20 +253,55 @@ class ProcessorTab(QWidget):
         self.btn_run.clicked.connect(self._start_processing)
         self.btn_stop.clicked.connect(self._stop_processing)
         self.btn_skip.clicked.connect(self._skip_file)
+        self.btn_resume.clicked.connect(self._resume_batch)
 
         self._refresh_scripts()
+        self._on_mode_changed(MODE_SINGLE)
         s = settings.load_settings()
         if s.get("input_folder"):
             self.input_dir.setText(s["input_folder"])
         if s.get("output_folder"):
             self.output_dir.setText(s["output_folder"])
+        self._check_resume()
+        bus = settings_bridge.bridge()
+        bus.on_change(["scripts_folder"], lambda _keys: self._refresh_scripts())
+        bus.on_change(["output_folder"], self._on_output_setting)
+
+    def _on_output_setting(self, _keys):
+        folder = settings.get("output_folder", "")
+        if folder and not (self._worker and self._worker.isRunning()):
+            self.output_dir.setText(folder)
 
     # ─────────────────────────────────────────────────────────
 
     def _refresh_scripts(self):
         s = settings.load_settings()
+        scripts = processor.get_scripts(s.get("scripts_folder", "scripts"))
         self.script_combo.clear()
-        self.script_combo.addItems(processor.get_scripts(s.get("scripts_folder", "scripts")))
+        self.script_combo.addItems(scripts)
+        # Pipeline gan nhat duoc tick san va dung dau danh sach theo dung thu tu
+        checked = self._checked_scripts() or [n for n in s.get("last_pipeline", []) if n in scripts]
+        self.multi_list.clear()
+        for name in checked + [n for n in scripts if n not in checked]:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if name in checked else Qt.Unchecked)
+            self.multi_list.addItem(item)
+
+    def _checked_scripts(self) -> list:
+        """Ten cac script dang tick, theo thu tu trong danh sach."""
+        return [self.multi_list.item(i).text() for i in range(self.multi_list.count())
+                if self.multi_list.item(i).checkState() == Qt.Checked]
+
+    def _on_mode_changed(self, mode: int):
+        multi = mode != MODE_SINGLE
+        self.multi_label.setText(
+            "Thu tu cac buoc pipeline (tick + keo tha de sap xep):" if mode == MODE_PIPELINE
+            else "Tick cac script can ap dung (keo tha de doi thu tu):")
+        self.multi_label.setVisible(multi)
+        self.multi_list.setVisible(multi)
+        self.preview_label.setVisible(not multi)
+        self.script_preview.setVisible(not multi)
 
     def _load_script(self):
         name = self.script_combo.currentText()
@@ -207,18 +332,108 @@ class ProcessorTab(QWidget):
                 self.input_dir.setText(folder)
         if not folder:
             return
-        files = processor.get_video_files(folder)
-        self.file_table.setRowCount(0)
-        for f in files:
-            row = self.file_table.rowCount()
-            self.file_table.insertRow(row)
-            self.file_table.setItem(row, 0, QTableWidgetItem(os.path.basename(f)))
-            size_mb = os.path.getsize(f) / (1024 * 1024)
-            self.file_table.setItem(row, 1, QTableWidgetItem(f"{size_mb:.1f} MB"))
-            si = QTableWidgetItem("Cho")
-            si.setForeground(QColor("#484f58"))
-            self.file_table.setItem(row, 2, si)
-        self._log(f"Da load {len(files)} file video")
+        self._start_scan(folder)
+
+    def _start_scan(self, folder: str, run_after: bool = False):
+        """Quet folder o background; dong duoc them vao bang theo tung lo."""
+        self._fill_table([], folder)
+        self._run_after_scan = run_after
+        s = settings.load_settings()
+        out_dir = self.output_dir.text().strip()
+        # Outputs written into a subfolder of the input must not come back as inputs
+        skip = [out_dir] if out_dir and os.path.abspath(out_dir) != os.path.abspath(folder) else []
+        self._scan_probe = self._start_probe([], streaming=True)
+        self._scan_worker = scanner.ScanWorker(folder, skip_dirs=skip, **scanner.scan_options(s))
+        self._scan_worker.batch.connect(self._on_scan_batch)
+        self._scan_worker.finished.connect(self._on_scan_finished)
+        self.btn_load_files.setText("Dang quet...")
+        self._scan_worker.start()
+
+    def _stop_scan(self):
+        if self._scan_worker and self._scan_worker.isRunning():
+            self._scan_worker.batch.disconnect(self._on_scan_batch)
+            self._scan_worker.finished.disconnect(self._on_scan_finished)
+            self._scan_worker.stop()
+            self._scan_worker.wait()
+        self._scan_worker = None
+        self._run_after_scan = False
+        self.btn_load_files.setText("Load video tu thu muc")
+
+    def _on_scan_batch(self, items: list):
+        # One rowsInserted per batch instead of one per file
+        tasks = self._append_rows([p for p, _, _ in items], [size for _, size, _ in items],
+                                  probe=False)
+        if self._scan_probe:
+            self._scan_probe.add(tasks)
+
+    def _on_scan_finished(self, total: int, seconds: float):
+        if self._scan_probe:
+            self._scan_probe.close()
+            self._scan_probe = None
+        self._scan_worker = None
+        self.btn_load_files.setText("Load video tu thu muc")
+        self._log(f"Da load {total} file video ({seconds:.1f}s)")
+        if self._run_after_scan:
+            self._run_after_scan = False
+            self._start_processing()
+
+    def _fill_table(self, files: list, folder: str = ""):
+        """Thay toan bo bang bang files. folder: thu muc goc (hien ten theo duong dan tuong doi)."""
+        self._stop_scan()
+        self.file_model.clear()
+        for w in self._probe_workers:
+            w.stop()
+            w.wait()
+        # Unapplied results of the old list must not land on the new rows
+        self._hub.discard("probe")
+        self._probe_workers = []
+        self._scan_probe = None
+        self._files = []
+        self._files_folder = folder
+        self._append_rows(files)
+
+    def _append_rows(self, files: list, sizes=None, probe: bool = True) -> list:
+        """Them dong cuoi bang cho files, tra ve task {'path', 'row'(, 'size')} tuong ung.
+
+        sizes: kich thuoc da biet (tu scandir) => khong can stat lai khi probe.
+        """
+        first = self.file_model.rowCount()
+        tasks, rows = [], []
+        for i, f in enumerate(files):
+            task = {"path": f, "row": first + i}
+            tasks.append(task)
+            name = os.path.relpath(f, self._files_folder) if self._files_folder else os.path.basename(f)
+            # Size / duration / codecs are filled in by the background probe
+            size = "..."
+            if sizes is not None:
+                task["size"] = sizes[i]
+                size = f"{sizes[i] / (1024 * 1024):.1f} MB"
+            rows.append((name, size, "...", "...", "Cho", ""))
+        self._files.extend(files)
+        self.file_model.append_rows(rows, {COL_SIZE: list(sizes) if sizes is not None else None})
+        if probe and tasks:
+            self._start_probe(tasks)
+        return tasks
+
+    def _start_probe(self, tasks: list, streaming: bool = False):
+        self._probe_workers = [w for w in self._probe_workers if w.isRunning()]
+        worker = processor.ProbeWorker(tasks, streaming=streaming, hub=self._hub)
+        self._probe_workers.append(worker)
+        worker.start()
+        return worker
+
+    def _on_probed(self, row: int, result: dict):
+        model = self.file_model
+        if row >= model.rowCount():
+            return
+        model.set(row, COL_SIZE, f"{result['size'] / (1024 * 1024):.1f} MB", key=result["size"])
+        info = result["info"]
+        if info:
+            model.set(row, COL_DURATION, ffmpeg_progress.format_eta(info.duration), key=info.duration)
+            model.set(row, COL_INFO, info.summary())
+        else:
+            model.set(row, COL_DURATION, "--:--")
+            model.set(row, COL_INFO, "khong doc duoc", tip=result["error"])
 
     def _start_processing(self):
         if self._worker and self._worker.isRunning():
@@ -226,26 +441,162 @@ class ProcessorTab(QWidget):
         in_dir  = self.input_dir.text().strip()
         out_dir = self.output_dir.text().strip()
         cmd     = self.script_preview.toPlainText().strip()
-        if not in_dir or not out_dir or not cmd:
+        mode    = self.mode_combo.currentIndex()
+        scripts = None
+        if mode != MODE_SINGLE:
+            s = settings.load_settings()
+            folder = s.get("scripts_folder", "scripts")
+            scripts = [(n, processor.read_script(n, folder)) for n in self._checked_scripts()]
+            if mode == MODE_PIPELINE:
+                settings.set_value("last_pipeline", [n for n, _ in scripts])
+        if not in_dir or not out_dir or not (scripts if scripts is not None else cmd):
             self._log("Vui long dien day du thu muc va script!")
             return
-        files = processor.get_video_files(in_dir)
-        if not files:
+        if self._scan_worker and self._scan_worker.isRunning():
+            self._run_after_scan = True
+            self._log("Dang quet thu muc, se bat dau xu ly khi quet xong...")
+            return
+        if not self._files_folder or os.path.abspath(self._files_folder) != os.path.abspath(in_dir):
+            # The table shows another folder (or a resumed batch): scan first, then start
+            self._start_scan(in_dir, run_after=True)
+            return
+        files = list(self._files)
+        if not files and not self.chk_watch.isChecked():
             self._log("Khong tim thay video trong thu muc dau vao!")
             return
         tasks  = [{"path": f, "row": i} for i, f in enumerate(files)]
         naming = self.naming_input.text().strip() or "{name}_reup"
-        self._worker = processor.ProcessWorker(tasks, out_dir, cmd, naming)
-        self._worker.file_status.connect(self._on_file_status)
-        self._worker.log.connect(self._log)
+        # Everything needed to rebuild the worker if the batch has to be resumed after a crash
+        params = {"output_dir": out_dir, "command": cmd, "naming": naming, "scripts": scripts,
+                  "pipeline": mode == MODE_PIPELINE,
+                  "schedule_policy": processor.SCHEDULE_POLICIES[self.schedule_combo.currentIndex()]}
+        if not self._launch(tasks, params, None):
+            return
+        if files:
+            self._log(f"Bat dau xu ly {len(files)} video...")
+        else:
+            self._log("[Hot folder] Chua co video, cho file moi trong thu muc dau vao...")
+
+    def _launch(self, tasks: list, params: dict, journal) -> bool:
+        """Tao ProcessWorker tu params va chay. journal=None => tao journal moi cho batch."""
+        scripts = params.get("scripts")
+        try:
+            worker = processor.ProcessWorker(
+                tasks, params["output_dir"], params["command"], params["naming"],
+                scripts=[tuple(s) for s in scripts] if scripts else None,
+                pipeline=params.get("pipeline", False),
+                schedule_policy=params.get("schedule_policy"), hub=self._hub)
+        except script_compiler.ScriptError as e:
+            self._log(f"[ERR] Script loi: {e}")
+            QMessageBox.warning(self, "Script loi", f"Khong the chay script:\n{e}")
+            return False
+        if journal is None:
+            try:
+                journal = batch_journal.BatchJournal.create(params, [t["path"] for t in tasks])
+                journal.queued(t["row"] for t in tasks)
+            except OSError as e:
+                self._log(f"[WARN] Khong tao duoc journal batch (se khong resume duoc): {e}")
+                journal = None
+        worker.journal = journal
+        worker.keep_alive = self.chk_watch.isChecked()
+        self._worker = worker
+        self.btn_resume.setVisible(False)
         self._worker.finished.connect(self._on_finished)
         self._worker.start()
         self.btn_run.setEnabled(False)
         self.btn_stop.setEnabled(True)
         self.btn_skip.setEnabled(True)
-        self._log(f"Bat dau xu ly {len(files)} video...")
+        if worker.keep_alive:
+            self._start_watch([t["path"] for t in tasks])
+        return True
+
+    # ── Hot folder ───────────────────────────────────────────
+
+    def _start_watch(self, known: list):
+        self._stop_watch()
+        folder = self.input_dir.text().strip()
+        if not folder or not os.path.isdir(folder):
+            self._log("[Hot folder] Thu muc dau vao khong hop le")
+            return
+        s = settings.load_settings()
+        self._watcher = hot_folder.FolderWatcher(
+            folder, stable_seconds=float(s.get("hot_folder_stable_seconds", 3)),
+            poll_seconds=float(s.get("hot_folder_poll_seconds", 5)), ignore=known,
+            scan_options=scanner.scan_options(s), parent=self)
+        self._watcher.files_ready.connect(self._on_hot_files)
+        self._watcher.log.connect(self._log)
+        self._watcher.start()
+
+    def _stop_watch(self):
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher.deleteLater()
+            self._watcher = None
+
+    def _on_watch_toggled(self, on: bool):
+        running = self._worker and self._worker.isRunning()
+        if running and not self._worker.set_keep_alive(on):
+            # The batch has already drained its queue and is finishing: the next Run watches
+            running = False
+            if on:
+                self._log("[Hot folder] Batch dang ket thuc, hot folder ap dung tu lan chay sau")
+        if on and running:
+            self._start_watch([t["path"] for t in self._worker.input_files])
+        elif not on:
+            self._stop_watch()
+
+    def _on_hot_files(self, paths: list):
+        if not (self._worker and self._worker.isRunning()):
+            return
+        # Our own outputs (when output dir == input dir) are not inputs
+        paths = [p for p in paths if not self._worker.is_output(p)]
+        if not paths:
+            return
+        tasks = self._append_rows(paths)
+        if not self._worker.add_tasks(tasks):
+            # The batch finished in between: the rows stay "Cho" for the next Run
+            self._log(f"[Hot folder] Batch da ket thuc, {len(tasks)} file moi se chay o lan sau")
+            return
+        self._log(f"[Hot folder] Them {len(tasks)} file moi: "
+                  + ", ".join(os.path.basename(p) for p in paths[:5]) + (" ..." if len(paths) > 5 else ""))
+
+    def _check_resume(self):
+        """Hien nut 'Tiep tuc batch' neu batch truoc bi ngat giua chung (crash / tat app / Dung)."""
+        self._resume_state = batch_journal.latest_incomplete()
+        st = self._resume_state
+        if not st:
+            self.btn_resume.setVisible(False)
+            return
+        left = len(st.incomplete())
+        self.btn_resume.setText(f"Tiep tuc batch ({left}/{len(st.files)} file)")
+        self.btn_resume.setToolTip(f"Batch {st.header.get('id', '')} chua xong: {st.counts()}")
+        self.btn_resume.setVisible(True)
+
+    def _resume_batch(self):
+        st = self._resume_state
+        if not st or (self._worker and self._worker.isRunning()):
+            return
+        # Outputs half-written when the app died are removed so names stay free (no _1 copies)
+        partial = st.partial_outputs()
+        for path in partial:
+            proc_utils.remove_quietly(path)
+        self._fill_table(st.files)
+        labels = {batch_journal.DONE: "Xong", batch_journal.FAILED: "Loi",
+                  batch_journal.SKIPPED: "⏭ Bỏ qua"}
+        for row in range(len(st.files)):
+            label = labels.get(st.state(row))
+            if label:
+                self._on_file_status(row, label)
+        tasks = [{"path": st.files[i], "row": i} for i in st.incomplete()]
+        params = st.params
+        self.output_dir.setText(params.get("output_dir", ""))
+        if not self._launch(tasks, params, batch_journal.BatchJournal(st.path)):
+            return
+        self._log(f"[Resume] Tiep tuc batch {st.header.get('id', '')}: {len(tasks)} file con lai,"
+                  f" xoa {len(partial)} file do dang")
 
     def _stop_processing(self):
+        self._stop_watch()
         if self._worker:
             self._worker.stop()
         self.btn_run.setEnabled(True)
@@ -254,21 +605,38 @@ class ProcessorTab(QWidget):
 
     def _skip_file(self):
         if self._worker:
-            self._worker.skip()
+            # Bo qua cac dong dang chon, neu khong chon thi bo qua tat ca file dang chay
+            rows = self.file_proxy.source_rows(self.file_table.selectionModel().selectedRows())
+            self._worker.skip(rows or None)
 
     def _on_file_status(self, row: int, status: str):
-        item = self.file_table.item(row, 2)
-        if item:
-            item.setText(status)
-            item.setForeground(QColor(STATUS_COLORS.get(status, "#e6edf3")))
+        self.file_model.set(row, COL_STATUS, status)
+
+    def _on_file_progress(self, row: int, percent: int, detail: str):
+        self.file_model.set(row, COL_PROGRESS, detail)
+
+    def _apply_state(self, changes: dict, logs: list):
+        for msg in logs:
+            self._log(msg)
+        for row, fields in changes.items():
+            if not isinstance(row, int):
+                continue        # "batch" totals: the table already shows per-row state
+            if "probe" in fields:
+                self._on_probed(row, fields["probe"])
+            if "status" in fields:
+                self._on_file_status(row, fields["status"])
+            if "progress" in fields:
+                self._on_file_progress(row, fields.get("percent", 0), fields["progress"])
 
     def _on_finished(self, success: int, errors: int):
+        # Final statuses may still sit in the hub; apply them before the summary
+        self._poller.flush()
         self._log(f"Xong! {success} OK | {errors} loi")
+        self._stop_watch()
+        self._check_resume()
         self.btn_run.setEnabled(True)
         self.btn_stop.setEnabled(False)
         self.btn_skip.setEnabled(False)
 
     def _log(self, msg: str):
-        self.log_box.append(msg)
-        self.log_box.verticalScrollBar().setValue(
-            self.log_box.verticalScrollBar().maximum())
+        self.log_box.log(msg)
@@ -1,9 +1,11 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTimeEdit, QCheckBox, QFrame, QTextEdit, QComboBox
+    QTimeEdit, QCheckBox, QFrame, QComboBox
 )
 from PyQt5.QtCore import Qt, QTimer, QTime
 import settings
+import log_console
+import settings_bridge
 
 
 class SchedulerTab(QWidget):
@@ -14,6 +16,9 @@ class SchedulerTab(QWidget):
         self._timer.start(30000)
         self._build_ui()
         self._refresh_ui()
+        settings_bridge.bridge().on_change(
+            ["scheduler_enabled", "scheduler_hour", "scheduler_minute", "scheduler_action"],
+            lambda _keys: self._refresh_ui())
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -89,8 +94,7 @@ class SchedulerTab(QWidget):
         log_title = QLabel("Lich su chay:")
         log_title.setObjectName("field_label")
         layout.addWidget(log_title)
-        self.log_box = QTextEdit()
-        self.log_box.setReadOnly(True)
+        self.log_box = log_console.LogConsole("scheduler")
         layout.addWidget(self.log_box)
 
         layout.addStretch()
@@ -152,7 +156,4 @@ class SchedulerTab(QWidget):
             self._log(f"Lich tu dong kich hoat: {now.strftime('%H:%M %d/%m/%Y')}")
 
     def _log(self, msg: str):
-        self.log_box.append(msg)
-        self.log_box.verticalScrollBar().setValue(
-            self.log_box.verticalScrollBar().maximum()
-        )
+        self.log_box.log(msg)
@@ -5,9 +5,19 @@ from PyQt5.QtWidgets import (
     QFrame, QSplitter, QMessageBox
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QColor
 import settings
 import processor
+import script_compiler
+
+PREVIEW_OK_STYLE = (
+    "color: #8b949e; background: #161b22; border: 1px solid #21262d;"
+    " border-radius: 6px; padding: 8px; font-family: Consolas; font-size: 11px;"
+)
+PREVIEW_ERR_STYLE = (
+    "color: #f85149; background: #161b22; border: 1px solid #f85149;"
+    " border-radius: 6px; padding: 8px; font-family: Consolas; font-size: 11px;"
+)
 
 
 class ScriptManagerTab(QWidget):
@@ -91,10 +101,7 @@ class ScriptManagerTab(QWidget):
         right_layout.addWidget(preview_lbl)
         self.preview_label = QLabel()
         self.preview_label.setWordWrap(True)
-        self.preview_label.setStyleSheet(
-            "color: #8b949e; background: #161b22; border: 1px solid #21262d;"
-            " border-radius: 6px; padding: 8px; font-family: Consolas; font-size: 11px;"
-        )
+        self.preview_label.setStyleSheet(PREVIEW_OK_STYLE)
         self.preview_label.setMinimumHeight(48)
         right_layout.addWidget(self.preview_label)
 
@@ -145,8 +152,16 @@ class ScriptManagerTab(QWidget):
         s = settings.load_settings()
         scripts = processor.get_scripts(s.get("scripts_folder", "scripts"))
         self.script_list.clear()
+        folder = s.get("scripts_folder", "scripts")
         for sc in scripts:
             self.script_list.addItem(sc)
+            # Danh dau script loi cu phap ngay trong danh sach
+            try:
+                script_compiler.compile_script(processor.read_script(sc, folder), sc)
+            except script_compiler.ScriptError as e:
+                item = self.script_list.item(self.script_list.count() - 1)
+                item.setForeground(QColor("#f85149"))
+                item.setToolTip(f"Loi: {e}")
 
     def _on_select_script(self, name: str):
         if not name:
@@ -210,10 +225,17 @@ class ScriptManagerTab(QWidget):
 
     def _update_preview(self):
         content = self.editor.toPlainText().strip()
-        if content:
-            demo = (content
-                    .replace("{input}", '"E:/Videos/sample.mp4"')
-                    .replace("{output}", '"E:/Output/sample_reup"'))
-            self.preview_label.setText(demo[:300])
-        else:
+        if not content:
+            self.preview_label.setStyleSheet(PREVIEW_OK_STYLE)
             self.preview_label.setText("")
+            return
+        try:
+            model = script_compiler.compile_script(content)
+        except script_compiler.ScriptError as e:
+            self.preview_label.setStyleSheet(PREVIEW_ERR_STYLE)
+            self.preview_label.setText(f"Loi script: {e}")
+            return
+        demo = script_compiler.format_argv(
+            model.argv("E:/Videos/sample.mp4", "E:/Output/sample_reup"))
+        self.preview_label.setStyleSheet(PREVIEW_OK_STYLE)
+        self.preview_label.setText(demo[:300])
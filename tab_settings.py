@@ -6,6 +6,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 import settings
+import download_archive
+import downloader
 
 
 def _sep():
@@ -63,7 +65,7 @@ class SettingsTab(QWidget):
         layout.addWidget(ytdlp_lbl)
         yt_row = QHBoxLayout()
         self.ytdlp_input = QLineEdit()
-        self.ytdlp_input.setPlaceholderText("yt-dlp  hoac  C:/tools/yt-dlp.exe")
+        self.ytdlp_input.setPlaceholderText("yt-dlp  hoac  C:/tools/yt-dlp.exe  hoac  yt_dlp (API, nhanh hon)")
         yt_row.addWidget(self.ytdlp_input)
         btn_yt = QPushButton("Tim file")
         btn_yt.setFixedWidth(80)
@@ -118,6 +120,38 @@ class SettingsTab(QWidget):
         self.chk_no_watermark = QCheckBox("Khong watermark TikTok (mac dinh)")
         layout.addWidget(self.chk_no_watermark)
 
+        arc_row = QHBoxLayout()
+        self.chk_archive = QCheckBox("Bo qua video da tai truoc do (lich su tai)")
+        arc_row.addWidget(self.chk_archive)
+        arc_row.addStretch()
+        btn_clear_archive = QPushButton("Xoa lich su tai")
+        btn_clear_archive.setObjectName("btn_flat")
+        btn_clear_archive.clicked.connect(self._clear_archive)
+        arc_row.addWidget(btn_clear_archive)
+        layout.addLayout(arc_row)
+
+        par_lbl = QLabel("So link tai song song (tong):")
+        par_lbl.setObjectName("field_label")
+        layout.addWidget(par_lbl)
+        self.download_parallel_input = QLineEdit()
+        self.download_parallel_input.setPlaceholderText("4")
+        self.download_parallel_input.setFixedWidth(200)
+        layout.addWidget(self.download_parallel_input)
+        lim_lbl = QLabel("Toi da moi nen tang (tranh bi chan / rate limit):")
+        lim_lbl.setObjectName("field_label")
+        layout.addWidget(lim_lbl)
+        lim_row = QHBoxLayout()
+        self.platform_limit_inputs = {}
+        for platform in downloader.PLATFORMS:
+            lim_row.addWidget(QLabel(platform.capitalize()))
+            edit = QLineEdit()
+            edit.setPlaceholderText(str(downloader.DEFAULT_PLATFORM_LIMITS[platform]))
+            edit.setFixedWidth(60)
+            lim_row.addWidget(edit)
+            self.platform_limit_inputs[platform] = edit
+        lim_row.addStretch()
+        layout.addLayout(lim_row)
+
         proxy_lbl = QLabel("Proxy (de trong neu khong dung):")
         proxy_lbl.setObjectName("field_label")
         layout.addWidget(proxy_lbl)
@@ -137,6 +171,66 @@ class SettingsTab(QWidget):
         self.naming_input.setPlaceholderText("{name}_reup")
         layout.addWidget(self.naming_input)
 
+        mw_lbl = QLabel("So FFmpeg chay song song (auto = theo so CPU):")
+        mw_lbl.setObjectName("field_label")
+        layout.addWidget(mw_lbl)
+        self.combo_workers = QComboBox()
+        self.combo_workers.setEditable(True)
+        self.combo_workers.addItems(["auto", "1", "2", "4", "8", "16", "32"])
+        self.combo_workers.setFixedWidth(200)
+        layout.addWidget(self.combo_workers)
+
+        self.chk_result_cache = QCheckBox("Dung lai ket qua cu khi input + script khong doi (cache)")
+        layout.addWidget(self.chk_result_cache)
+        cache_lbl = QLabel("Dung luong cache toi da (GB):")
+        cache_lbl.setObjectName("field_label")
+        layout.addWidget(cache_lbl)
+        self.cache_size_input = QLineEdit()
+        self.cache_size_input.setPlaceholderText("20")
+        self.cache_size_input.setFixedWidth(200)
+        layout.addWidget(self.cache_size_input)
+
+        fo_lbl = QLabel("Toi uu chuoi filter (safe = ket qua nhu cu, aggressive = scale truoc flip / filter mau / noise / blur):")
+        fo_lbl.setObjectName("field_label")
+        layout.addWidget(fo_lbl)
+        self.combo_filter_opt = QComboBox()
+        self.combo_filter_opt.addItems(["off", "safe", "aggressive"])
+        self.combo_filter_opt.setFixedWidth(200)
+        layout.addWidget(self.combo_filter_opt)
+
+        self.chk_segment = QCheckBox("Video dai: chia doan theo keyframe, encode song song (tiep tuc duoc khi bi dung)")
+        layout.addWidget(self.chk_segment)
+        seg_lbl = QLabel("Chi chia doan video dai tu (phut):")
+        seg_lbl.setObjectName("field_label")
+        layout.addWidget(seg_lbl)
+        self.segment_min_input = QLineEdit()
+        self.segment_min_input.setPlaceholderText("20")
+        self.segment_min_input.setFixedWidth(200)
+        layout.addWidget(self.segment_min_input)
+
+        scan_lbl = QLabel("Quet thu muc video - chi lay file khop (glob, cach nhau bang ;  vd. *.mp4;clip_*):")
+        scan_lbl.setObjectName("field_label")
+        layout.addWidget(scan_lbl)
+        self.scan_include_input = QLineEdit()
+        self.scan_include_input.setPlaceholderText("(tat ca video)")
+        layout.addWidget(self.scan_include_input)
+        excl_lbl = QLabel("Bo qua file / thu muc khop (vd. *_reup*;tmp/*):")
+        excl_lbl.setObjectName("field_label")
+        layout.addWidget(excl_lbl)
+        self.scan_exclude_input = QLineEdit()
+        layout.addWidget(self.scan_exclude_input)
+        depth_lbl = QLabel("Do sau thu muc con (0 = chi thu muc chon):")
+        depth_lbl.setObjectName("field_label")
+        layout.addWidget(depth_lbl)
+        self.combo_scan_depth = QComboBox()
+        self.combo_scan_depth.addItems(["0", "1", "2", "3", "5", "khong gioi han"])
+        self.combo_scan_depth.setEditable(True)
+        self.combo_scan_depth.setFixedWidth(200)
+        layout.addWidget(self.combo_scan_depth)
+
+        self.chk_smart_plan = QCheckBox("Bo qua encode khong can thiet (remux / chi xu ly audio khi script khong doi video)")
+        layout.addWidget(self.chk_smart_plan)
+
         layout.addWidget(_sep())
 
         # ── SAVE / RESET ─────────────────────────────────────
@@ -167,6 +261,16 @@ class SettingsTab(QWidget):
 
     # ─────────────────────────────────────────────────────────
 
+    def _clear_archive(self):
+        archive = download_archive.get_archive()
+        reply = QMessageBox.question(
+            self, "Xoa lich su tai",
+            f"Xoa lich su {archive.count()} video da tai? Cac link nay se duoc tai lai.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            archive.clear()
+
     def _browse_exe(self, target: QLineEdit):
         path, _ = QFileDialog.getOpenFileName(
             self, "Chon file thuc thi", "", "Executables (*.exe);;All Files (*)"
@@ -188,6 +292,22 @@ class SettingsTab(QWidget):
         self.proxy_input.setText(s.get("proxy", ""))
         self.naming_input.setText(s.get("output_naming", "{name}_reup"))
         self.chk_no_watermark.setChecked(s.get("no_watermark_tiktok", True))
+        self.chk_archive.setChecked(s.get("download_archive_enabled", True))
+        total, limits = downloader.download_limits(s)
+        self.download_parallel_input.setText(str(total))
+        for platform, edit in self.platform_limit_inputs.items():
+            edit.setText(str(limits[platform]))
+        self.combo_workers.setCurrentText(str(s.get("max_workers", 2)))
+        self.chk_result_cache.setChecked(s.get("result_cache_enabled", True))
+        self.cache_size_input.setText(str(s.get("result_cache_max_gb", 20)))
+        self.chk_smart_plan.setChecked(s.get("smart_plan_enabled", True))
+        self.combo_filter_opt.setCurrentText(s.get("filter_optimizer", "safe"))
+        self.chk_segment.setChecked(s.get("segment_enabled", True))
+        self.segment_min_input.setText(str(s.get("segment_min_minutes", 20)))
+        self.scan_include_input.setText(s.get("scan_include", ""))
+        self.scan_exclude_input.setText(s.get("scan_exclude", ""))
+        depth = int(s.get("scan_max_depth", 0))
+        self.combo_scan_depth.setCurrentText("khong gioi han" if depth < 0 else str(depth))
         try:
             idx = ["best", "1080p", "720p", "480p"].index(s.get("download_quality", "best"))
             self.combo_quality.setCurrentIndex(idx)
@@ -203,7 +323,33 @@ class SettingsTab(QWidget):
         s["proxy"]             = self.proxy_input.text().strip()
         s["output_naming"]     = self.naming_input.text().strip() or "{name}_reup"
         s["no_watermark_tiktok"] = self.chk_no_watermark.isChecked()
+        s["download_archive_enabled"] = self.chk_archive.isChecked()
         s["download_quality"]  = self.combo_quality.currentText()
+        text = self.download_parallel_input.text().strip()
+        if text.isdigit() and int(text) > 0:
+            s["download_max_parallel"] = int(text)
+        for platform, edit in self.platform_limit_inputs.items():
+            text = edit.text().strip()
+            if text.isdigit() and int(text) > 0:
+                s[f"download_limit_{platform}"] = int(text)
+        workers = self.combo_workers.currentText().strip().lower()
+        s["max_workers"]       = int(workers) if workers.isdigit() and int(workers) > 0 else "auto"
+        s["result_cache_enabled"] = self.chk_result_cache.isChecked()
+        s["smart_plan_enabled"] = self.chk_smart_plan.isChecked()
+        s["filter_optimizer"]  = self.combo_filter_opt.currentText()
+        s["segment_enabled"]   = self.chk_segment.isChecked()
+        s["scan_include"]      = self.scan_include_input.text().strip()
+        s["scan_exclude"]      = self.scan_exclude_input.text().strip()
+        depth = self.combo_scan_depth.currentText().strip()
+        s["scan_max_depth"]    = int(depth) if depth.isdigit() else -1
+        try:
+            s["segment_min_minutes"] = max(0.0, float(self.segment_min_input.text().strip()))
+        except ValueError:
+            pass
+        try:
+            s["result_cache_max_gb"] = max(0.0, float(self.cache_size_input.text().strip()))
+        except ValueError:
+            pass
         settings.save_settings(s)
         QMessageBox.information(self, "Da luu", "Cai dat da duoc luu thanh cong!")
 
@@ -0,0 +1,276 @@
+"""Tai bang API Python cua yt-dlp trong vai process song lau (thay vi moi URL 1 lan chay CLI).
+
+Moi process import yt_dlp + extractor 1 lan va giu lai YoutubeDL (session HTTP, cache extractor)
+cho cac URL sau => bo ~1s khoi dong interpreter moi link. Chon bang ytdlp_path = "yt_dlp";
+khong co module yt_dlp thi DownloadWorker quay ve chay CLI nhu cu.
+
+Moi loai viec (tai / lay info) co pool rieng: Stop cua viec nay khong cham toi viec kia.
+Module nay chay trong process con: khong import PyQt / settings.
+"""
+import atexit
+import importlib.util
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import proc_utils
+
+BACKEND_NAME = "yt_dlp"
+
+QUALITY_FORMATS = {
+    "best": "bestvideo+bestaudio/best",
+    "1080p": "bestvideo[height<=1080]+bestaudio/best[height<=1080]",
+    "720p": "bestvideo[height<=720]+bestaudio/best[height<=720]",
+    "480p": "bestvideo[height<=480]+bestaudio/best[height<=480]",
+}
+
+
+def is_selected(ytdlp_path: str) -> bool:
+    return (ytdlp_path or "").strip().lower() in (BACKEND_NAME, "yt-dlp-api", "api")
+
+
+def available() -> bool:
+    return importlib.util.find_spec(BACKEND_NAME) is not None
+
+
+def build_options(platform: str, quality: str, no_watermark: bool, proxy: str) -> dict:
+    """Tuy chon YoutubeDL tuong duong lenh CLI trong DownloadWorker._build_command."""
+    opts = {
+        "format": QUALITY_FORMATS.get(quality, QUALITY_FORMATS["best"]),
+        "merge_output_format": "mp4",
+        "noplaylist": True,
+        "outtmpl": "%(title).80s.%(ext)s",
+        "writethumbnail": True,
+        "postprocessors": [
+            {"key": "FFmpegMetadata", "add_metadata": True},
+            {"key": "EmbedThumbnail", "already_have_thumbnail": False},
+        ],
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+    }
+    if platform == "tiktok" and no_watermark:
+        opts["http_headers"] = {"referer": "https://www.tiktok.com/"}
+    if proxy:
+        opts["proxy"] = proxy
+    return opts
+
+
+PROGRESS_INTERVAL = 0.25    # seconds between progress messages of one download
+PID_MSG = "pid"             # first message of every pool process: (PID_MSG, os.getpid())
+
+
+# ── Child process side ───────────────────────────────────────
+
+_cancel = None      # multiprocessing.Event shared with the parent
+_progress = None    # multiprocessing.Queue of (job, downloaded, total, speed, eta) / (PID_MSG, pid)
+_job = None         # id of the download running in this process (one at a time)
+_last_sent = 0.0
+_clients = {}       # options key -> YoutubeDL kept for the life of the process
+
+
+def _init_worker(cancel_event, progress_queue):
+    global _cancel, _progress
+    _cancel = cancel_event
+    _progress = progress_queue
+    if os.name != "nt":
+        try:
+            # Own process group: terminate() also takes down the ffmpeg of a merge / thumbnail embed
+            os.setsid()
+        except OSError:
+            pass
+    # The parent kills pool processes by pid on Stop (the executor does not expose them)
+    progress_queue.put((PID_MSG, os.getpid()))
+    import yt_dlp  # noqa: F401  (pay the import + extractor registry cost once per process)
+
+
+def _hook(status: dict):
+    global _last_sent
+    if _cancel is not None and _cancel.is_set():
+        from yt_dlp.utils import DownloadCancelled
+        raise DownloadCancelled("cancelled")
+    if _progress is None or status.get("status") != "downloading":
+        return
+    now = time.monotonic()
+    if now - _last_sent < PROGRESS_INTERVAL:
+        return
+    _last_sent = now
+    total = status.get("total_bytes") or status.get("total_bytes_estimate")
+    _progress.put((_job, status.get("downloaded_bytes"), total,
+                   status.get("speed"), status.get("eta")))
+
+
+def _client(opts: dict):
+    import yt_dlp
+    key = repr(sorted(opts.items()))
+    ydl = _clients.get(key)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(dict(opts, progress_hooks=[_hook]))
+        _clients[key] = ydl
+    return ydl
+
+
+def _download(job: int, url: str, opts: dict, home: str, temp: str, info_path: str = "") -> tuple:
+    """Chay trong process con: (ok, thong bao loi). info_path: info JSON da lay truoc (bo trich xuat)."""
+    global _job, _last_sent
+    if _cancel is not None and _cancel.is_set():
+        return False, "cancelled"
+    _job, _last_sent = job, 0.0
+    ydl = _client(opts)
+    # Paths change per row, so they are set on the reused client instead of keying it
+    ydl.params["paths"] = {"home": home, "temp": temp} if temp else {"home": home}
+    try:
+        code = ydl.download_with_info_file(info_path) if info_path else ydl.download([url])
+    except BaseException as e:    # DownloadError, DownloadCancelled, KeyboardInterrupt...
+        return False, str(e) or type(e).__name__
+    return code == 0, "" if code == 0 else f"yt-dlp tra ve ma {code}"
+
+
+def _extract(url: str, opts: dict):
+    """Chay trong process con: info JSON (da sanitize, pickle duoc) hoac loi (str)."""
+    if _cancel is not None and _cancel.is_set():
+        return "cancelled"
+    ydl = _client(opts)
+    try:
+        return ydl.sanitize_info(ydl.extract_info(url, download=False))
+    except BaseException as e:
+        return str(e) or type(e).__name__
+
+
+# ── Parent side ──────────────────────────────────────────────
+
+class YtdlpPool:
+    """ProcessPoolExecutor giu nguyen qua nhieu lan tai; cancel() huy cac link dang tai (qua
+    progress hook), terminate() kill ngay cac process (ca luc trich xuat / ghep file).
+    Tien do tu progress hook cua process con ve qua 1 Queue, thread nen chuyen cho callback."""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        # spawn: the GUI process has Qt threads running, fork would copy them half-initialised
+        ctx = multiprocessing.get_context("spawn")
+        self._cancel = ctx.Event()
+        self._progress = ctx.Queue()
+        self._callbacks = {}            # job id -> progress(downloaded, total, speed, eta)
+        self._jobs = itertools.count(1)
+        self._closed = False
+        self._pids = set()              # pool processes, reported by _init_worker
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                             initargs=(self._cancel, self._progress))
+        self._reader = threading.Thread(target=self._read_progress, name="ytdlp-progress",
+                                        daemon=True)
+        self._reader.start()
+
+    def _read_progress(self):
+        while not self._closed:
+            try:
+                msg = self._progress.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except Exception:
+                return      # torn message from a process killed by terminate()
+            if msg is None:
+                return
+            if msg[0] == PID_MSG:
+                self._pids.add(msg[1])
+                continue
+            callback = self._callbacks.get(msg[0])
+            if callback is not None:
+                callback(*msg[1:])
+
+    def download(self, url: str, opts: dict, home: str, temp: str = "", progress=None,
+                 info_path: str = "") -> tuple:
+        """Chan toi khi xong (goi tu thread cua DownloadWorker): (ok, thong bao loi).
+        progress(downloaded, total, speed, eta) duoc goi tu thread doc tien do (gia tri co the None)."""
+        job = next(self._jobs)
+        if progress is not None:
+            self._callbacks[job] = progress
+        try:
+            return self._executor.submit(_download, job, url, opts, home, temp, info_path).result()
+        finally:
+            self._callbacks.pop(job, None)
+
+    def extract_info(self, url: str, opts: dict) -> dict:
+        """Info JSON cua URL (khong tai). Loi => RuntimeError."""
+        result = self._executor.submit(_extract, url, opts).result()
+        if isinstance(result, str):
+            raise RuntimeError(result)
+        return result
+
+    def reset_cancel(self):
+        self._cancel.clear()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._cancel.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._progress.put(None)
+
+    def terminate(self):
+        """Kill cac process cua pool (khong doi hook); viec dang cho nhan BrokenProcessPool.
+        Process chua kip bao pid thi chua nhan viec nao: no thay _cancel va tu thoat theo pool."""
+        self._closed = True
+        self._cancel.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Pid messages the reader has not picked up yet
+        while True:
+            try:
+                msg = self._progress.get_nowait()
+            except queue.Empty:
+                break
+            except Exception:
+                break
+            if msg and msg[0] == PID_MSG:
+                self._pids.add(msg[1])
+        # A killed process may die holding the queue's write lock: never write to or join it again
+        self._progress.cancel_join_thread()
+        for pid in list(self._pids):
+            threading.Thread(target=proc_utils.kill_pid_tree, args=(pid,), daemon=True).start()
+
+
+_pools = {}         # name -> YtdlpPool ("download", "prefetch")
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int, name: str = "download") -> YtdlpPool:
+    """Pool dung chung cua 1 loai viec; tao lai neu so process doi."""
+    with _pool_lock:
+        pool = _pools.get(name)
+        if pool is not None and pool.workers != workers:
+            pool.shutdown()
+            pool = None
+        if pool is None:
+            pool = _pools[name] = YtdlpPool(workers)
+        return pool
+
+
+def discard(pool: YtdlpPool, terminate: bool = False):
+    """Bo pool (hong / bi Stop) khoi danh sach dung chung => get_pool sau tao pool moi.
+    terminate=True: kill ngay cac process thay vi cho viec dang chay xong."""
+    with _pool_lock:
+        for name in [n for n, p in _pools.items() if p is pool]:
+            del _pools[name]
+    if terminate:
+        pool.terminate()
+    else:
+        pool.shutdown()
+
+
+def shutdown():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown)
+